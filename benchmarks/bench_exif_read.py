@@ -0,0 +1,75 @@
+"""
+Compare header-only exif reader with exif library reader.
+
+    python benchmarks/bench_exif_read.py /path/to/photos
+
+Run it on a network share right after mount to see cold scan numbers.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geoexif  # noqa: E402
+
+
+def bench(reader, paths):
+    errors = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            reader(path)
+        except Exception:
+            errors += 1
+    return time.perf_counter() - start, errors
+
+
+def safe_read(reader, path):
+    try:
+        return reader(path)
+    except Exception as e:
+        return repr(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("folder")
+    parser.add_argument("--limit", type=int, default=0, help="read only first N files")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.folder, name)
+        for name in os.listdir(args.folder)
+        if name.lower().endswith((".jpg", ".jpeg"))
+    )
+    if args.limit:
+        paths = paths[: args.limit]
+    if not paths:
+        sys.exit("no jpg files in " + args.folder)
+
+    # header reader goes first, so it is the one which hits cold cache
+    for name, reader in (
+        ("header", geoexif.read_gps_exif),
+        ("exif library", geoexif.read_gps_exif_fallback),
+    ):
+        elapsed, errors = bench(reader, paths)
+        print(
+            f"{name:>12}: {len(paths)} files in {elapsed:.3f} s, "
+            f"{len(paths) / elapsed:.0f} files/s, {errors} errors"
+        )
+
+    mismatched = [
+        p
+        for p in paths
+        if safe_read(geoexif.read_gps_exif, p)
+        != safe_read(geoexif.read_gps_exif_fallback, p)
+    ]
+    print(f"{len(mismatched)} files where readers disagree")
+    for p in mismatched[:10]:
+        print("  " + p)
+
+
+if __name__ == "__main__":
+    main()
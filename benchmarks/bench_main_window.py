@@ -0,0 +1,233 @@
+"""
+Time hot paths of the main window on synthetic photo folders.
+
+    python benchmarks/bench_main_window.py --sizes 1000,10000,100000 -o results.json
+    python benchmarks/bench_main_window.py --baseline results.json
+
+For every folder size a corpus is generated with benchmarks/corpus.py and
+loaded into a hidden RaskladGeotag window on the offscreen Qt platform, so
+no display is needed. The map is not created: timings cover models,
+workers and widgets, not QtWebEngine. Settings and caches go to Qt test
+locations (~/.qttest), user settings are not touched.
+
+Measured steps:
+  mainfiles_init_cold   scan with empty metadata cache, until table is shown
+  mainfiles_init_warm   same folder again, metadata from cache
+  display_files         show files in table with sorting and filter
+  updateProgressBar     count files with coordinates
+  update_coordinate_1   set map position for one selected file
+  update_coordinate_all set map position for all files selected
+  save2exif             write all changed files, until save is finished
+
+With --baseline, a step slower than baseline by more than --tolerance
+fails the run with exit code 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import (  # noqa: E402
+    PYQT_VERSION_STR,
+    QT_VERSION_STR,
+    QEventLoop,
+    QSettings,
+    QStandardPaths,
+    QTimer,
+)
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+import corpus  # noqa: E402
+import main  # noqa: E402
+
+# differences below this are noise on any machine, never reported as regression
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def wait_for(signal, timeout):
+    """Run event loop until signal is emitted, raise on timeout."""
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    timer = QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(loop.quit)
+    timer.start(int(timeout * 1000))
+    loop.exec()
+    if not timer.isActive():
+        raise TimeoutError(f"no result in {timeout} s")
+    timer.stop()
+
+
+def median_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def timed_scan(window, folder, rebuild_cache, timeout):
+    started = time.perf_counter()
+    window.mainfiles_init(folder, rebuild_cache=rebuild_cache)
+    # queued after on_scan_finished, which fills the table
+    wait_for(window.scan_worker.finished, timeout)
+    return time.perf_counter() - started
+
+
+def bench_size(window, folder, count, args):
+    corpus.make_corpus(
+        folder,
+        count,
+        gps=args.gps,
+        dest=args.dest,
+        timing=args.timing,
+        width=args.width,
+        height=args.height,
+    )
+    results = dict()
+    results["mainfiles_init_cold"] = timed_scan(window, folder, True, args.timeout)
+    results["mainfiles_init_warm"] = timed_scan(window, folder, False, args.timeout)
+    if len(window.mainfiles) != count:
+        raise RuntimeError(f"{len(window.mainfiles)} of {count} files loaded")
+
+    results["display_files"] = median_time(
+        lambda: window.display_files(folder, supress_statusbar=True), args.repeat
+    )
+    results["updateProgressBar"] = median_time(window.updateProgressBar, args.repeat)
+
+    window.table.selectRow(0)
+    results["update_coordinate_1"] = median_time(
+        lambda: window.update_coordinate_in_mainfiles("55.7", "37.6"), args.repeat
+    )
+    window.table.selectAll()
+    results["update_coordinate_all"] = median_time(
+        lambda: window.update_coordinate_in_mainfiles("55.7", "37.6"), args.repeat
+    )
+
+    started = time.perf_counter()
+    window.save2exif()
+    wait_for(window.save_worker.finished, args.timeout)
+    results["save2exif"] = time.perf_counter() - started
+    if window.save_errors:
+        raise RuntimeError(f"{len(window.save_errors)} files failed to save")
+    window.table.clearSelection()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print steps slower than baseline, return their count."""
+    regressions = 0
+    for key, seconds in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        change = seconds / old - 1 if old else 0.0
+        slower = seconds - old > MIN_REGRESSION_SECONDS and change > tolerance
+        if slower:
+            regressions += 1
+        print(
+            f"{key:>32}: {old * 1000:9.1f} -> {seconds * 1000:9.1f} ms {change:+7.0%}"
+            + ("  REGRESSION" if slower else "")
+        )
+    return regressions
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    parser.add_argument(
+        "--sizes", default="1000,10000,100000", help="folder sizes, comma separated"
+    )
+    parser.add_argument("--gps", type=float, default=0.5, help="share of files with position")
+    parser.add_argument(
+        "--dest", type=float, default=0.2, help="share of files with destination"
+    )
+    parser.add_argument("--timing", choices=corpus.TIMINGS, default="burst")
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--height", type=int, default=48)
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs of fast steps, median is kept"
+    )
+    parser.add_argument("--timeout", type=float, default=600, help="seconds for scan or save")
+    parser.add_argument(
+        "--work-dir", help="corpus folder, default temporary, removed after run"
+    )
+    parser.add_argument("-o", "--output", help="write results to JSON file")
+    parser.add_argument("--baseline", help="results JSON of earlier run to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 is 25%%"
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    QStandardPaths.setTestModeEnabled(True)
+    app = QApplication(sys.argv)
+    app.setOrganizationName("Trolleway")
+    app.setApplicationName("RaskladGeotag")
+    settings = QSettings("Trolleway", "RaskladGeotag")
+    settings.clear()
+    settings.setValue("thumbnailPregenerate", False)
+    window = main.RaskladGeotag()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="rasklad_bench_")
+    results = dict()
+    try:
+        for count in sizes:
+            folder = os.path.join(work_dir, str(count))
+            shutil.rmtree(folder, ignore_errors=True)
+            for step, seconds in bench_size(window, folder, count, args).items():
+                results[f"{count}/{step}"] = seconds
+                print(f"{count:>8} {step:>22}: {seconds * 1000:9.1f} ms", flush=True)
+            shutil.rmtree(folder, ignore_errors=True)
+    finally:
+        window.close()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    corpus_args = {
+        "gps": args.gps,
+        "dest": args.dest,
+        "timing": args.timing,
+        "width": args.width,
+        "height": args.height,
+    }
+    if args.output:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": corpus_args,
+            "seconds": results,
+        }
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=1)
+            fp.write("\n")
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        if baseline.get("corpus") != corpus_args:
+            print(f"baseline corpus differs: {baseline.get('corpus')}")
+        regressions = compare(results, baseline["seconds"], args.tolerance)
+        if regressions:
+            print(f"{regressions} steps slower than baseline by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
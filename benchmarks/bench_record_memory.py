@@ -0,0 +1,89 @@
+"""
+Measure memory per photo of dict records against photostore.PhotoRecord.
+
+    python benchmarks/bench_record_memory.py --count 100000
+
+Dict records are built in the layout main.py used before PhotoRecord:
+scan_photo fields, os.stat result, "modified" dict and formatted modification date.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import photostore  # noqa: E402
+
+FOLDER = "/home/user/photos/2024-05-01 trip"
+
+
+def fake_stat(i):
+    return os.stat_result((0o100644, 1000 + i, 2049, 1, 1000, 1000, 4000000 + i, 0, 0, 0))
+
+
+def fake_exif(i):
+    has_coords = i % 2 == 0
+    return (
+        "Cam" + str(i % 2),
+        f"2024:05:01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        55.5 + i * 1e-6 if has_coords else None,
+        37.5 + i * 1e-6 if has_coords else None,
+        None,
+        None,
+    )
+
+
+def make_dict(i):
+    file_name = f"IMG_{i:06d}.jpg"
+    model, datetime_original, lat, lon, dest_lat, dest_lon = fake_exif(i)
+    f = dict()
+    f["file_path"] = os.path.join(FOLDER, file_name)
+    f["file_name"] = file_name
+    f["file_info"] = fake_stat(i)
+    f["model"] = model
+    f["datetime_original"] = datetime_original
+    if lat is not None:
+        f["lat"] = lat
+        f["lon"] = lon
+    f["modified"] = dict()
+    f["modification_date"] = datetime.fromtimestamp(f["file_info"].st_mtime).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    f["seconds_since_previous"] = 1.0
+    return f
+
+
+def make_record(i):
+    file_name = f"IMG_{i:06d}.jpg"
+    f = photostore.PhotoRecord(os.path.join(FOLDER, file_name), fake_stat(i))
+    f.set_exif(*fake_exif(i))
+    f.seconds_since_previous = 1.0
+    return f
+
+
+def measure(factory, count):
+    tracemalloc.start()
+    records = [factory(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    dict_size = measure(make_dict, args.count)
+    record_size = measure(make_record, args.count)
+    print(f"{args.count} photos")
+    print(f"dict records:  {dict_size:7.0f} bytes per photo")
+    print(f"PhotoRecord:   {record_size:7.0f} bytes per photo")
+    print(f"saved:         {1 - record_size / dict_size:7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure time to geotag photos against a GPS track with tracklog.
+
+    python benchmarks/bench_track_match.py --photos 10000 --points 1000000
+
+Track is a synthetic 1 Hz log, photos are spread over it with camera clock
+three hours ahead of UTC. Optional --gpx writes the track to a GPX file
+and measures parsing too.
+"""
+import argparse
+import calendar
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import photostore  # noqa: E402
+import tracklog  # noqa: E402
+
+START = calendar.timegm((2024, 5, 1, 6, 0, 0))
+CAMERA_OFFSET = 3 * 3600
+
+
+def make_track(points):
+    rng = np.random.default_rng(1)
+    times = START + np.arange(points, dtype=np.float64)
+    lats = 55.5 + np.cumsum(rng.normal(0, 1e-5, points))
+    lons = 37.5 + np.cumsum(rng.normal(0, 1e-5, points))
+    return times, lats, lons
+
+
+def make_records(count, points):
+    records = []
+    for i in range(count):
+        f = photostore.PhotoRecord(f"/photos/IMG_{i:06d}.jpg")
+        seconds = START + CAMERA_OFFSET + i * points // count
+        f.set_exif(
+            "Cam", time.strftime("%Y:%m:%d %H:%M:%S", time.gmtime(seconds)), None, None, None, None
+        )
+        records.append(f)
+    return records
+
+
+def write_gpx(path, times, lats, lons):
+    with open(path, "w") as fp:
+        fp.write('<?xml version="1.0"?>\n<gpx version="1.1"><trk><trkseg>\n')
+        for t, lat, lon in zip(times, lats, lons):
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+            fp.write(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><time>{stamp}</time></trkpt>\n')
+        fp.write("</trkseg></trk></gpx>\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--photos", type=int, default=10000)
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--gpx", action="store_true", help="also measure GPX parsing")
+    args = parser.parse_args()
+
+    times, lats, lons = make_track(args.points)
+    records = make_records(args.photos, args.points)
+
+    if args.gpx:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "track.gpx")
+            write_gpx(path, times, lats, lons)
+            started = time.perf_counter()
+            track = tracklog.read_gpx(path)
+            print(f"parse GPX:     {time.perf_counter() - started:7.3f} s")
+    else:
+        started = time.perf_counter()
+        track = tracklog.Track(times, lats, lons)
+        print(f"build track:   {time.perf_counter() - started:7.3f} s")
+
+    started = time.perf_counter()
+    photo_times = tracklog.photo_times(records, CAMERA_OFFSET)
+    _, _, matched = track.locate(photo_times, tracklog.DEFAULT_MAX_GAP)
+    elapsed = time.perf_counter() - started
+    print(f"{args.photos} photos, {len(track)} track points")
+    print(f"match:         {elapsed:7.3f} s, {int(matched.sum())} photos matched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Measure latency from Space key to shown photo and map marker.
+
+    python benchmarks/bench_ui_latency.py --photos 200 --interval 300 -o latency.json
+
+Main window is shown on the offscreen Qt platform with a generated folder
+(benchmarks/corpus.py) and Space is pressed every --interval ms, as a user
+stepping through photos. For every press these steps are timed from the
+moment the key event is sent:
+
+  selection  selection change handled: labels, status bar, render scheduled
+  image      first new pixmap painted in the preview label, thumbnail or preview
+  preview    full preview painted
+  marker     scene applied by the map page
+
+The map page is a stand-in: scene messages get one event loop hop, as they
+do on the way to the web page, and are parsed like applyScene() does, so
+Python side of marker updates is measured, not Chromium drawing.
+Presses which were coalesced into a later one (short --interval, like a
+held key) have no image and marker of their own and are counted as skipped.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import (  # noqa: E402
+    QEvent,
+    QEventLoop,
+    QObject,
+    QSettings,
+    QStandardPaths,
+    Qt,
+    QTimer,
+)
+from PyQt6.QtGui import QKeyEvent  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QWidget  # noqa: E402
+
+import corpus  # noqa: E402
+import main  # noqa: E402
+
+STEPS = ("selection", "image", "preview", "marker")
+
+
+class MapPageStandIn(QWidget):
+    """Takes the place of mapview.MapView: receives scenes, reports them applied."""
+
+    def __init__(self, js_handler, on_applied, parent=None):
+        super().__init__(parent)
+        self.js_handler = js_handler
+        self.on_applied = on_applied
+        self.markers = dict()
+        js_handler.sceneUpdated.connect(self.receive_scene)
+        # real page calls mapReady() once leaflet and web channel are set up
+        QTimer.singleShot(0, js_handler.mapReady)
+
+    def receive_scene(self, message):
+        QTimer.singleShot(0, lambda: self.apply_scene(message))
+
+    def apply_scene(self, message):
+        scene = json.loads(message)
+        for name in ("image", "dest"):
+            marker = scene.get(name)
+            self.markers[name] = marker["position"] if marker else None
+        self.on_applied()
+
+    def reload_tiles(self):
+        pass
+
+
+class LatencyProbe(QObject):
+    """Timestamps steps of the latest key press."""
+
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self.presses = []
+        self.pending_kind = None
+        self.last_pixmap_key = None
+        window.table.selectionModel().selectionChanged.connect(self.on_selection)
+        # connected after the window's own slots, so these run after the label is set
+        window.preview_worker.thumbnailReady.connect(self.on_thumbnail)
+        window.preview_worker.previewReady.connect(self.on_preview)
+        window.label.installEventFilter(self)
+
+    def press(self):
+        event = QKeyEvent(
+            QEvent.Type.KeyPress, Qt.Key.Key_Space, Qt.KeyboardModifier.NoModifier, " "
+        )
+        # window skips a second event with the same timestamp, and synthetic
+        # events all have timestamp 0 which PyQt does not let to set
+        self.window.table_last_event_timestamp = None
+        self.presses.append({"start": time.perf_counter()})
+        QApplication.sendEvent(self.window.table, event)
+
+    def mark(self, step):
+        if self.presses and step not in self.presses[-1]:
+            self.presses[-1][step] = time.perf_counter()
+
+    def on_selection(self):
+        self.mark("selection")
+
+    def on_thumbnail(self, request_id, image):
+        if request_id == self.window.preview_request:
+            self.pending_kind = "thumbnail"
+
+    def on_preview(self, request_id, image):
+        if request_id == self.window.preview_request:
+            self.pending_kind = "preview"
+
+    def on_marker_applied(self):
+        self.mark("marker")
+
+    def eventFilter(self, source, event):
+        if event.type() == QEvent.Type.Paint:
+            pixmap = source.pixmap()
+            if not pixmap.isNull() and pixmap.cacheKey() != self.last_pixmap_key:
+                self.last_pixmap_key = pixmap.cacheKey()
+                self.mark("image")
+                # no signal before paint: preview was taken from cache
+                if self.pending_kind in (None, "preview"):
+                    self.mark("preview")
+                self.pending_kind = None
+        return False
+
+    def complete(self):
+        return bool(self.presses) and all(step in self.presses[-1] for step in STEPS)
+
+
+def run_events(milliseconds, until=None):
+    """Process events for given time, or until until() is true."""
+    deadline = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < deadline:
+        if until is not None and until():
+            return
+        loop = QEventLoop()
+        QTimer.singleShot(1, loop.quit)
+        loop.exec()
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summarize(presses):
+    summary = dict()
+    for step in STEPS:
+        latencies = sorted(
+            (press[step] - press["start"]) * 1000 for press in presses if step in press
+        )
+        if not latencies:
+            summary[step] = {"count": 0}
+            continue
+        summary[step] = {
+            "count": len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1],
+        }
+    return summary
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    parser.add_argument("--photos", type=int, default=200, help="photos in generated folder")
+    parser.add_argument("--presses", type=int, default=0, help="key presses, default photos - 1")
+    parser.add_argument("--interval", type=int, default=300, help="ms between key presses")
+    parser.add_argument("--width", type=int, default=1600, help="photo width")
+    parser.add_argument("--height", type=int, default=1200, help="photo height")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds for folder scan")
+    parser.add_argument("-o", "--output", help="write latencies to JSON file")
+    args = parser.parse_args()
+    presses = min(args.presses or args.photos - 1, args.photos - 1)
+
+    QStandardPaths.setTestModeEnabled(True)
+    app = QApplication(sys.argv)
+    app.setOrganizationName("Trolleway")
+    app.setApplicationName("RaskladGeotag")
+    settings = QSettings("Trolleway", "RaskladGeotag")
+    settings.clear()
+    settings.setValue("thumbnailPregenerate", False)
+    # start with cold thumbnail cache, it lives in Qt test location
+    cache_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+    shutil.rmtree(os.path.join(cache_dir, "photo_thumbnails"), ignore_errors=True)
+
+    work_dir = tempfile.mkdtemp(prefix="rasklad_latency_")
+    window = None
+    try:
+        corpus.make_corpus(work_dir, args.photos, width=args.width, height=args.height)
+        window = main.RaskladGeotag()
+        probe = LatencyProbe(window)
+        # create_map() does nothing when the map widget already has a view
+        map_widget = window.map_widget
+        map_widget.view = MapPageStandIn(
+            map_widget.jsHandler, probe.on_marker_applied, map_widget
+        )
+        map_widget.layout().addWidget(map_widget.view)
+        window.show()
+        run_events(100)
+
+        scanned = []
+        window.mainfiles_init(work_dir)
+        # queued after on_scan_finished, which sorts the table
+        window.scan_worker.finished.connect(scanned.append)
+        run_events(args.timeout * 1000, lambda: scanned)
+        if window.table_proxy.rowCount() != args.photos:
+            raise RuntimeError(f"{window.table_proxy.rowCount()} of {args.photos} photos loaded")
+        window.table.selectRow(0)
+        window.table.setCurrentIndex(window.table_proxy.index(0, 0))
+        run_events(1000)
+
+        for _ in range(presses):
+            probe.press()
+            run_events(args.interval)
+        # let the last press finish
+        run_events(1000, probe.complete)
+    finally:
+        if window is not None:
+            window.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = summarize(probe.presses)
+    print(f"{len(probe.presses)} presses every {args.interval} ms, {args.photos} photos")
+    print(f"{'step':>10} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  ms")
+    for step, row in summary.items():
+        if not row["count"]:
+            print(f"{step:>10} {0:>6}")
+            continue
+        print(
+            f"{step:>10} {row['count']:>6}"
+            + "".join(f" {row[k]:8.1f}" for k in ("p50", "p95", "p99", "max"))
+        )
+    skipped = sum(1 for press in probe.presses if "marker" not in press)
+    if skipped:
+        print(f"{skipped} presses skipped, coalesced into later ones")
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(
+                {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "photos": args.photos,
+                    "interval_ms": args.interval,
+                    "size": [args.width, args.height],
+                    "milliseconds": summary,
+                },
+                fp,
+                indent=1,
+            )
+            fp.write("\n")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,184 @@
+"""
+Generate a reproducible folder of geotagged JPEG files for benchmarks.
+
+    python benchmarks/corpus.py /tmp/corpus --count 10000 --gps 0.5 --dest 0.2
+
+Every file has camera model and shooting time; position and destination
+are written to a seeded random share of files. Shooting times follow the
+timing pattern: "uniform" is one photo every --interval seconds, "burst"
+is series of --burst-size photos one second apart with --interval between
+series. Image data is encoded once and shared by all files, so size of the
+corpus is set by --width and --height.
+"""
+import argparse
+import calendar
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geoexif  # noqa: E402
+
+START = calendar.timegm((2024, 5, 1, 6, 0, 0))
+MODELS = ("Canon EOS 5D", "Pentax K-5")
+TIMINGS = ("uniform", "burst")
+
+
+def encode_jpeg(width, height, quality=85, seed=1):
+    """Noise image of given size as JPEG bytes, noise keeps file size realistic."""
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt6.QtGui import QImage
+
+    pixels = random.Random(seed).randbytes(width * height * 3)
+    image = QImage(pixels, width, height, width * 3, QImage.Format.Format_RGB888)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if not image.save(buffer, "JPG", quality):
+        raise RuntimeError("Qt has no JPEG image writer")
+    buffer.close()
+    return bytes(data)
+
+
+def exif_segment(
+    model, datetime_original, lat=None, lon=None, dest_lat=None, dest_lon=None, endian="<"
+):
+    """
+    APP1 segment with IFD0 (model), exif IFD (shooting time) and GPS IFD.
+    endian is "<" for Intel byte order, as most cameras write, or ">" for Motorola.
+    """
+
+    def ascii(text):
+        raw = text.encode("ascii") + b"\x00"
+        return (2, len(raw), raw)
+
+    def pointer(offset):
+        return (4, 1, struct.pack(endian + "I", offset))
+
+    exif = {geoexif.TAG_DATETIME_ORIGINAL: ascii(datetime_original)}
+    gps = {geoexif.TAG_GPS_VERSION_ID: (1, 4, b"\x02\x02\x00\x00")}
+    gps.update(geoexif.gps_entries(endian, lat, lon, dest_lat, dest_lon))
+    ifd0 = {
+        geoexif.TAG_MODEL: ascii(model),
+        geoexif.TAG_EXIF_IFD: pointer(0),
+        geoexif.TAG_GPS_IFD: pointer(0),
+    }
+    # IFD sizes do not depend on pointer values, so offsets are known from a dry run
+    exif_offset = 8 + len(geoexif.build_ifd(endian, ifd0, 8))
+    gps_offset = exif_offset + len(geoexif.build_ifd(endian, exif, exif_offset))
+    ifd0[geoexif.TAG_EXIF_IFD] = pointer(exif_offset)
+    ifd0[geoexif.TAG_GPS_IFD] = pointer(gps_offset)
+    tiff = (
+        (b"II" if endian == "<" else b"MM")
+        + struct.pack(endian + "HI", 42, 8)
+        + geoexif.build_ifd(endian, ifd0, 8)
+        + geoexif.build_ifd(endian, exif, exif_offset)
+        + geoexif.build_ifd(endian, gps, gps_offset)
+    )
+    return b"\xff\xe1" + struct.pack(">H", 8 + len(tiff)) + b"Exif\x00\x00" + tiff
+
+
+def shooting_times(count, timing="uniform", interval=10, burst_size=5):
+    """Seconds since epoch of count photos in timing pattern."""
+    if timing == "uniform":
+        return [START + i * interval for i in range(count)]
+    if timing == "burst":
+        return [START + (i // burst_size) * interval + i % burst_size for i in range(count)]
+    raise ValueError(f"unknown timing {timing!r}, expected one of {', '.join(TIMINGS)}")
+
+
+def make_corpus(
+    folder,
+    count,
+    gps=0.5,
+    dest=0.2,
+    timing="uniform",
+    interval=10,
+    burst_size=5,
+    width=64,
+    height=48,
+    seed=1,
+):
+    """
+    Write count JPEG files to folder, return list of their paths.
+    Same arguments give byte-identical files. dest is share of files with
+    destination among all files, only files with position get one.
+    """
+    os.makedirs(folder, exist_ok=True)
+    jpeg = encode_jpeg(width, height, seed=seed)
+    # APP1 goes after SOI and JFIF APP0, as cameras write it
+    head_end = 2
+    if jpeg[2:4] == b"\xff\xe0":
+        head_end = 4 + struct.unpack(">H", jpeg[4:6])[0]
+    head, body = jpeg[:head_end], jpeg[head_end:]
+
+    rng = random.Random(seed)
+    paths = []
+    for i, seconds in enumerate(shooting_times(count, timing, interval, burst_size)):
+        lat = lon = dest_lat = dest_lon = None
+        if rng.random() < gps:
+            lat = 55.5 + rng.uniform(-0.5, 0.5)
+            lon = 37.5 + rng.uniform(-0.5, 0.5)
+            if gps and rng.random() < dest / gps:
+                dest_lat = lat + rng.uniform(-0.001, 0.001)
+                dest_lon = lon + rng.uniform(-0.001, 0.001)
+        segment = exif_segment(
+            MODELS[i % len(MODELS)],
+            time.strftime("%Y:%m:%d %H:%M:%S", time.gmtime(seconds)),
+            lat,
+            lon,
+            dest_lat,
+            dest_lon,
+        )
+        path = os.path.join(folder, f"IMG_{i:06d}.jpg")
+        with open(path, "wb") as fp:
+            fp.write(head + segment + body)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    parser.add_argument("folder")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--gps", type=float, default=0.5, help="share of files with position")
+    parser.add_argument(
+        "--dest", type=float, default=0.2, help="share of files with destination"
+    )
+    parser.add_argument("--timing", choices=TIMINGS, default="uniform")
+    parser.add_argument("--interval", type=int, default=10, help="seconds between photos or series")
+    parser.add_argument("--burst-size", type=int, default=5)
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--height", type=int, default=48)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = make_corpus(
+        args.folder,
+        args.count,
+        args.gps,
+        args.dest,
+        args.timing,
+        args.interval,
+        args.burst_size,
+        args.width,
+        args.height,
+        args.seed,
+    )
+    size = sum(os.path.getsize(p) for p in paths)
+    print(
+        f"{len(paths)} files, {size / 1024 / 1024:.1f} MB "
+        f"in {time.perf_counter() - started:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
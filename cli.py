@@ -0,0 +1,289 @@
+"""
+Rasklad Geotag batch mode, works without Qt.
+
+    python cli.py scan PHOTOS_FOLDER --format csv -o photos.csv
+    python cli.py apply coordinates.csv
+    python cli.py heading PHOTOS_FOLDER
+
+scan    dump camera, shooting time and GPS of photos to CSV, JSON or GeoJSON
+apply   write coordinates and destinations from CSV or GeoJSON
+heading write image direction calculated from position and destination
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import geoexif
+import photostore
+
+FIELDS = ("file", "model", "datetime_original", "lat", "lon", "dest_lat", "dest_lon")
+# column names accepted for file path in apply input
+FILE_COLUMNS = ("file", "file_path", "path", "filename")
+
+
+def default_workers():
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def iter_paths(paths, include=(), exclude=(), recursive=True):
+    """Photo files of folders and files given on command line."""
+    for path in paths:
+        if os.path.isdir(path):
+            for file_path, _ in photostore.iter_photo_files(path, include, exclude, recursive):
+                yield file_path
+        else:
+            yield path
+
+
+def run_parallel(func, jobs, workers, use_processes=False):
+    """Yield (file_path, result, error) of func(file_path, *args) for (file_path, args) jobs."""
+    executor_class = ThreadPoolExecutor
+    if use_processes:
+        # process pool machinery takes a third of startup time, import on demand
+        from concurrent.futures import ProcessPoolExecutor as executor_class
+    with executor_class(max_workers=workers) as executor:
+        futures = {executor.submit(func, path, *args): path for path, args in jobs}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e) or repr(e)
+
+
+def record_row(f):
+    return dict(
+        file=f.file_path,
+        model=f.model,
+        datetime_original=f.datetime_original,
+        lat=f.lat,
+        lon=f.lon,
+        dest_lat=f.dest_lat,
+        dest_lon=f.dest_lon,
+    )
+
+
+def write_rows(rows, output_format, fp):
+    if output_format == "csv":
+        writer = csv.DictWriter(fp, FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    elif output_format == "json":
+        json.dump(rows, fp, indent=1)
+        fp.write("\n")
+    else:
+        features = []
+        for row in rows:
+            geometry = None
+            if row["lat"] is not None and row["lon"] is not None:
+                geometry = {"type": "Point", "coordinates": [row["lon"], row["lat"]]}
+            properties = {k: v for k, v in row.items() if k not in ("lat", "lon")}
+            features.append({"type": "Feature", "geometry": geometry, "properties": properties})
+        json.dump({"type": "FeatureCollection", "features": features}, fp, indent=1)
+        fp.write("\n")
+
+
+def command_scan(args):
+    paths = iter_paths(
+        args.paths,
+        photostore.split_patterns(args.include),
+        photostore.split_patterns(args.exclude),
+        not args.no_recursive,
+    )
+    rows = []
+    errors = 0
+    jobs = ((path, ()) for path in paths)
+    for path, f, error in run_parallel(photostore.scan_photo, jobs, args.workers, args.processes):
+        if error:
+            errors += 1
+            print(f"{path}: {error}", file=sys.stderr)
+            continue
+        rows.append(record_row(f))
+    rows.sort(key=lambda row: row["file"])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as fp:
+            write_rows(rows, args.format, fp)
+    else:
+        write_rows(rows, args.format, sys.stdout)
+    print(f"{len(rows)} photos scanned, {errors} errors", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def _number(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def read_coordinates(path, base_dir):
+    """
+    List of (file_path, lat, lon, dest_lat, dest_lon) from CSV with header or GeoJSON.
+    GeoJSON features are points with file in properties, destination may be
+    given as dest_lat, dest_lon properties. Relative file paths start at base_dir.
+    """
+    result = []
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+        for feature in data.get("features", []):
+            properties = feature.get("properties") or dict()
+            geometry = feature.get("geometry") or dict()
+            lat = lon = None
+            if geometry.get("type") == "Point":
+                lon, lat = geometry["coordinates"][:2]
+            file_name = next((properties[k] for k in FILE_COLUMNS if properties.get(k)), None)
+            if file_name is None:
+                raise ValueError(f"{path}: feature without file property")
+            result.append(
+                (
+                    file_name,
+                    _number(lat),
+                    _number(lon),
+                    _number(properties.get("dest_lat")),
+                    _number(properties.get("dest_lon")),
+                )
+            )
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as fp:
+            reader = csv.DictReader(fp)
+            columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+            file_column = next((columns[k] for k in FILE_COLUMNS if k in columns), None)
+            if file_column is None:
+                raise ValueError(f"{path}: no file column")
+            for row in reader:
+                values = [_number(row[columns[k]]) if k in columns else None for k in FIELDS[3:]]
+                result.append((row[file_column], *values))
+    return [
+        (os.path.join(base_dir, file_name),) + tuple(values)
+        for file_name, *values in result
+    ]
+
+
+def apply_file(file_path, lat, lon, dest_lat, dest_lon, dry_run=False):
+    """
+    Write new coordinates as the GUI saves them: heading is calculated from
+    latest position and destination, values missing in input are taken from file.
+    """
+    f = photostore.scan_photo(file_path)
+    if lat is not None and lon is not None:
+        f.set_position(lat, lon)
+    if dest_lat is not None and dest_lon is not None:
+        f.set_dest(dest_lat, dest_lon)
+    job = f.save_job()
+    if job is not None and not dry_run:
+        geoexif.write_gps_exif(file_path, **job)
+    return job
+
+
+def heading_file(file_path, dry_run=False):
+    """
+    Write image direction from coordinates in file, None if file has no
+    destination or is not writable.
+    """
+    f = photostore.scan_photo(file_path)
+    if not f.is_writable:
+        return None
+    lat, lon = f.position()
+    dest_lat, dest_lon = f.dest()
+    if None in (lat, lon, dest_lat, dest_lon):
+        return None
+    direction = geoexif.calculate_heading(lat, lon, dest_lat, dest_lon)
+    if not dry_run:
+        geoexif.write_gps_exif(file_path, direction=direction)
+    return direction
+
+
+def report_writes(results, verb):
+    written = skipped = errors = 0
+    for path, result, error in results:
+        if error:
+            errors += 1
+            print(f"{path}: {error}", file=sys.stderr)
+        elif result is None:
+            skipped += 1
+        else:
+            written += 1
+    print(f"{written} files {verb}, {skipped} skipped, {errors} errors", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def command_apply(args):
+    base_dir = args.base or os.path.dirname(os.path.abspath(args.coordinates))
+    # one job per file, later rows win: parallel writes to one file would race
+    rows = {row[0]: row[1:] for row in read_coordinates(args.coordinates, base_dir)}
+    jobs = ((path, values + (args.dry_run,)) for path, values in rows.items())
+    verb = "to write" if args.dry_run else "written"
+    return report_writes(run_parallel(apply_file, jobs, args.workers), verb)
+
+
+def command_heading(args):
+    paths = iter_paths(args.paths, recursive=not args.no_recursive)
+    jobs = ((path, (args.dry_run,)) for path in paths)
+    verb = "to write" if args.dry_run else "written"
+    return report_writes(run_parallel(heading_file, jobs, args.workers), verb)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(subparser, folders=True):
+        subparser.add_argument(
+            "--workers", type=int, default=default_workers(), help="files processed in parallel"
+        )
+        if folders:
+            subparser.add_argument(
+                "--no-recursive", action="store_true", help="do not enter subfolders"
+            )
+
+    scan = subparsers.add_parser("scan", help="dump GPS and shooting time of photos")
+    scan.add_argument("paths", nargs="+", help="photo folders or files")
+    scan.add_argument("--format", choices=("csv", "json", "geojson"), default="csv")
+    scan.add_argument("-o", "--output", help="output file, default stdout")
+    scan.add_argument("--include", default="", help="globs separated by ;")
+    scan.add_argument("--exclude", default="", help="globs separated by ;")
+    scan.add_argument(
+        "--processes", action="store_true", help="read exif in processes instead of threads"
+    )
+    add_common(scan)
+    scan.set_defaults(func=command_scan)
+
+    apply = subparsers.add_parser("apply", help="write coordinates from CSV or GeoJSON")
+    apply.add_argument(
+        "coordinates",
+        help="CSV with file, lat, lon, dest_lat, dest_lon columns or GeoJSON points",
+    )
+    apply.add_argument("--base", help="folder of relative file paths, default input folder")
+    apply.add_argument("--dry-run", action="store_true", help="check input, write nothing")
+    # input lists files, no folders to walk
+    add_common(apply, folders=False)
+    apply.set_defaults(func=command_apply)
+
+    heading = subparsers.add_parser(
+        "heading", help="write image direction from position and destination"
+    )
+    heading.add_argument("paths", nargs="+", help="photo folders or files")
+    heading.add_argument("--dry-run", action="store_true", help="write nothing")
+    add_common(heading)
+    heading.set_defaults(func=command_heading)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import os
+import time
+
+from photostore import MODIFIED_DEST, MODIFIED_POSITION
+from sqlitedb import open_db, subtree_range
+
+# append-only log of coordinate edits, rows of a file are deleted once saved to EXIF
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS edits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_path TEXT NOT NULL,
+    kind INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edits_file_path ON edits (file_path);
+"""
+
+
+class EditJournal:
+    """
+    Not saved coordinate edits in sqlite file, so they survive a crash.
+    Every edit is appended as it happens; on folder open the latest edit
+    of each file and kind (position or destination) is replayed.
+    kind is photostore.MODIFIED_POSITION or MODIFIED_DEST.
+    """
+
+    def __init__(self, db_path):
+        # edits come at human pace, one sync per edit is cheap and survives power loss
+        self.db = open_db(db_path, synchronous="FULL")
+        self.db.executescript(SCHEMA)
+        self.compact()
+
+    def close(self):
+        self.db.close()
+
+    def record(self, records, kind):
+        """Append current not saved value of kind for records, in one transaction."""
+        now = time.time()
+        if kind == MODIFIED_POSITION:
+            rows = [(f.file_path, kind, f.new_lat, f.new_lon, now) for f in records]
+        else:
+            rows = [(f.file_path, kind, f.new_dest_lat, f.new_dest_lon, now) for f in records]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO edits (file_path, kind, lat, lon, created) VALUES (?,?,?,?,?)",
+                rows,
+            )
+
+    def last_id(self):
+        (last,) = self.db.execute("SELECT coalesce(max(id), 0) FROM edits").fetchone()
+        return last
+
+    def pending(self, folder):
+        """Dict file_path: {kind: (lat, lon)} of latest edits of files in folder and subfolders."""
+        result = dict()
+        for file_path, kind, lat, lon in self.db.execute(
+            "SELECT file_path, kind, lat, lon FROM edits"
+            " WHERE file_path >= ? AND file_path < ? ORDER BY id",
+            subtree_range(folder),
+        ):
+            result.setdefault(file_path, dict())[kind] = (lat, lon)
+        return result
+
+    def replay(self, folder, records):
+        """Apply pending edits of folder to its records, return records changed."""
+        pending = self.pending(folder)
+        changed = []
+        for f in records:
+            edits = pending.get(f.file_path)
+            if edits is None or not f.is_writable:
+                continue
+            if MODIFIED_POSITION in edits:
+                f.set_position(*edits[MODIFIED_POSITION])
+            if MODIFIED_DEST in edits:
+                f.set_dest(*edits[MODIFIED_DEST])
+            changed.append(f)
+        return changed
+
+    def forget(self, file_paths, up_to_id):
+        """Drop edits of saved files; edits made after up_to_id were not saved yet."""
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM edits WHERE file_path = ? AND id <= ?",
+                [(file_path, up_to_id) for file_path in file_paths],
+            )
+
+    def forget_missing(self, folder, existing_paths):
+        """
+        Drop edits of files in folder which are deleted from disk.
+        existing_paths are files known to exist, e.g. just scanned; other
+        files are checked on disk, as scan may skip subfolders or filtered files.
+        """
+        missing = [
+            (p,)
+            for p in self.pending(folder)
+            if p not in existing_paths and not os.path.exists(p)
+        ]
+        if missing:
+            with self.db:
+                self.db.executemany("DELETE FROM edits WHERE file_path = ?", missing)
+
+    def compact(self):
+        """Keep only the latest edit of each file and kind."""
+        with self.db:
+            self.db.execute(
+                "DELETE FROM edits WHERE id NOT IN"
+                " (SELECT max(id) FROM edits GROUP BY file_path, kind)"
+            )
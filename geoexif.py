@@ -0,0 +1,656 @@
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from collections import namedtuple
+
+
+# APP1 with exif is placed right after SOI, so usually all we need is here
+HEADER_READ_SIZE = 64 * 1024
+
+# fields used by RaskladGeotag
+GpsExif = namedtuple(
+    "GpsExif", ["model", "datetime_original", "lat", "lon", "dest_lat", "dest_lon"]
+)
+
+TAG_MODEL = 0x0110
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_GPS_LATITUDE_REF = 0x0001
+TAG_GPS_LATITUDE = 0x0002
+TAG_GPS_LONGITUDE_REF = 0x0003
+TAG_GPS_LONGITUDE = 0x0004
+TAG_GPS_DEST_LATITUDE_REF = 0x0013
+TAG_GPS_DEST_LATITUDE = 0x0014
+TAG_GPS_DEST_LONGITUDE_REF = 0x0015
+TAG_GPS_DEST_LONGITUDE = 0x0016
+TAG_THUMBNAIL_OFFSET = 0x0201
+TAG_THUMBNAIL_LENGTH = 0x0202
+TAG_GPS_VERSION_ID = 0x0000
+TAG_GPS_IMG_DIRECTION_REF = 0x0010
+TAG_GPS_IMG_DIRECTION = 0x0011
+
+# tiff field type: size in bytes of one value
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+
+def dms_to_dd(dms, ref):
+    """Convert EXIF DMS tuple and N/S/E/W ref to decimal degrees."""
+    dd = dms[0] + dms[1] / 60 + dms[2] / 3600
+    if ref in ("S", "W"):
+        dd = -dd
+    return dd
+
+
+def dd_to_dms(dd):
+    """Convert decimal degrees to DMS tuple."""
+    dd = abs(dd)
+    degrees = int(dd)
+    minutes_float = (dd - degrees) * 60
+    minutes = int(minutes_float)
+    seconds = (minutes_float - minutes) * 60
+    return (degrees, minutes, seconds)
+
+
+def calculate_heading(lat1, lon1, lat2, lon2):
+    """Initial bearing from point 1 to point 2, degrees from true north."""
+    lat1 = math.radians(lat1)
+    lon1 = math.radians(lon1)
+    lat2 = math.radians(lat2)
+    lon2 = math.radians(lon2)
+
+    d_lon = lon2 - lon1
+
+    x = math.sin(d_lon) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(d_lon)
+
+    initial_bearing = math.atan2(x, y)
+    initial_bearing = math.degrees(initial_bearing)
+    compass_bearing = (initial_bearing + 360) % 360
+
+    return compass_bearing
+
+
+def find_exif_segment(fp):
+    """
+    Walk JPEG markers from SOI until APP1 Exif segment.
+    Return (offset of tiff header in file, tiff bytes), or None if file has no exif.
+    Raise ValueError for files that are not JPEG.
+    """
+    data = fp.read(HEADER_READ_SIZE)
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("not a JPEG file")
+
+    def ensure(end):
+        # rare case: big segments before APP1, read sequentially further
+        nonlocal data
+        if end > len(data):
+            data += fp.read(end - len(data))
+        if end > len(data):
+            raise ValueError("truncated JPEG segment")
+
+    pos = 2
+    while True:
+        ensure(pos + 4)
+        if data[pos] != 0xFF:
+            raise ValueError("JPEG marker expected at %d" % pos)
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):  # EOI or start of scan data, no exif
+            return None
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # markers without length
+            pos += 2
+            continue
+        (length,) = struct.unpack(">H", data[pos + 2 : pos + 4])
+        segment_end = pos + 2 + length
+        if marker == 0xE1:
+            ensure(pos + 10)
+            if data[pos + 4 : pos + 10] == b"Exif\x00\x00":
+                ensure(segment_end)
+                return pos + 10, data[pos + 10 : segment_end]
+        pos = segment_end
+
+
+class TiffReader:
+    """Minimal reader of tiff IFD structure inside exif block."""
+
+    def __init__(self, tiff):
+        self.tiff = tiff
+        if tiff[:2] == b"II":
+            self.endian = "<"
+        elif tiff[:2] == b"MM":
+            self.endian = ">"
+        else:
+            raise ValueError("bad tiff byte order")
+        if self.unpack("H", 2)[0] != 42:
+            raise ValueError("bad tiff magic")
+        self.ifd0_offset = self.unpack("I", 4)[0]
+
+    def unpack(self, fmt, offset):
+        fmt = self.endian + fmt
+        end = offset + struct.calcsize(fmt)
+        if end > len(self.tiff):
+            raise ValueError("tiff offset out of range")
+        return struct.unpack(fmt, self.tiff[offset:end])
+
+    def entries(self, ifd_offset):
+        """
+        Return dict tag: (type, count, value offset) for IFD.
+        Value offset points to inline value for small values.
+        """
+        (count,) = self.unpack("H", ifd_offset)
+        result = dict()
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag, field_type, value_count = self.unpack("HHI", entry)
+            size = TYPE_SIZES.get(field_type, 1) * value_count
+            if size <= 4:
+                value_offset = entry + 8
+            else:
+                (value_offset,) = self.unpack("I", entry + 8)
+            result[tag] = (field_type, value_count, value_offset)
+        return result
+
+    def next_ifd(self, ifd_offset):
+        (count,) = self.unpack("H", ifd_offset)
+        return self.unpack("I", ifd_offset + 2 + count * 12)[0]
+
+    def value(self, entry):
+        field_type, count, offset = entry
+        if field_type == 2:
+            raw = self.tiff[offset : offset + count]
+            return raw.split(b"\x00", 1)[0].decode("utf-8", "replace")
+        if field_type in (3, 4):
+            fmt = "H" if field_type == 3 else "I"
+            values = self.unpack(fmt * count, offset)
+            return values[0] if count == 1 else values
+        if field_type in (5, 10):
+            fmt = "II" if field_type == 5 else "ii"
+            raw = self.unpack(fmt * count, offset)
+            values = tuple(
+                raw[i] / raw[i + 1] if raw[i + 1] else 0.0 for i in range(0, len(raw), 2)
+            )
+            return values[0] if count == 1 else values
+        return self.tiff[offset : offset + TYPE_SIZES.get(field_type, 1) * count]
+
+
+def parse_gps_exif(tiff):
+    reader = TiffReader(tiff)
+    ifd0 = reader.entries(reader.ifd0_offset)
+
+    def get(ifd, tag):
+        if tag in ifd:
+            return reader.value(ifd[tag])
+        return None
+
+    model = get(ifd0, TAG_MODEL)
+    datetime_original = None
+    if TAG_EXIF_IFD in ifd0:
+        exif_ifd = reader.entries(get(ifd0, TAG_EXIF_IFD))
+        datetime_original = get(exif_ifd, TAG_DATETIME_ORIGINAL)
+
+    lat = lon = dest_lat = dest_lon = None
+    if TAG_GPS_IFD in ifd0:
+        gps_ifd = reader.entries(get(ifd0, TAG_GPS_IFD))
+        gps_latitude = get(gps_ifd, TAG_GPS_LATITUDE)
+        gps_longitude = get(gps_ifd, TAG_GPS_LONGITUDE)
+        if gps_latitude and gps_longitude:
+            lat = dms_to_dd(gps_latitude, get(gps_ifd, TAG_GPS_LATITUDE_REF))
+            lon = dms_to_dd(gps_longitude, get(gps_ifd, TAG_GPS_LONGITUDE_REF))
+            gps_dest_latitude = get(gps_ifd, TAG_GPS_DEST_LATITUDE)
+            gps_dest_longitude = get(gps_ifd, TAG_GPS_DEST_LONGITUDE)
+            if gps_dest_latitude and gps_dest_longitude:
+                dest_lat = dms_to_dd(
+                    gps_dest_latitude, get(gps_ifd, TAG_GPS_DEST_LATITUDE_REF)
+                )
+                dest_lon = dms_to_dd(
+                    gps_dest_longitude, get(gps_ifd, TAG_GPS_DEST_LONGITUDE_REF)
+                )
+    return GpsExif(model, datetime_original, lat, lon, dest_lat, dest_lon)
+
+
+def _iter_boxes(data, start, end):
+    """Yield (type, content start, box end) of ISO BMFF boxes in data[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos : pos + 8])
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", data[pos + 8 : pos + 16])
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise ValueError("bad HEIF box size")
+        yield box_type, pos + header_size, pos + size
+        pos += size
+
+
+def _uint(data, pos, size):
+    """Big endian unsigned int of 0, 2, 4 or 8 bytes, as used in iloc box."""
+    if size == 0:
+        return 0, pos
+    fmt = {2: ">H", 4: ">I", 8: ">Q"}.get(size)
+    if fmt is None:
+        raise ValueError("bad HEIF field size")
+    return struct.unpack(fmt, data[pos : pos + size])[0], pos + size
+
+
+def _heif_exif_location(meta):
+    """Find (file offset, length) of Exif item in content of HEIF meta box."""
+    exif_items = set()
+    locations = dict()
+    for box_type, start, end in _iter_boxes(meta, 4, len(meta)):
+        if box_type == b"iinf":
+            version = meta[start]
+            first = start + (6 if version == 0 else 8)
+            for infe_type, infe_start, _ in _iter_boxes(meta, first, end):
+                infe_version = meta[infe_start]
+                if infe_type != b"infe" or infe_version < 2:
+                    continue
+                if infe_version == 2:
+                    (item_id,) = struct.unpack(">H", meta[infe_start + 4 : infe_start + 6])
+                    item_type = meta[infe_start + 8 : infe_start + 12]
+                else:
+                    (item_id,) = struct.unpack(">I", meta[infe_start + 4 : infe_start + 8])
+                    item_type = meta[infe_start + 10 : infe_start + 14]
+                if item_type == b"Exif":
+                    exif_items.add(item_id)
+        elif box_type == b"iloc":
+            version = meta[start]
+            offset_size = meta[start + 4] >> 4
+            length_size = meta[start + 4] & 0x0F
+            base_offset_size = meta[start + 5] >> 4
+            index_size = meta[start + 5] & 0x0F if version in (1, 2) else 0
+            item_count, pos = _uint(meta, start + 6, 2 if version < 2 else 4)
+            for _ in range(item_count):
+                item_id, pos = _uint(meta, pos, 2 if version < 2 else 4)
+                construction_method = 0
+                if version in (1, 2):
+                    construction_method, pos = _uint(meta, pos, 2)
+                    construction_method &= 0x0F
+                pos += 2  # data reference index
+                base_offset, pos = _uint(meta, pos, base_offset_size)
+                extent_count, pos = _uint(meta, pos, 2)
+                extents = []
+                for _ in range(extent_count):
+                    _, pos = _uint(meta, pos, index_size)
+                    extent_offset, pos = _uint(meta, pos, offset_size)
+                    extent_length, pos = _uint(meta, pos, length_size)
+                    extents.append((base_offset + extent_offset, extent_length))
+                # only items stored in file as one extent are supported
+                if construction_method == 0 and len(extents) == 1:
+                    locations[item_id] = extents[0]
+    for item_id in exif_items:
+        if item_id in locations:
+            return locations[item_id]
+    return None
+
+
+def find_heif_exif(fp):
+    """
+    Read tiff bytes of Exif item of HEIF/HEIC file, or None if file has no exif.
+    Raise ValueError for files that are not HEIF.
+    """
+    head = fp.read(HEADER_READ_SIZE)
+    if head[4:8] != b"ftyp":
+        raise ValueError("not a HEIF file")
+    pos = 0
+    while True:
+        fp.seek(pos)
+        header = fp.read(16)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", header[8:16])
+            header_size = 16
+        if size == 0:  # last box, up to end of file
+            size = os.fstat(fp.fileno()).st_size - pos
+        if size < header_size:
+            raise ValueError("bad HEIF box size")
+        if box_type == b"meta":
+            fp.seek(pos + header_size)
+            meta = fp.read(size - header_size)
+            break
+        pos += size
+
+    location = _heif_exif_location(meta)
+    if location is None:
+        return None
+    offset, length = location
+    fp.seek(offset)
+    item = fp.read(length)
+    # Exif item starts with offset to tiff header, usually past "Exif\0\0"
+    (tiff_offset,) = struct.unpack(">I", item[:4])
+    return item[4 + tiff_offset :]
+
+
+def read_gps_exif(file_path):
+    """
+    Fast reader: parse only exif block of the file, never load image data.
+    Reads JPEG APP1 segment, HEIF Exif item and IFDs of TIFF file.
+    Raise ValueError for files it can not understand.
+    """
+    with open(file_path, "rb") as fp:
+        magic = fp.read(8)
+        fp.seek(0)
+        try:
+            if magic[:4] in (b"II*\x00", b"MM\x00*"):
+                # tiff IFDs may be anywhere in big file, let OS page in what is needed
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as tiff:
+                    return parse_gps_exif(tiff)
+            if magic[4:8] == b"ftyp":
+                tiff = find_heif_exif(fp)
+            else:
+                segment = find_exif_segment(fp)
+                tiff = segment[1] if segment is not None else None
+            if tiff is None:
+                return GpsExif(None, None, None, None, None, None)
+            return parse_gps_exif(tiff)
+        except (struct.error, IndexError) as e:
+            raise ValueError(str(e))
+
+
+def read_exif_thumbnail(file_path):
+    """
+    Return bytes of JPEG thumbnail embedded in IFD1 of JPEG exif, or None.
+    Camera thumbnails are about 160x120 and sit in the file head,
+    so this is a single small read.
+    """
+    try:
+        with open(file_path, "rb") as fp:
+            segment = find_exif_segment(fp)
+        if segment is None:
+            return None
+        tiff = segment[1]
+        reader = TiffReader(tiff)
+        ifd1_offset = reader.next_ifd(reader.ifd0_offset)
+        if ifd1_offset == 0:
+            return None
+        ifd1 = reader.entries(ifd1_offset)
+        if TAG_THUMBNAIL_OFFSET not in ifd1 or TAG_THUMBNAIL_LENGTH not in ifd1:
+            return None
+        offset = reader.value(ifd1[TAG_THUMBNAIL_OFFSET])
+        length = reader.value(ifd1[TAG_THUMBNAIL_LENGTH])
+    except (OSError, ValueError, struct.error):
+        return None
+    thumbnail = tiff[offset : offset + length]
+    if len(thumbnail) != length or thumbnail[:2] != b"\xff\xd8":
+        return None
+    return thumbnail
+
+
+def read_gps_exif_fallback(file_path):
+    """Slow reader using exif library, loads whole file."""
+    # imported on first use: exif library takes longer to import than most scans
+    import exif
+
+    with open(file_path, "rb") as image_file:
+        img = exif.Image(image_file)
+    model = img.get("model")
+    datetime_original = img.get("datetime_original")
+    lat = lon = dest_lat = dest_lon = None
+    if img.has_exif and img.get("gps_latitude") and img.get("gps_longitude"):
+        lat = dms_to_dd(img.gps_latitude, img.get("gps_latitude_ref"))
+        lon = dms_to_dd(img.gps_longitude, img.get("gps_longitude_ref"))
+        if img.get("gps_dest_latitude") and img.get("gps_dest_longitude"):
+            dest_lat = dms_to_dd(img.gps_dest_latitude, img.get("gps_dest_latitude_ref"))
+            dest_lon = dms_to_dd(
+                img.gps_dest_longitude, img.get("gps_dest_longitude_ref")
+            )
+    return GpsExif(model, datetime_original, lat, lon, dest_lat, dest_lon)
+
+
+# writer
+
+
+def _rational_bytes(endian, values, denominators):
+    packed = []
+    for value, denominator in zip(values, denominators):
+        packed += [int(round(value * denominator)), denominator]
+    return struct.pack(endian + "I" * len(packed), *packed)
+
+
+def gps_entries(endian, lat=None, lon=None, dest_lat=None, dest_lon=None, direction=None):
+    """
+    Build GPS IFD entries for new values.
+    Return dict tag: (type, count, raw value bytes).
+    """
+    entries = dict()
+
+    def ascii(text):
+        return (2, 2, text.encode("ascii") + b"\x00")
+
+    def dms(dd):
+        return (5, 3, _rational_bytes(endian, dd_to_dms(dd), (1, 1, 10000)))
+
+    if lat is not None and lon is not None:
+        entries[TAG_GPS_LATITUDE_REF] = ascii("N" if lat >= 0 else "S")
+        entries[TAG_GPS_LATITUDE] = dms(lat)
+        entries[TAG_GPS_LONGITUDE_REF] = ascii("E" if lon >= 0 else "W")
+        entries[TAG_GPS_LONGITUDE] = dms(lon)
+    if dest_lat is not None and dest_lon is not None:
+        entries[TAG_GPS_DEST_LATITUDE_REF] = ascii("N" if dest_lat >= 0 else "S")
+        entries[TAG_GPS_DEST_LATITUDE] = dms(dest_lat)
+        entries[TAG_GPS_DEST_LONGITUDE_REF] = ascii("E" if dest_lon >= 0 else "W")
+        entries[TAG_GPS_DEST_LONGITUDE] = dms(dest_lon)
+    if direction is not None:
+        entries[TAG_GPS_IMG_DIRECTION_REF] = ascii("T")  # 'T' for true north
+        entries[TAG_GPS_IMG_DIRECTION] = (5, 1, _rational_bytes(endian, (direction,), (100,)))
+    return entries
+
+
+def build_ifd(endian, entries, base_offset, next_ifd=0):
+    """
+    Serialize IFD placed at base_offset of tiff block.
+    Values which do not fit into entry are placed right after the IFD.
+    """
+    tags = sorted(entries)
+    values_offset = base_offset + 2 + 12 * len(tags) + 4
+    ifd = struct.pack(endian + "H", len(tags))
+    values = b""
+    for tag in tags:
+        field_type, count, raw = entries[tag]
+        if len(raw) <= 4:
+            ifd += struct.pack(endian + "HHI", tag, field_type, count) + raw.ljust(4, b"\x00")
+        else:
+            ifd += struct.pack(
+                endian + "HHII", tag, field_type, count, values_offset + len(values)
+            )
+            values += raw
+            if len(values) % 2:
+                values += b"\x00"  # values start on word boundary
+    ifd += struct.pack(endian + "I", next_ifd)
+    return ifd + values
+
+
+def _raw_entries(reader, ifd_offset):
+    entries = dict()
+    for tag, (field_type, count, value_offset) in reader.entries(ifd_offset).items():
+        size = TYPE_SIZES.get(field_type, 1) * count
+        entries[tag] = (field_type, count, reader.tiff[value_offset : value_offset + size])
+    return entries
+
+
+def _ifd_span(reader, ifd_offset):
+    """List of (start, end) byte ranges used by IFD and its values."""
+    (count,) = reader.unpack("H", ifd_offset)
+    spans = [(ifd_offset, ifd_offset + 2 + 12 * count + 4)]
+    for field_type, value_count, value_offset in reader.entries(ifd_offset).values():
+        size = TYPE_SIZES.get(field_type, 1) * value_count
+        if size > 4:
+            spans.append((value_offset, value_offset + size))
+    return spans
+
+
+def _contiguous_region(spans):
+    """Merge spans into one region, allow 1 byte alignment gaps. None if not contiguous."""
+    spans = sorted(spans)
+    start, end = spans[0]
+    for span_start, span_end in spans[1:]:
+        if span_start > end + 1:
+            return None
+        end = max(end, span_end)
+    return start, end
+
+
+def _gps_region(reader, ifd0_offset, gps_offset):
+    """Region of existing GPS IFD which can be reused, or None."""
+    region = _contiguous_region(_ifd_span(reader, gps_offset))
+    if region is None:
+        return None
+    # make sure nothing else lives inside
+    others = _ifd_span(reader, ifd0_offset)
+    ifd0 = reader.entries(ifd0_offset)
+    if TAG_EXIF_IFD in ifd0:
+        others += _ifd_span(reader, reader.value(ifd0[TAG_EXIF_IFD]))
+    ifd1_offset = reader.next_ifd(ifd0_offset)
+    if ifd1_offset:
+        others += _ifd_span(reader, ifd1_offset)
+    for start, end in others:
+        if start < region[1] and end > region[0]:
+            return None
+    return region
+
+
+def _new_tiff(endian, gps):
+    """Minimal tiff block with IFD0 holding only GPS IFD pointer."""
+    byte_order = b"II" if endian == "<" else b"MM"
+    header = byte_order + struct.pack(endian + "HI", 42, 8)
+    ifd0 = build_ifd(
+        endian, {TAG_GPS_IFD: (4, 1, struct.pack(endian + "I", 0))}, 8
+    )
+    gps_offset = 8 + len(ifd0)
+    ifd0 = build_ifd(
+        endian, {TAG_GPS_IFD: (4, 1, struct.pack(endian + "I", gps_offset))}, 8
+    )
+    return header + ifd0 + build_ifd(endian, gps, gps_offset)
+
+
+def _append_gps(reader, gps):
+    """
+    Return new tiff block: old block untouched plus new GPS IFD at the end.
+    Existing data is not moved, so all offsets inside the block stay valid.
+    """
+    endian = reader.endian
+    tiff = bytearray(reader.tiff)
+    if len(tiff) % 2:
+        tiff += b"\x00"
+    ifd0_offset = reader.ifd0_offset
+    ifd0 = reader.entries(ifd0_offset)
+    if TAG_GPS_IFD in ifd0:
+        gps_offset = len(tiff)
+        tiff += build_ifd(endian, gps, gps_offset)
+        pointer = ifd0[TAG_GPS_IFD][2]
+        tiff[pointer : pointer + 4] = struct.pack(endian + "I", gps_offset)
+        return bytes(tiff)
+
+    # no GPS pointer in IFD0: relocate IFD0 with extra entry to the end
+    entries = _raw_entries(reader, ifd0_offset)
+    entries[TAG_GPS_IFD] = (4, 1, struct.pack(endian + "I", 0))
+    next_ifd = reader.next_ifd(ifd0_offset)
+    new_ifd0_offset = len(tiff)
+    new_ifd0 = build_ifd(endian, entries, new_ifd0_offset, next_ifd)
+    gps_offset = new_ifd0_offset + len(new_ifd0)
+    entries[TAG_GPS_IFD] = (4, 1, struct.pack(endian + "I", gps_offset))
+    tiff += build_ifd(endian, entries, new_ifd0_offset, next_ifd)
+    tiff += build_ifd(endian, gps, gps_offset)
+    tiff[4:8] = struct.pack(endian + "I", new_ifd0_offset)
+    return bytes(tiff)
+
+
+def _app1_insert_position(file_path):
+    """Position after SOI and JFIF APP0, where new APP1 goes."""
+    with open(file_path, "rb") as fp:
+        head = fp.read(4 + 65535)
+    pos = 2
+    if head[2:4] == b"\xff\xe0":
+        (length,) = struct.unpack(">H", head[4:6])
+        pos = 4 + length
+    return pos
+
+
+def _replace_segment(file_path, start, end, new_segment):
+    """
+    Write file head, new segment and stream copy of everything after
+    old segment to temp file, then atomically replace the original.
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".rasklad_", suffix=".tmp", dir=folder)
+    try:
+        with open(file_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            dst.write(src.read(start))
+            dst.write(new_segment)
+            src.seek(end)
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_gps_exif(file_path, lat=None, lon=None, dest_lat=None, dest_lon=None, direction=None):
+    """
+    Write GPS tags touching only the APP1 exif segment.
+    Image data is never rewritten in place: if new GPS IFD fits into the old one,
+    only those bytes are patched; otherwise the file is rebuilt as
+    head + new APP1 + byte copy of the rest, and atomically renamed.
+    Return "patched" or "rewritten".
+    """
+    with open(file_path, "rb") as fp:
+        segment = find_exif_segment(fp)
+
+    if segment is None:
+        tiff = _new_tiff("<", gps_entries("<", lat, lon, dest_lat, dest_lon, direction))
+        app1 = b"\xff\xe1" + struct.pack(">H", 8 + len(tiff)) + b"Exif\x00\x00" + tiff
+        position = _app1_insert_position(file_path)
+        _replace_segment(file_path, position, position, app1)
+        return "rewritten"
+
+    tiff_offset, tiff = segment
+    try:
+        reader = TiffReader(tiff)
+        endian = reader.endian
+        ifd0 = reader.entries(reader.ifd0_offset)
+        gps = dict()
+        gps_offset = None
+        if TAG_GPS_IFD in ifd0:
+            gps_offset = reader.value(ifd0[TAG_GPS_IFD])
+            gps = _raw_entries(reader, gps_offset)
+        gps.setdefault(TAG_GPS_VERSION_ID, (1, 4, b"\x02\x02\x00\x00"))
+        gps.update(gps_entries(endian, lat, lon, dest_lat, dest_lon, direction))
+
+        region = None
+        if gps_offset is not None:
+            region = _gps_region(reader, reader.ifd0_offset, gps_offset)
+    except struct.error as e:
+        raise ValueError(str(e))
+
+    if region is not None:
+        start, end = region
+        start += start % 2
+        blob = build_ifd(endian, gps, start)
+        if start + len(blob) <= end:
+            with open(file_path, "r+b") as fp:
+                fp.seek(tiff_offset + start)
+                fp.write(blob.ljust(end - start, b"\x00"))
+                if start != gps_offset:
+                    fp.seek(tiff_offset + ifd0[TAG_GPS_IFD][2])
+                    fp.write(struct.pack(endian + "I", start))
+            return "patched"
+
+    new_tiff = _append_gps(reader, gps)
+    if len(new_tiff) + 8 > 0xFFFF:
+        raise ValueError("exif segment does not fit into 64 KB APP1")
+    app1 = b"\xff\xe1" + struct.pack(">H", 8 + len(new_tiff)) + b"Exif\x00\x00" + new_tiff
+    _replace_segment(file_path, tiff_offset - 10, tiff_offset + len(tiff), app1)
+    return "rewritten"
@@ -1,5 +1,10 @@
 import sys
 import os
+import time
+
+# startup timings are measured from here, see RaskladGeotag.mark_startup()
+STARTUP_CLOCK = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -7,8 +12,8 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QWidget,
     QLabel,
     QSizePolicy,
@@ -24,6 +29,8 @@ from PyQt6.QtWidgets import (
     QFrame,
      QTabWidget,
     QGroupBox,
+    QSpinBox,
+    QDialogButtonBox,
 )
 from PyQt6.QtCore import (
     Qt,
@@ -34,30 +41,80 @@ from PyQt6.QtCore import (
     QEvent,
     QSettings,
     QRectF,
+    QThread,
+    QStandardPaths,
+    QFileSystemWatcher,
+    QTimer,
+    QAbstractTableModel,
+    QSortFilterProxyModel,
+    QModelIndex,
+    QSize,
+    QBuffer,
+    QByteArray,
+    QIODevice,
+)
+from PyQt6.QtGui import (
+    QPixmap,
+    QKeyEvent,
+    QAction,
+    QPainter,
+    QBrush,
+    QColor,
+    QImage,
+    QImageReader,
+)
+import json
+import multiprocessing
+import queue
+import sqlite3
+import traceback
+from concurrent.futures import (
+    BrokenExecutor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
 )
-from PyQt6.QtGui import QPixmap, QKeyEvent, QAction, QPainter, QBrush, QColor
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEnginePage
-from PyQt6.QtWebChannel import QWebChannel
-import exif
-import shapely.wkt
-import shapely.geometry
-import math
-from datetime import datetime
-
 
-class CustomWebEnginePage(QWebEnginePage):
-    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
-        print(f"JavaScript console message: {message} (line: {line_number})")
+import editjournal
+import geoexif
+import mapoverview
+import metacache
+import photostore
+import previewcache
+import thumbcache
+import tilecache
+import tracing
+from photostore import MODIFIED_DEST, MODIFIED_POSITION
 
 
 class JavaScriptHandler(QObject):
     coordinatesUpdated = pyqtSignal(str, str)
+    # JSON scene update for the map page, see applyScene() in MapWidget html
+    sceneUpdated = pyqtSignal(str)
+    # JSON overview layer data, see applyOverview()
+    overviewUpdated = pyqtSignal(str)
+    ready = pyqtSignal()
+    viewportUpdated = pyqtSignal(float, float, float, float, int)
+    tilesLoaded = pyqtSignal()
 
     @pyqtSlot(str, str)
+    @tracing.instrument("js_bridge", "coordinates")
     def coordinatesUpdatedSlot(self, lat, lng):
         self.coordinatesUpdated.emit(lat, lng)
 
+    @pyqtSlot()
+    def mapReady(self):
+        self.ready.emit()
+
+    @pyqtSlot(float, float, float, float, int)
+    @tracing.instrument("js_bridge", "viewport")
+    def viewportChanged(self, south, west, north, east, zoom):
+        self.viewportUpdated.emit(south, west, north, east, zoom)
+
+    @pyqtSlot()
+    def tileLayerLoaded(self):
+        self.tilesLoaded.emit()
+
 
 class CustomProgressBar(QProgressBar):
     def paintEvent(self, event):
@@ -90,118 +147,768 @@ class CustomProgressBar(QProgressBar):
         painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, f"{self.value()}%")
 
 
-class MapWidget(QWebEngineView):
-    def __init__(self):
+class FolderScanWorker(QObject):
+    """
+    Read exif of photo files in folder and subfolders using thread or process pool.
+    Files are submitted to the pool while directories are still being walked.
+    Files unchanged since previous scan are taken from metadata cache.
+    Lives in own QThread, results are sent to GUI thread in batches.
+    Directories walked are in directories list once finished is emitted.
+    """
+
+    batchReady = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool)  # True if scan was cancelled
+
+    def __init__(
+        self,
+        folder_path,
+        workers,
+        use_processes=False,
+        batch_size=200,
+        cache_path=None,
+        cache_max_bytes=metacache.DEFAULT_MAX_BYTES,
+        rebuild_cache=False,
+        recursive=True,
+        include=(),
+        exclude=(),
+    ):
         super().__init__()
-        self.setPage(CustomWebEnginePage(self))
-        self.channel = QWebChannel()
-        self.jsHandler = JavaScriptHandler()
+        self.folder_path = folder_path
+        self.workers = workers
+        self.use_processes = use_processes
+        self.batch_size = batch_size
+        self.cache_path = cache_path
+        self.cache_max_bytes = cache_max_bytes
+        self.rebuild_cache = rebuild_cache
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.directories = []
+        self._cancelled = False
+        self._batch = []
+        self._last_emit = 0.0
+
+    def cancel(self):
+        self._cancelled = True
+
+    def add_result(self, f, done, total, force=False):
+        if f is not None:
+            self._batch.append(f)
+        # flush by size or by time, so table fills smoothly on slow disks
+        if self._batch and (
+            force
+            or len(self._batch) >= self.batch_size
+            or time.monotonic() - self._last_emit > 0.25
+        ):
+            self.batchReady.emit(self._batch)
+            self.progress.emit(done, total)
+            self._batch = []
+            self._last_emit = time.monotonic()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self.scan()
+        except Exception:
+            # nobody catches it in worker thread, window still has to hear the end
+            traceback.print_exc()
+        finally:
+            self.finished.emit(self._cancelled)
+
+    def scan(self):
+        self.progress.emit(0, 0)
+
+        # sqlite connection must be created in this thread
+        cache = None
+        cached_rows = dict()
+        if self.cache_path:
+            try:
+                with tracing.span("load_cache", "scan"):
+                    cache = metacache.MetadataCache(self.cache_path, self.cache_max_bytes)
+                    if self.rebuild_cache:
+                        cache.clear(self.folder_path)
+                    cached_rows = cache.load_folder(self.folder_path, self.recursive)
+            except sqlite3.Error as e:
+                print("metadata cache error " + str(e))
+                cache = None
+
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        executor = executor_class(max_workers=self.workers)
+        # bounded, so a huge tree is not queued in memory up front
+        max_pending = self.workers * 8
+        pending = 0
+        completed = queue.SimpleQueue()
+        future_paths = dict()
+        scanned = []
+        seen_paths = set()
+        total = 0
+        done = 0
+        self._last_emit = time.monotonic()
+        walk_span = tracing.span("walk_and_read", "scan", folder=self.folder_path)
+        walk_span.__enter__()
+
+        def collect(block):
+            nonlocal done, pending
+            while pending and (block or not completed.empty()):
+                future = completed.get()
+                block = False
+                pending -= 1
+                path = future_paths.pop(future)
+                try:
+                    f = future.result()
+                except Exception as e:
+                    # also a crashed pool process or a result failed to pickle
+                    print(f"scan error {path}: {e!r}")
+                    f = None
+                if f is not None:
+                    scanned.append(f)
+                done += 1
+                self.add_result(f, done, total)
+
+        try:
+            for path, stat in photostore.iter_photo_files(
+                self.folder_path, self.include, self.exclude, self.recursive, self.directories
+            ):
+                if self._cancelled:
+                    break
+                seen_paths.add(path)
+                total += 1
+                row = cached_rows.get(path)
+                if row is not None and metacache.MetadataCache.is_valid(row, stat):
+                    done += 1
+                    self.add_result(
+                        metacache.MetadataCache.record_from_row(row, stat), done, total
+                    )
+                    continue
+                try:
+                    future = executor.submit(photostore.scan_photo, path)
+                except BrokenExecutor as e:
+                    # a crashed process breaks the whole pool, rest is read in threads
+                    print("scan pool error " + str(e))
+                    executor.shutdown(wait=False)
+                    executor = ThreadPoolExecutor(max_workers=self.workers)
+                    future = executor.submit(photostore.scan_photo, path)
+                future_paths[future] = path
+                future.add_done_callback(completed.put)
+                pending += 1
+                collect(block=pending >= max_pending)
+            while pending and not self._cancelled:
+                collect(block=True)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            walk_span.__exit__(None, None, None)
+        if not self._cancelled:
+            self.add_result(None, done, total, force=True)
+
+        if cache is not None:
+            try:
+                with tracing.span("store_cache", "scan"):
+                    cache.store(scanned)
+                    if not self._cancelled:
+                        cache.forget_missing(self.folder_path, seen_paths, self.recursive)
+                    cache.touch({os.path.dirname(path) for path in seen_paths})
+                    cache.evict(keep_folder=self.folder_path)
+            except sqlite3.Error as e:
+                print("metadata cache error " + str(e))
+            cache.close()
+
+        self.progress.emit(done, total)
+
+
+class FolderRefreshWorker(QObject):
+    """
+    Find files added, removed or changed in opened folder since it was scanned,
+    and read exif of added and changed ones. Lives in own QThread, so a big
+    tree is walked off the GUI thread. known is {file_path: (size, mtime_ns)}
+    of records in the table when refresh started.
+    """
+
+    # dict(removed, changed, added, directories), or None if failed or cancelled
+    finished = pyqtSignal(object)
+
+    def __init__(self, folder_path, known, recursive=True, include=(), exclude=()):
+        super().__init__()
+        self.folder_path = folder_path
+        self.known = known
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        result = None
+        try:
+            result = self.refresh()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self.finished.emit(result)
+
+    def refresh(self):
+        directories = []
+        current = dict()
+        for path, stat in photostore.iter_photo_files(
+            self.folder_path, self.include, self.exclude, self.recursive, directories
+        ):
+            if self._cancelled:
+                return None
+            current[path] = stat
+        changed = []
+        added = []
+        for path, stat in current.items():
+            if self._cancelled:
+                return None
+            known = self.known.get(path)
+            if known is not None and known == (stat.st_size, stat.st_mtime_ns):
+                continue
+            try:
+                f = photostore.scan_photo(path)
+            except OSError as e:
+                # old stat is kept, so file is read again on next change
+                print("scan error " + str(e))
+                continue
+            (added if known is None else changed).append(f)
+        return dict(
+            removed=[path for path in self.known if path not in current],
+            changed=changed,
+            added=added,
+            directories=directories,
+        )
 
-        self.channel.registerObject("jsHandler", self.jsHandler)
-        self.page().setWebChannel(self.channel)
-
-        self.setHtml(self.get_initial_map())
-
-    def get_initial_map(self):
-        leaflet_html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Leaflet Map</title>
-            <meta charset="utf-8" />
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
-            <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-            <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
-            <style> #map { width: 100%; height: 100%; } </style>
-        </head>
-        <body>
-            <div id="map" style="height: 500px;"></div>
-            <div id="coordinates">Coordinates: </div>
-            <script>
-                var map = L.map('map',{
-            wheelPxPerZoomLevel: 10 // Add this option
-        }).setView([55.666, 37.666], 11);
-                L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
-                    attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-                }).addTo(map);
 
-                
-                var markers = [];
-
-                new QWebChannel(qt.webChannelTransport, function(channel) {
-                    window.jsHandler = channel.objects.jsHandler;
-                    console.log("Channel initialized");
-                });
-
-                function removeMarkers() {
-                    //console.log("current count of markers "+markers.length+", start delete);
-                    for (var i = 0; i < markers.length; i++) {
-                        map.removeLayer(markers[i]);
-                        
-                    }
-                    // Clear the markers array
-                    markers = [];
-                    //console.log("after delete markers is  "+markers.length);
-                }
-                function addMarker(position, markerclass, draggable=true) {
-                   console.log("adding marker draggable = "+draggable);
-                    // Custom  icon
-                    var destIcon = L.icon({
-                        iconUrl: 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTAwIiBoZWlnaHQ9IjEwMCIgdmlld0JveD0iMCAwIDEwMCAxMDAiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxyZWN0IHg9IjMiIHk9IjMiIHdpZHRoPSI5NCIgaGVpZ2h0PSI5NCIgc3Ryb2tlPSJibGFjayIgc3Ryb2tlLXdpZHRoPSI2IiBzdHJva2UtbWl0ZXJsaW1pdD0iMi42MTMxMyIvPgo8cGF0aCBkPSJNNTAgMFYxMDAiIHN0cm9rZT0iYmxhY2siIHN0cm9rZS13aWR0aD0iMyIvPgo8cGF0aCBkPSJNMCA1MEMyLjgxNDA3IDUwIDY3LjgzOTIgNTAgMTAwIDUwIiBzdHJva2U9ImJsYWNrIiBzdHJva2Utd2lkdGg9IjMiLz4KPC9zdmc+Cg==', // Base64 encoded SVG
-                        iconSize: [20, 20],
-                        iconAnchor: [10, 10]
-                    });
-                    var imageIcon = L.icon({
-                        iconUrl: 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMzAiIGhlaWdodD0iMjAiIHZpZXdCb3g9IjAgMCAzMCAyMCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjMwIiBoZWlnaHQ9IjIwIiBmaWxsPSIjQjU2RDJEIi8+Cjwvc3ZnPgo=', // Base64 encoded SVG
-                        iconSize: [20, 20],
-                        iconAnchor: [10, 10]
-                    });
-
-                    // Create a marker at the the map
-                    if (markerclass==='dest'){var icon=destIcon};
-                    if (markerclass==='image'){var icon=imageIcon};
-                    var marker = L.marker(position, {
-                    draggable: draggable,
-                    autoPan: true,
-                    icon: icon
-                    }).addTo(map);
-                    
-
-                    marker.on('dragend', function(e) {
-                        var coords = e.target.getLatLng();
-                        document.getElementById('coordinates').innerText = "Coordinates: " + coords.lat.toFixed(7) + ", " + coords.lng.toFixed(7);
-                        if (window.jsHandler) {
-                            //console.log("Sending coordinates to channel: " + coords.lat.toFixed(4) + ", " + coords.lng.toFixed(4));
-                            window.jsHandler.coordinatesUpdatedSlot(coords.lat.toFixed(7), coords.lng.toFixed(7));
-                        } else {
-                            console.log("jsHandler is not defined");
-                        }
-                    });
-                    
-                    
-                    // Move marker to click location
-                    if (draggable) {
-                        map.on('click', function(e) {
-                            var clickCoords = e.latlng;
-                            marker.setLatLng(clickCoords);
-                            marker.fire('dragend', { target: marker });
-                            document.getElementById('coordinates').innerText = "Coordinates: " + clickCoords.lat.toFixed(7) + ", " + clickCoords.lng.toFixed(7);
-                        });
-                        }
-                    markers.push(marker); // array of markers to remove all markers
-                    }
-                    function move_to_favorite_place(position, zoom) {
-                        map.setView(position, zoom);
-                        removeMarkers();
-                        addMarker(position,'image');
-                    }
-                    
-            </script>
-        </body>
-        </html>
+class ExifSaveWorker(QObject):
+    """
+    Write GPS exif for list of jobs (file_path, write_gps_exif kwargs) in thread pool.
+    One bad file does not stop the batch, every file gets its own result.
+    """
+
+    fileSaved = pyqtSignal(str, str)  # file path, error message or empty string
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool)  # True if save was cancelled
+
+    def __init__(self, jobs, workers):
+        super().__init__()
+        self.jobs = jobs
+        self.workers = workers
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        total = len(self.jobs)
+        done = 0
+        self.progress.emit(done, total)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        write_gps_exif = tracing.traced(geoexif.write_gps_exif, "write_exif", "save")
+        try:
+            futures = {
+                executor.submit(write_gps_exif, file_path, **kwargs): file_path
+                for file_path, kwargs in self.jobs
+            }
+            reported = set()
+            for future in as_completed(futures):
+                if self._cancelled:
+                    break
+                self.report(future, futures[future])
+                reported.add(future)
+                done += 1
+                self.progress.emit(done, total)
+        finally:
+            # files already being written are finished, queued ones are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
+        if self._cancelled:
+            # written before or while cancelling: these files are changed on disk
+            for future, file_path in futures.items():
+                if future not in reported and not future.cancelled():
+                    self.report(future, file_path)
+                    done += 1
+            self.progress.emit(done, total)
+        self.finished.emit(self._cancelled)
+
+    def report(self, future, file_path):
+        try:
+            future.result()
+            self.fileSaved.emit(file_path, "")
+        except Exception as e:
+            self.fileSaved.emit(file_path, str(e) or repr(e))
+
+
+class TrackMatchWorker(QObject):
+    """
+    Read GPS track files and locate photo times on the merged track.
+    Lives in own QThread: a track of a million points takes seconds to parse.
+    """
+
+    progress = pyqtSignal(int, int)
+    # (lats, lons, matched, track points) or None, error message
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, track_paths, times, max_gap):
+        super().__init__()
+        self.track_paths = track_paths
+        self.times = times
+        self.max_gap = max_gap
+
+    @pyqtSlot()
+    def run(self):
+        import tracklog
+
+        total = len(self.track_paths)
+        self.progress.emit(0, total)
+        tracks = []
+        try:
+            for done, path in enumerate(self.track_paths, 1):
+                tracks.append(tracklog.read_track(path))
+                self.progress.emit(done, total)
+            track = tracklog.Track.concat(tracks)
+            lats, lons, matched = track.locate(self.times, self.max_gap)
+        except (OSError, ValueError) as e:
+            self.finished.emit(None, str(e))
+            return
+        self.finished.emit((lats, lons, matched, len(track)), "")
+
+
+@tracing.instrument("image", "decode")
+def decode_preview(file_path, size):
+    """
+    Decode image scaled to fit size. JPEG decoder scales in DCT domain,
+    so a 24 MP photo is never decoded at full resolution.
+    """
+    reader = QImageReader(file_path)
+    original = reader.size()
+    if original.isValid() and size.isValid():
+        scaled = original.scaled(size, Qt.AspectRatioMode.KeepAspectRatio)
+        if scaled.width() < original.width():
+            reader.setScaledSize(scaled)
+    return reader.read()
+
+
+@tracing.instrument("image", "encode_thumbnail")
+def encode_thumbnail(image):
+    """JPEG bytes of image scaled down to thumbnail size."""
+    limit = thumbcache.THUMBNAIL_SIZE
+    if image.width() > limit or image.height() > limit:
+        image = image.scaled(
+            limit,
+            limit,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "JPEG", 85)
+    return bytes(data)
+
+
+def make_thumbnail(thumb_cache, file_path, size, mtime_ns):
+    """Decode photo at thumbnail size and store it. Runs in thumbnail pool threads."""
+    limit = thumbcache.THUMBNAIL_SIZE
+    image = decode_preview(file_path, QSize(limit, limit))
+    if image.isNull():
+        return False
+    thumb_cache.store(file_path, size, mtime_ns, encode_thumbnail(image))
+    return True
+
+
+class ThumbnailWorker(QObject):
+    """
+    Fill on-disk thumbnail cache for scanned folder in thread pool,
+    then evict old thumbnails. Photos with cached thumbnail are skipped.
+    """
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool)  # True if cancelled
+
+    def __init__(self, thumb_cache, jobs, workers):
+        super().__init__()
+        self.thumb_cache = thumb_cache
+        self.jobs = jobs  # (file path, file size, mtime_ns)
+        self.workers = workers
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        jobs = [job for job in self.jobs if not self.thumb_cache.contains(*job)]
+        total = len(jobs)
+        done = 0
+        self.progress.emit(done, total)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [
+                executor.submit(make_thumbnail, self.thumb_cache, *job) for job in jobs
+            ]
+            for future in as_completed(futures):
+                if self._cancelled:
+                    break
+                try:
+                    future.result()
+                except OSError as e:
+                    print("thumbnail error " + str(e))
+                done += 1
+                if done % 20 == 0 or done == total:
+                    self.progress.emit(done, total)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        try:
+            self.thumb_cache.evict()
+        except OSError as e:
+            print("thumbnail cache error " + str(e))
+        self.finished.emit(self._cancelled)
+
+
+class PreviewWorker(QObject):
+    """
+    Decode previews in own QThread. QImage only, QPixmap is made in GUI thread.
+    Requests older than the latest one are skipped, so holding Space
+    does not queue decodes of photos already passed.
+    After the shown photo, read-ahead jobs fill preview cache
+    until a newer request comes.
+    Thumbnail from disk cache is shown first, exif thumbnail if there is none.
+    """
+
+    thumbnailReady = pyqtSignal(int, QImage)
+    previewReady = pyqtSignal(int, QImage)
+
+    def __init__(self, cache, thumb_cache=None):
+        super().__init__()
+        self.cache = cache
+        self.thumb_cache = thumb_cache
+        # written by GUI thread, read here before each step
+        self.latest_request = 0
+
+    @pyqtSlot(int, object, list)
+    def load(self, request_id, current, prefetch):
+        """
+        current and prefetch items are (cache key, file path, QSize),
+        cache key starts with file path, file size and mtime_ns.
         """
-        return leaflet_html
+        if current is not None:
+            key, file_path, size = current
+            if request_id != self.latest_request:
+                return
+            thumbnail = self.load_thumbnail(key[:3])
+            if not thumbnail.isNull():
+                self.thumbnailReady.emit(request_id, thumbnail)
+            if request_id != self.latest_request:
+                return
+            image = decode_preview(file_path, size)
+            if not image.isNull():
+                self.cache.put(key, image, image.sizeInBytes())
+                if self.thumb_cache is not None and not self.thumb_cache.contains(*key[:3]):
+                    try:
+                        self.thumb_cache.store(*key[:3], encode_thumbnail(image))
+                    except OSError as e:
+                        print("thumbnail cache error " + str(e))
+            self.previewReady.emit(request_id, image)
+        for key, file_path, size in prefetch:
+            if request_id != self.latest_request:
+                return  # user jumped elsewhere, read-ahead is stale
+            if key in self.cache:
+                continue
+            image = decode_preview(file_path, size)
+            if not image.isNull():
+                self.cache.put(key, image, image.sizeInBytes())
+
+    def load_thumbnail(self, thumb_key):
+        if self.thumb_cache is not None:
+            path = self.thumb_cache.get(*thumb_key)
+            if path is not None:
+                image = QImage(path)
+                if not image.isNull():
+                    return image
+        thumbnail = geoexif.read_exif_thumbnail(thumb_key[0])
+        if thumbnail is not None:
+            return QImage.fromData(thumbnail)
+        return QImage()
+
+
+class PhotoTableModel(QAbstractTableModel):
+    """Table model reading straight from mainfiles records."""
+
+    headers = ["Filename", "Create Date", "lat", "lon", "dest lat", "dest lon"]
+    keys = [None, None, "lat", "lon", "dest_lat", "dest_lon"]
+    modified_color = QColor("#a6d96a")
+    read_only_color = QColor("gray")
+
+    def __init__(self, files=None, parent=None):
+        super().__init__(parent)
+        self.files = files if files is not None else []
+        # file names in subfolders are shown relative to opened folder
+        self.root_folder = None
+        # record -> source row and file path -> record, rebuilt lazily
+        self._rows = None
+        self._by_path = None
+
+    def invalidate_index(self):
+        self._rows = None
+        self._by_path = None
+
+    def build_index(self):
+        self._rows = {id(f): row for row, f in enumerate(self.files)}
+        self._by_path = {f.file_path: f for f in self.files}
+
+    def row_of(self, f):
+        if self._rows is None:
+            self.build_index()
+        return self._rows.get(id(f), -1)
+
+    def file_by_path(self, file_path):
+        if self._by_path is None:
+            self.build_index()
+        return self._by_path.get(file_path)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.files)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    item_flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def flags(self, index):
+        return self.item_flags
+
+    def modified_value(self, f, key):
+        flag = MODIFIED_POSITION if key in ("lat", "lon") else MODIFIED_DEST
+        if f.modified & flag:
+            return getattr(f, "new_" + key)
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        f = self.files[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return self.display_name(f)
+            if column == 1:
+                return f.datetime_original
+            key = self.keys[column]
+            modified = self.modified_value(f, key)
+            if modified is not None:
+                return f"✔️ {modified}"
+            value = getattr(f, key)
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.BackgroundRole and column >= 2:
+            if self.modified_value(f, self.keys[column]) is not None:
+                return self.modified_color
+        if role == Qt.ItemDataRole.ForegroundRole and not f.is_writable:
+            return self.read_only_color
+        if role == Qt.ItemDataRole.ToolTipRole and column == 0 and not f.is_writable:
+            return "Read only: coordinates are saved to JPEG files only"
+        return None
+
+    def display_name(self, f):
+        if self.root_folder is None or f.folder == self.root_folder:
+            return f.file_name
+        return os.path.relpath(f.file_path, self.root_folder)
+
+    @tracing.instrument("table")
+    def set_files(self, files):
+        self.beginResetModel()
+        self.files = files
+        self.invalidate_index()
+        self.endResetModel()
+
+    @tracing.instrument("table")
+    def append_files(self, files):
+        if not files:
+            return
+        first = len(self.files)
+        self.beginInsertRows(QModelIndex(), first, first + len(files) - 1)
+        self.files.extend(files)
+        if self._rows is not None:
+            for row, f in enumerate(files, first):
+                self._rows[id(f)] = row
+                self._by_path[f.file_path] = f
+        self.endInsertRows()
+
+    def remove_files(self, file_paths):
+        """Remove records in place, so the list stays shared with mainfiles."""
+        rows = sorted(
+            self.row_of(f) for f in map(self.file_by_path, file_paths) if f is not None
+        )
+        for first, last in reversed(self.row_runs(rows)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.files[first : last + 1]
+            self.invalidate_index()
+            self.endRemoveRows()
+
+    @staticmethod
+    def row_runs(rows):
+        """Sorted rows to list of (first, last) ranges of consecutive rows."""
+        runs = []
+        for row in rows:
+            if runs and row == runs[-1][1] + 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+        return [tuple(run) for run in runs]
+
+    @tracing.instrument("table")
+    def refresh_files(self, files):
+        rows = sorted(row for row in map(self.row_of, files) if row >= 0)
+        for first, last in self.row_runs(rows):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def sort_key(self, column):
+        if column == 0:
+            return lambda f: (f.folder, f.file_name)
+        if column == 1:
+            return lambda f: (f.datetime_original or "", f.file_name)
+        key = self.keys[column]
+
+        def coordinate(f):
+            value = self.modified_value(f, key)
+            if value is None:
+                value = getattr(f, key)
+            if value is None:
+                return (1, 0.0)
+            return (0, value)
+
+        return coordinate
+
+    @tracing.instrument("table")
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # python list sort with key is much faster than proxy sort calling data()
+        if column < 0:
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_files = [self.files[index.row()] for index in old_indexes]
+        self.files.sort(
+            key=self.sort_key(column), reverse=order == Qt.SortOrder.DescendingOrder
+        )
+        self.build_index()
+        self.changePersistentIndexList(
+            old_indexes,
+            [
+                self.index(self.row_of(f), index.column())
+                for f, index in zip(old_files, old_indexes)
+            ],
+        )
+        self.layoutChanged.emit()
+
+
+class PhotoFilterProxyModel(QSortFilterProxyModel):
+    """Hide files with coordinates filter; sorting is done by source model."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hide_with_coords = False
+
+    def set_hide_with_coords(self, hide):
+        if hide != self.hide_with_coords:
+            self.hide_with_coords = hide
+            # one layout change instead of thousands of scattered row removals
+            self.invalidate()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.hide_with_coords:
+            return True
+        f = self.sourceModel().files[source_row]
+        return not f.has_coords()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def file_at(self, row):
+        return self.sourceModel().files[self.mapToSource(self.index(row, 0)).row()]
+
+
+class MapWidget(QWidget):
+    """
+    Map panel. The web view is built by load(), after the window is shown:
+    QtWebEngine import and Chromium start dominate startup time.
+    Placeholder covers the panel until the page reports it is ready.
+    Scenes sent before that are replayed when the page is ready.
+    """
+
+    # seconds from web view creation to first complete tile layer
+    firstPaint = pyqtSignal(float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.view = None
+        self.created = None
+        self.first_paint_seconds = None
+        self.jsHandler = JavaScriptHandler()
+        # page may load after first selection, replay last scene when it is ready
+        self.last_scene = None
+        self.jsHandler.ready.connect(self.replay_scene)
+        self.jsHandler.ready.connect(self.hide_placeholder)
+        self.jsHandler.tilesLoaded.connect(self.on_tiles_loaded)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.placeholder = QLabel("Loading map...", self)
+        self.placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.placeholder.setAutoFillBackground(True)
+        self.setMinimumSize(300, 300)
+
+    def load(self, tile_handler=None):
+        """Build web view and start loading the page, once."""
+        if self.view is not None:
+            return
+        import mapview
+
+        self.created = time.perf_counter()
+        self.view = mapview.MapView(self.jsHandler, tile_handler, self)
+        self.layout().addWidget(self.view)
+        # placeholder stays on top of the view, which needs real size for leaflet
+        self.placeholder.raise_()
+
+    def resizeEvent(self, event):
+        self.placeholder.setGeometry(self.rect())
+        super().resizeEvent(event)
+
+    def hide_placeholder(self):
+        self.placeholder.hide()
+
+    def reload_tiles(self):
+        if self.view is not None:
+            self.view.reload_tiles()
+
+    def on_tiles_loaded(self):
+        if self.first_paint_seconds is not None or self.created is None:
+            return
+        self.first_paint_seconds = time.perf_counter() - self.created
+        self.firstPaint.emit(self.first_paint_seconds)
+
+    @tracing.instrument("js_bridge", "scene")
+    def update_scene(self, scene):
+        """Send markers and view to the page in one message."""
+        self.last_scene = scene
+        self.jsHandler.sceneUpdated.emit(json.dumps(scene))
+
+    @tracing.instrument("js_bridge", "overview")
+    def update_overview(self, message):
+        self.jsHandler.overviewUpdated.emit(json.dumps(message))
+
+    def replay_scene(self):
+        if self.last_scene is not None:
+            self.jsHandler.sceneUpdated.emit(json.dumps(self.last_scene))
 
 
 class EditFavoritesDialog(QDialog):
@@ -301,9 +1008,69 @@ class EditFavoritesDialog(QDialog):
         settings.setValue("locationFavs", self.parent.locationFavs)
 
 
+class CameraMatchDialog(QDialog):
+    """Clock offset of each camera model and time tolerance for matching to tagged photos."""
+
+    def __init__(self, model_counts, offsets, tolerance, parent=None):
+        import tracklog
+
+        super().__init__(parent)
+        self.setWindowTitle("Match to tagged photos")
+        self.model_offsets = dict()
+        self.tolerance = tolerance
+        layout = QFormLayout()
+        layout.addRow(
+            QLabel(
+                "Camera clock ahead of clock of tagged photos, [-]HH:MM:SS.\n"
+                "Usually zero for the camera which tagged photos."
+            )
+        )
+        self.offset_edits = dict()
+        for model, (tagged, untagged) in sorted(model_counts.items()):
+            edit = QLineEdit(tracklog.format_offset(offsets.get(model, 0)))
+            self.offset_edits[model] = edit
+            layout.addRow(
+                f"{model or 'Unknown camera'} ({tagged} tagged, {untagged} not):", edit
+            )
+        self.tolerance_edit = QSpinBox()
+        self.tolerance_edit.setRange(1, 7 * 24 * 3600)
+        self.tolerance_edit.setSuffix(" s")
+        self.tolerance_edit.setValue(tolerance)
+        layout.addRow("Max time to tagged photo:", self.tolerance_edit)
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+        self.setLayout(layout)
+
+    def accept(self):
+        import tracklog
+
+        try:
+            self.model_offsets = {
+                model: tracklog.parse_offset(edit.text())
+                for model, edit in self.offset_edits.items()
+            }
+        except ValueError as e:
+            QMessageBox.warning(self, "Camera clock offset", str(e))
+            return
+        self.tolerance = self.tolerance_edit.value()
+        super().accept()
+
+
 class RaskladGeotag(QMainWindow):
+    previewRequested = pyqtSignal(int, object, list)
+
+    # reported when the last one is reached
+    STARTUP_STEPS = ("window_init", "window_shown", "map_created", "map_ready", "map_tiles")
+
     def __init__(self):
         super().__init__()
+        # seconds since STARTUP_CLOCK of startup steps
+        self.startup_times = dict()
+        self.mark_startup("window_init")
 
         self.setWindowTitle("Rasklad Geotag")
         self.setGeometry(100, 100, 800, 600)
@@ -311,6 +1078,89 @@ class RaskladGeotag(QMainWindow):
 
         self.mainfiles = []
         self.mainfile_selected = ""
+        self.folder_path = ""
+        self.scan_thread = None
+        self.scan_worker = None
+        self.save_thread = None
+        self.save_worker = None
+        self.save_records = dict()
+        self.save_errors = []
+        self.saved_records = []
+        self.saved_files_counter = 0
+        # save started by write-behind timer, not by the button
+        self.save_background = False
+        self.save_journal_id = 0
+
+        # edits are journaled as they happen and replayed when folder is opened again
+        self.journal = None
+        try:
+            self.journal = editjournal.EditJournal(self.journal_path())
+        except (OSError, sqlite3.Error) as e:
+            print("edit journal error " + str(e))
+        # write-behind: changed files are saved after some idle seconds, see settings
+        self.write_behind_failed = set()
+        self.write_behind_timer = QTimer(self)
+        self.write_behind_timer.setSingleShot(True)
+        self.write_behind_timer.timeout.connect(self.write_behind)
+
+        # image preview is decoded off the GUI thread, newest request wins
+        self.preview_request = 0
+        self.preview_thread = QThread(self)
+        self.preview_cache = previewcache.PreviewCache(self.preview_cache_bytes())
+        self.thumb_cache = None
+        try:
+            self.thumb_cache = thumbcache.ThumbnailCache(
+                self.thumbnail_cache_dir(), self.thumbnail_cache_bytes()
+            )
+        except OSError as e:
+            print("thumbnail cache error " + str(e))
+        self.thumbnail_thread = None
+        self.thumbnail_worker = None
+        # map tiles served from imported MBTiles and local cache, see create_map()
+        self.tile_cache = None
+        self.tile_handler = None
+        self.tile_sources = self.open_mbtiles(self.mbtiles_files())
+        self.preview_worker = PreviewWorker(self.preview_cache, self.thumb_cache)
+        self.preview_worker.moveToThread(self.preview_thread)
+        self.previewRequested.connect(self.preview_worker.load)
+        self.preview_worker.thumbnailReady.connect(self.on_preview_ready)
+        self.preview_worker.previewReady.connect(self.on_preview_ready)
+        self.preview_thread.start()
+
+        self.track_thread = None
+        self.track_worker = None
+        self.track_records = []
+
+        # sampling profiler armed from Diagnostics menu for next scan or save
+        self.profile_armed = None
+        self.profiler = None
+        self.profiler_target = None
+        # set by closeEvent: late worker results are recorded, not shown in dialogs
+        self.closing = False
+
+        # overview layer: id(record) -> point, built lazily; last map viewport
+        self.overview_points = None
+        self.overview_viewport = None
+        self.overview_binned = False
+
+        # selection changes are rendered on leading edge and when they settle
+        self.selection_pending = None
+        self.selection_serial = 0
+        self.selection_rendered_serial = 0
+        self.selection_render_timer = QTimer(self)
+        self.selection_render_timer.setSingleShot(True)
+        self.selection_render_timer.setInterval(80)
+        self.selection_render_timer.timeout.connect(self.on_selection_settled)
+
+        # pick up files added, removed or changed by other programs
+        self.folder_watcher = QFileSystemWatcher(self)
+        self.folder_watcher.directoryChanged.connect(self.on_folder_changed)
+        self.folder_refresh_timer = QTimer(self)
+        self.folder_refresh_timer.setSingleShot(True)
+        self.folder_refresh_timer.setInterval(500)
+        self.folder_refresh_timer.timeout.connect(self.refresh_folder_changes)
+        self.refresh_thread = None
+        self.refresh_worker = None
         self.filter_has_coords_enabled = False  # Initial state of the filter
 
         self.locationFavs = self.load_favorites()
@@ -355,15 +1205,19 @@ class RaskladGeotag(QMainWindow):
         )
         self.save_button.clicked.connect(self.save2exif)
 
-        self.table = QTableWidget(self)
-        self.table.setColumnCount(6)
-
-        self.table.setHorizontalHeaderLabels(
-            ["Filename", "Create Date", "lat", "lon", "dest lat", "dest lon"]
-        )
+        self.table_model = PhotoTableModel(self.mainfiles, self)
+        self.table_proxy = PhotoFilterProxyModel(self)
+        self.table_proxy.setSourceModel(self.table_model)
+        self.table = QTableView(self)
+        self.table.setModel(self.table_proxy)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setColumnWidth(0, 200)
         self.table.setColumnWidth(1, 180)
-        self.table.itemSelectionChanged.connect(self.display_image)
+        # small rows for burst shots, big rows for gaps between bursts
+        self.table.verticalHeader().setMinimumSectionSize(8)
+        self.table.verticalHeader().setDefaultSectionSize(8)
+        self.table.selectionModel().selectionChanged.connect(self.display_image)
         self.table.installEventFilter(self)
         self.table.setMinimumHeight(300)
         self.table_last_event_timestamp = None
@@ -378,7 +1232,10 @@ class RaskladGeotag(QMainWindow):
 
         layout_horizontal.addLayout(layout)
 
-        self.map_widget = MapWidget()
+        # web view is built by create_map() after the window is painted
+        self.map_widget = MapWidget(self)
+        self.map_widget.jsHandler.ready.connect(lambda: self.mark_startup("map_ready"))
+        self.map_widget.firstPaint.connect(lambda: self.mark_startup("map_tiles"))
         layout_vertical_right = QVBoxLayout()
         layout_vertical_right.addWidget(self.map_widget)
 
@@ -391,6 +1248,12 @@ class RaskladGeotag(QMainWindow):
         self.add_marker_button = QPushButton("Add Marker to Center")
         self.add_marker_button.clicked.connect(self.add_marker)
         layout_vertical_right.addWidget(self.add_marker_button)
+        self.overview_button = QPushButton("Show all photos on map")
+        self.overview_button.setCheckable(True)
+        self.overview_button.toggled.connect(self.toggle_overview)
+        layout_vertical_right.addWidget(self.overview_button)
+        self.map_widget.jsHandler.viewportUpdated.connect(self.on_map_viewport)
+        self.map_widget.jsHandler.ready.connect(self.on_map_ready)
         self.map_fav_widget = QListWidget()
         self.map_fav_widget.setFixedHeight(150)
         layout_vertical_right.addWidget(self.map_fav_widget)
@@ -446,13 +1309,29 @@ class RaskladGeotag(QMainWindow):
 
         widget.setLayout(layout_horizontal)
         self.marker_coordinates = None
+
+        # folder scan progress, visible only while scan is running
+        self.scan_progressBar = QProgressBar()
+        self.scan_progressBar.setMaximumWidth(200)
+        self.scan_progressBar.setFormat("%v / %m")
+        self.scan_cancel_button = QPushButton("Cancel")
+        self.scan_cancel_button.clicked.connect(self.cancel_scan)
+        self.preview_cache_label = QLabel()
+        self.statusBar().addPermanentWidget(self.preview_cache_label)
+        self.thumbnail_label = QLabel()
+        self.statusBar().addPermanentWidget(self.thumbnail_label)
+        self.thumbnail_label.hide()
+        self.statusBar().addPermanentWidget(self.scan_progressBar)
+        self.statusBar().addPermanentWidget(self.scan_cancel_button)
+        self.scan_progressBar.hide()
+        self.scan_cancel_button.hide()
+
         self.statusBar().showMessage("Select a directory with images to start")
         self.create_main_menu()
         self.display_sorted_location_favorites(self.map_fav_widget)
 
     def on_tab_change(self, index):
-        js_code = f"removeMarkers();"
-        self.map_widget.page().runJavaScript(js_code)
+        self.map_widget.update_scene({"image": None, "dest": None})
         if index == 0:
             self.switch_mode_enter_coordinates()
         elif index == 1:
@@ -483,11 +1362,125 @@ class RaskladGeotag(QMainWindow):
         edit_favorites_action.triggered.connect(self.open_edit_favorites_dialog)
         file_menu.addAction(edit_favorites_action)
 
+        scan_workers_action = QAction("Folder scan workers", self)
+        scan_workers_action.triggered.connect(self.edit_scan_workers)
+        file_menu.addAction(scan_workers_action)
+
+        self.scan_processes_action = QAction("Folder scan in separate processes", self)
+        self.scan_processes_action.setCheckable(True)
+        self.scan_processes_action.setChecked(
+            QSettings("Trolleway", "RaskladGeotag").value(
+                "scanUseProcesses", False, type=bool
+            )
+        )
+        self.scan_processes_action.toggled.connect(self.toggle_scan_processes)
+        file_menu.addAction(self.scan_processes_action)
+
+        self.scan_recursive_action = QAction("Scan subfolders", self)
+        self.scan_recursive_action.setCheckable(True)
+        self.scan_recursive_action.setChecked(
+            QSettings("Trolleway", "RaskladGeotag").value("scanRecursive", True, type=bool)
+        )
+        self.scan_recursive_action.toggled.connect(self.toggle_scan_recursive)
+        file_menu.addAction(self.scan_recursive_action)
+
+        scan_patterns_action = QAction("Folder scan include/exclude patterns", self)
+        scan_patterns_action.triggered.connect(self.edit_scan_patterns)
+        file_menu.addAction(scan_patterns_action)
+
+        save_workers_action = QAction("EXIF save workers", self)
+        save_workers_action.triggered.connect(self.edit_save_workers)
+        file_menu.addAction(save_workers_action)
+
+        write_behind_action = QAction("Save changes to EXIF in background", self)
+        write_behind_action.triggered.connect(self.edit_write_behind)
+        file_menu.addAction(write_behind_action)
+
+        preview_cache_action = QAction("Preview cache and read-ahead", self)
+        preview_cache_action.triggered.connect(self.edit_preview_cache)
+        file_menu.addAction(preview_cache_action)
+
+        thumbnail_cache_action = QAction("Thumbnail cache size", self)
+        thumbnail_cache_action.triggered.connect(self.edit_thumbnail_cache)
+        file_menu.addAction(thumbnail_cache_action)
+
+        self.thumbnail_pregenerate_action = QAction(
+            "Generate thumbnails after folder scan", self
+        )
+        self.thumbnail_pregenerate_action.setCheckable(True)
+        self.thumbnail_pregenerate_action.setChecked(
+            QSettings("Trolleway", "RaskladGeotag").value(
+                "thumbnailPregenerate", True, type=bool
+            )
+        )
+        self.thumbnail_pregenerate_action.toggled.connect(self.toggle_thumbnail_pregenerate)
+        file_menu.addAction(self.thumbnail_pregenerate_action)
+
+        tile_cache_action = QAction("Map tile cache size", self)
+        tile_cache_action.triggered.connect(self.edit_tile_cache)
+        file_menu.addAction(tile_cache_action)
+
+        import_mbtiles_action = QAction("Import MBTiles map...", self)
+        import_mbtiles_action.triggered.connect(self.import_mbtiles)
+        file_menu.addAction(import_mbtiles_action)
+
+        forget_mbtiles_action = QAction("Forget imported MBTiles maps", self)
+        forget_mbtiles_action.triggered.connect(self.forget_mbtiles)
+        file_menu.addAction(forget_mbtiles_action)
+
+        self.tile_offline_action = QAction("Work offline, map tiles from cache only", self)
+        self.tile_offline_action.setCheckable(True)
+        self.tile_offline_action.setChecked(
+            QSettings("Trolleway", "RaskladGeotag").value("tileOffline", False, type=bool)
+        )
+        self.tile_offline_action.toggled.connect(self.toggle_tile_offline)
+        file_menu.addAction(self.tile_offline_action)
+
+        metadata_cache_action = QAction("Metadata cache size", self)
+        metadata_cache_action.triggered.connect(self.edit_metadata_cache)
+        file_menu.addAction(metadata_cache_action)
+
+        rebuild_cache_action = QAction("Rebuild metadata cache for folder", self)
+        rebuild_cache_action.triggered.connect(self.rebuild_metadata_cache)
+        file_menu.addAction(rebuild_cache_action)
+
         exit_action = QAction("Exit", self)
         exit_action.setShortcut("Ctrl+Q")
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
+        geotag_menu = menubar.addMenu("Geotag")
+        match_track_action = QAction("Match photos to GPS track...", self)
+        match_track_action.triggered.connect(self.match_track)
+        geotag_menu.addAction(match_track_action)
+        match_tagged_action = QAction("Match photos to tagged photos of other cameras...", self)
+        match_tagged_action.triggered.connect(self.match_tagged_photos)
+        geotag_menu.addAction(match_tagged_action)
+
+        diagnostics_menu = menubar.addMenu("Diagnostics")
+        self.trace_action = QAction("Record trace", self)
+        self.trace_action.setCheckable(True)
+        # also on when started with RASKLAD_TRACE environment variable
+        self.trace_action.setChecked(tracing.enabled)
+        self.trace_action.toggled.connect(self.toggle_tracing)
+        diagnostics_menu.addAction(self.trace_action)
+        save_trace_action = QAction("Save trace as Chrome JSON...", self)
+        save_trace_action.triggered.connect(self.save_trace)
+        diagnostics_menu.addAction(save_trace_action)
+        trace_summary_action = QAction("Show trace summary", self)
+        trace_summary_action.triggered.connect(self.show_trace_summary)
+        diagnostics_menu.addAction(trace_summary_action)
+        clear_trace_action = QAction("Clear trace", self)
+        clear_trace_action.triggered.connect(self.clear_trace)
+        diagnostics_menu.addAction(clear_trace_action)
+        diagnostics_menu.addSeparator()
+        profile_scan_action = QAction("Profile next folder scan", self)
+        profile_scan_action.triggered.connect(lambda: self.arm_profiler("scan"))
+        diagnostics_menu.addAction(profile_scan_action)
+        profile_save_action = QAction("Profile next EXIF save", self)
+        profile_save_action.triggered.connect(lambda: self.arm_profiler("save"))
+        diagnostics_menu.addAction(profile_save_action)
+
     def open_edit_favorites_dialog(self):
         dialog = EditFavoritesDialog(self)
         dialog.exec()
@@ -496,6 +1489,100 @@ class RaskladGeotag(QMainWindow):
         settings = QSettings("Trolleway", "RaskladGeotag")
         return settings.value("locationFavs", [])
 
+    def scan_workers_count(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        default = min(32, (os.cpu_count() or 1) + 4)
+        return settings.value("scanWorkers", default, type=int)
+
+    def edit_scan_workers(self):
+        workers, ok = QInputDialog.getInt(
+            self,
+            "Folder scan workers",
+            "Number of parallel exif readers:",
+            self.scan_workers_count(),
+            1,
+            128,
+        )
+        if ok:
+            QSettings("Trolleway", "RaskladGeotag").setValue("scanWorkers", workers)
+
+    def save_workers_count(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        default = min(32, (os.cpu_count() or 1) + 4)
+        return settings.value("saveWorkers", default, type=int)
+
+    def edit_save_workers(self):
+        workers, ok = QInputDialog.getInt(
+            self,
+            "EXIF save workers",
+            "Number of files written in parallel:",
+            self.save_workers_count(),
+            1,
+            128,
+        )
+        if ok:
+            QSettings("Trolleway", "RaskladGeotag").setValue("saveWorkers", workers)
+
+    def toggle_scan_processes(self, checked):
+        QSettings("Trolleway", "RaskladGeotag").setValue("scanUseProcesses", checked)
+
+    def toggle_scan_recursive(self, checked):
+        QSettings("Trolleway", "RaskladGeotag").setValue("scanRecursive", checked)
+
+    def scan_patterns(self):
+        """Include and exclude glob lists for folder scan."""
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        return (
+            photostore.split_patterns(settings.value("scanInclude", "", type=str)),
+            photostore.split_patterns(settings.value("scanExclude", "", type=str)),
+        )
+
+    def edit_scan_patterns(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        for key, title in (
+            ("scanInclude", "Scan only files matching, empty for all photos"),
+            ("scanExclude", "Skip files and subfolders matching"),
+        ):
+            text, ok = QInputDialog.getText(
+                self,
+                "Folder scan patterns",
+                f"{title}.\nGlobs separated by ; for example: *.heic;2024-*/*",
+                text=settings.value(key, "", type=str),
+            )
+            if not ok:
+                return
+            settings.setValue(key, text)
+
+    def metadata_cache_path(self):
+        data_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.AppDataLocation
+        )
+        return os.path.join(data_dir, "metadata_cache.sqlite")
+
+    def metadata_cache_bytes(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        default = metacache.DEFAULT_MAX_BYTES // (1024 * 1024)
+        return settings.value("metadataCacheMB", default, type=int) * 1024 * 1024
+
+    def edit_metadata_cache(self):
+        value, ok = QInputDialog.getInt(
+            self,
+            "Metadata cache",
+            "Exif fields of scanned folders kept on disk, MB:",
+            self.metadata_cache_bytes() // (1024 * 1024),
+            0,
+            1024 * 1024,
+        )
+        if ok:
+            # applied by next folder scan, the cache is open only while scanning
+            QSettings("Trolleway", "RaskladGeotag").setValue("metadataCacheMB", value)
+
+    def rebuild_metadata_cache(self):
+        if not self.folder_path:
+            self.statusBar().showMessage("Select a directory with images first")
+            return
+        self.mainfiles_init(self.folder_path, rebuild_cache=True)
+
     def toggle_filter(self):
         self.filter_has_coords_enabled = not self.filter_has_coords_enabled
         if self.filter_has_coords_enabled:
@@ -513,7 +1600,7 @@ class RaskladGeotag(QMainWindow):
 
     def switch_mode_enter_destinations(self):
         self.mode_interface = self.mode_enter_destinations
-        self.label.setPixmap(QPixmap())  # unload image
+        self.clear_preview()
         # switch off filter
         self.filter_has_coords_enabled = False
         self.display_files(self.folder_path)
@@ -523,7 +1610,7 @@ class RaskladGeotag(QMainWindow):
         )
 
     def switch_mode_enter_coordinates(self):
-        self.label.setPixmap(QPixmap())  # unload image
+        self.clear_preview()
         self.mode_interface = self.mode_enter_coordinates
         self.display_files(self.folder_path)
         self.statusBar().showMessage("Switched to image coordinates edit mode.")
@@ -536,20 +1623,20 @@ class RaskladGeotag(QMainWindow):
 
     def select_next_file(self, event):
         if event.timestamp() != self.table_last_event_timestamp:
-            current_row = self.table.currentRow()
+            current_row = self.table.currentIndex().row()
             next_row = current_row + 1
-            if next_row < self.table.rowCount():
+            if next_row < self.table_proxy.rowCount():
                 self.table.selectRow(next_row)
-                self.table.setCurrentCell(next_row, 0)
+                self.table.setCurrentIndex(self.table_proxy.index(next_row, 0))
                 self.table_last_event_timestamp = event.timestamp()
                 
     def select_prev_file(self, event):
         if event.timestamp() != self.table_last_event_timestamp:
-            current_row = self.table.currentRow()
+            current_row = self.table.currentIndex().row()
             prev_row = current_row - 1
             if prev_row > 0:
                 self.table.selectRow(prev_row)
-                self.table.setCurrentCell(prev_row, 0)
+                self.table.setCurrentIndex(self.table_proxy.index(prev_row, 0))
                 self.table_last_event_timestamp = event.timestamp()
 
     def keyPressEvent(self, event: QKeyEvent):
@@ -575,233 +1662,208 @@ class RaskladGeotag(QMainWindow):
                 wkt_point = fav.get("wkt_geom")
                 if not wkt_point:
                     continue
+                # shapely is only needed here, import on first favorite key
+                import shapely.wkt
+
                 retrieved_point = shapely.wkt.loads(wkt_point)
                 retrieved_latitude = retrieved_point.y
                 retrieved_longitude = retrieved_point.x
                 zoom = 16
-                js_code = f"move_to_favorite_place([{retrieved_latitude}, {retrieved_longitude}],{zoom});"
-                self.map_widget.page().runJavaScript(js_code)
+                position = [retrieved_latitude, retrieved_longitude]
+                self.map_widget.update_scene(
+                    self.marker_scene(
+                        self.selection_pending, position, {"center": position, "zoom": zoom}
+                    )
+                )
                 continue
         super().keyPressEvent(event)
 
-    def add_marker(self, lat=None, lon=None, markerclass="image", nonmoveable=False):
-        assert markerclass in ("image", "dest")
-        if self.table.currentRow() is None:
+    def add_marker(self):
+        """Put editable marker to map center."""
+        if not self.table.currentIndex().isValid() and not self.selected_files():
             return
+        self.map_widget.update_scene(self.marker_scene(self.selection_pending, None))
 
-        if not lat or not lon:
-            self.map_widget.page().runJavaScript("removeMarkers();")
-            js_code = f"addMarker(map.getCenter(),'{markerclass}');"
+    def marker_scene(self, f, edit_position=False, view=None):
+        """
+        Map scene for record: editable marker of current mode and,
+        in destination mode, fixed marker of photo position.
+        edit_position overrides position of editable marker, None is map center.
+        """
+        image = dest = None
+        image_position = dest_position = None
+        if f is not None:
+            image_position = self.marker_position(f.position())
+            dest_position = self.marker_position(f.dest())
+        if self.mode_interface == self.mode_enter_coordinates:
+            if edit_position is not False:
+                image_position = edit_position
+            image = {"position": image_position, "draggable": True}
+            active = "image"
         else:
-            if nonmoveable == False:
-                self.map_widget.page().runJavaScript("removeMarkers();")
-                js_code = f"addMarker([{lat}, {lon}],'{markerclass}');"
-            elif nonmoveable == True:
-                js_code = f"addMarker([{lat}, {lon}],'{markerclass}',false);"
-
-        self.map_widget.page().runJavaScript(js_code)
+            if edit_position is not False:
+                dest_position = edit_position
+            dest = {"position": dest_position, "draggable": True}
+            if image_position is not None:
+                image = {"position": image_position, "draggable": False}
+            active = "dest"
+        scene = {"image": image, "dest": dest, "active": active}
+        if view is not None:
+            scene["view"] = view
+        return scene
 
     @pyqtSlot(str, str)
     def update_coordinate_in_mainfiles(self, lat, lon):
 
-        if self.mode_interface == self.mode_enter_coordinates:
-            attr_lat = "lat"
-            attr_lon = "lon"
-            table_column_lat = 2
-            table_column_lon = 3
-        elif self.mode_interface == self.mode_enter_destinations:
-            attr_lat = "dest_lat"
-            attr_lon = "dest_lon"
-            table_column_lat = 4
-            table_column_lon = 5
-
         self.mapMarkerLat = lat
         self.mapMarkerLon = lon
-        selected = set([])
-        for it in self.table.selectedItems():
-            selected.add(it.text())
-        for i, f in enumerate(self.mainfiles):
-            if f["file_name"] in selected:
-                f["modified"][attr_lat] = lat
-                f["modified"][attr_lon] = lon
-                f["is_modified"] = True
-
-                row_count = self.table.rowCount()
-                for row in range(row_count):
-                    item = self.table.item(row, 0)  # Get the item in column 0
-                    if item and item.text() == f["file_name"]:
-                        new_table_item = QTableWidgetItem(f"{lat}")
-                        new_table_item.setBackground(QColor("#a6d96a"))
-
-                        self.table.setItem(row, table_column_lat, new_table_item)
-                        del new_table_item
-                        new_table_item = QTableWidgetItem(f"{lon}")
-                        new_table_item.setBackground(QColor("#a6d96a"))
-                        self.table.setItem(row, table_column_lon, new_table_item)
-                        del new_table_item
-
-                        self.statusBar().showMessage(
-                            f"Coordinates: {lat} {lon} for file {f['file_name']} updated. Press Space, Pagedown, or ⇩ to select next file"
-                        )
-                        break
-                # no break here, may be multiple files selected
+        # may be multiple files selected
+        selected = self.selected_files()
+        read_only = [f for f in selected if not f.is_writable]
+        if read_only:
+            selected = [f for f in selected if f.is_writable]
+        for f in selected:
+            if self.mode_interface == self.mode_enter_coordinates:
+                f.set_position(lat, lon)
+            elif self.mode_interface == self.mode_enter_destinations:
+                f.set_dest(lat, lon)
+        if self.mode_interface == self.mode_enter_coordinates:
+            self.journal_edits(selected, MODIFIED_POSITION)
+        else:
+            self.journal_edits(selected, MODIFIED_DEST)
+        self.table_model.refresh_files(selected)
+        self.update_overview_records(selected)
+        if read_only:
+            self.statusBar().showMessage(
+                f"{len(read_only)} selected files are read only, coordinates are saved to JPEG files only"
+            )
+        elif selected:
+            self.statusBar().showMessage(
+                f"Coordinates: {lat} {lon} for file {selected[-1].file_name} updated. Press Space, Pagedown, or ⇩ to select next file"
+            )
 
     def save2exif(self):
-        def calculate_heading(lat1, lon1, lat2, lon2):
-            lat1 = math.radians(lat1)
-            lon1 = math.radians(lon1)
-            lat2 = math.radians(lat2)
-            lon2 = math.radians(lon2)
-
-            d_lon = lon2 - lon1
-
-            x = math.sin(d_lon) * math.cos(lat2)
-            y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(d_lon)
-
-            initial_bearing = math.atan2(x, y)
-            initial_bearing = math.degrees(initial_bearing)
-            compass_bearing = (initial_bearing + 360) % 360
-
-            return compass_bearing
-
-        def safe_float(value):
+        if self.save_worker is not None:
+            # button works as cancel while saving
+            self.save_worker.cancel()
+            self.save_button.setEnabled(False)
+            return
+        if not self.start_save(self.mainfiles):
+            self.statusBar().showMessage("No changed coordinates to save")
+
+    def start_save(self, files, background=False):
+        """Write changed records of files in save thread, return number of files to write."""
+        jobs = []
+        self.save_records = dict()
+        with tracing.span("prepare", "save"):
+            for f in files:
+                if not f.is_modified:
+                    continue
+                kwargs = f.save_job()
+                if kwargs is None:
+                    continue
+                jobs.append((f.file_path, kwargs))
+                # remember what is saved, user may continue editing while saving
+                self.save_records[f.file_path] = (f, f.changes())
+        if not jobs:
+            return 0
+
+        self.save_background = background
+        # journal rows up to here are written by this save
+        self.save_journal_id = 0
+        if self.journal is not None:
             try:
-                return float(value)
-            except (TypeError, ValueError):
-                return None
-    
-        def dd_to_dms(dd):
-            """Convert decimal degrees to DMS tuple."""
-            dd = abs(dd)
-            degrees = int(dd)
-            minutes_float = (dd - degrees) * 60
-            minutes = int(minutes_float)
-            seconds = (minutes_float - minutes) * 60
-            return (degrees, minutes, seconds)
-
-        result_msg = ""
-        saved_files_counter = 0
-        latlonwaschanged=False
-        destlatlonwaschanged=False
-        for i, f in enumerate(self.mainfiles):
-            dest_lat = None
-            dest_lon = None
-            lat = None
-            lon = None
-            save_needed = False
-            if f.get("is_modified"):
-
-                """Read GPS coordinates to image using exif."""
-                with open(f["file_path"], 'rb') as img_file:
-                    img = exif.Image(img_file)
-                                    
-                if f["modified"].get("lat") is not None and f["modified"].get("lon") is not None:
-                    latlonwaschanged = True
-                    lat_dd = float(f["modified"].get("lat"))
-                    lon_dd = float(f["modified"].get("lon"))
-                    img.gps_latitude = dd_to_dms(lat_dd)
-                    img.gps_latitude_ref = 'N' if lat_dd >= 0 else 'S'
-                    img.gps_longitude = dd_to_dms(lon_dd)
-                    img.gps_longitude_ref = 'E' if lon_dd >= 0 else 'W'
-                    save_needed = True
-                
-                if f["modified"].get("dest_lat") is not None and f["modified"].get("dest_lon") is not None:
-                    destlatlonwaschanged = True    
-                    dest_lat = float(f["modified"].get("dest_lat"))
-                    dest_lon = float(f["modified"].get("dest_lon"))
-                
-                
-                    img.gps_dest_latitude = dd_to_dms(dest_lat)
-                    img.gps_dest_latitude_ref = 'N' if dest_lat >= 0 else 'S'
-                    img.gps_dest_longitude = dd_to_dms(dest_lon)
-                    img.gps_dest_longitude_ref = 'E' if dest_lon >= 0 else 'W'
-                    save_needed = True
-                
-                lat_dd = None
-                lon_dd = None
-                dest_lat = None
-                dest_lon = None
-                if latlonwaschanged or destlatlonwaschanged:
-                    #calculate direction
-                    if latlonwaschanged:
-                        lat_dd = safe_float(f["modified"].get("lat"))
-                        lon_dd = safe_float(f["modified"].get("lon"))
-                    else:
-                        lat_dd = safe_float(f.get("lat"))
-                        lon_dd = safe_float(f.get("lon"))
-                    
-                    if destlatlonwaschanged:
-                        dest_lat = safe_float(f["modified"].get("dest_lat"))
-                        dest_lon = safe_float(f["modified"].get("dest_lon"))
-                    else:
-                        dest_lat = safe_float(f.get("dest_lat"))
-                        dest_lon = safe_float(f.get("dest_lon"))                        
-                        
-                    if lat_dd is not None and dest_lat is not None:
-                        direction_deg = calculate_heading(float(lat_dd), float(lon_dd), float(dest_lat), float(dest_lon))
-                        img.gps_img_direction = direction_deg
-                        img.gps_img_direction_ref = 'T'  # 'T' for true north, 'M' for magnetic
-                '''
-                need to calculate bearing from latest version of coordinartes
-                when user open exist photo with coordinates, and add dest coorinates, bearing must 
-                use such data, not get both points from modified
-                
-                
-                if dest_lat is not None and dest_lon is not None:
-                        bearing_deg = calculate_heading(float(lat), float(lon), float(dest_lat), float(dest_lon))
-                        img.gps_img_direction = bearing_deg
-                        img.gps_img_direction_ref = 'T'  # 'T' for true north, 'M' for magnetic
-                ''' 
-                if save_needed:
-                    try:
-                        with open(f["file_path"], 'wb') as out_file:
-                            out_file.write(img.get_file())
-            
-                        #0000000000000000000
-
-
-                        self.coordinates_label.setText(f"Saved ")
-                        self.mainfiles[i]['is_modified']=False
-                        saved_files_counter = saved_files_counter + 1
-                        continue
-                    except Exception as e:
-
-                        self.coordinates_label.setText(f"EXIF library error " + str(e))
-                        msg_box = QMessageBox()
-                        msg_box.setIcon(QMessageBox.Icon.Warning)
-                        msg_box.setText("Failed to save EXIF data.")
-                        msg_box.setInformativeText(f"File: {f['file_name']}")
-                        msg_box.setStandardButtons(
-                            QMessageBox.StandardButton.Retry
-                            | QMessageBox.StandardButton.Ignore
-                            | QMessageBox.StandardButton.Cancel
-                        )
-                        msg_box.setDefaultButton(QMessageBox.StandardButton.Retry)
-                        ret = msg_box.exec()
-
-                        if ret == QMessageBox.StandardButton.Retry:
-                            continue
-                        elif ret == QMessageBox.StandardButton.Ignore:
-                            pass
-                        elif ret == QMessageBox.StandardButton.Cancel:
-                            break
-
-                    
-
-        self.statusBar().showMessage(f"{saved_files_counter} images coordinates saved to EXIF")
+                self.save_journal_id = self.journal.last_id()
+            except sqlite3.Error as e:
+                print("edit journal error " + str(e))
+        self.save_errors = []
+        self.saved_records = []
+        self.saved_files_counter = 0
+        self.save_thread = QThread(self)
+        self.save_worker = ExifSaveWorker(jobs, self.save_workers_count())
+        self.save_worker.moveToThread(self.save_thread)
+        self.save_thread.started.connect(self.save_worker.run)
+        self.save_worker.fileSaved.connect(self.on_exif_saved)
+        self.save_worker.progress.connect(self.on_save_progress)
+        self.save_worker.finished.connect(self.on_save_finished)
+        self.save_worker.finished.connect(self.save_thread.quit)
+
+        self.save_button.setText("Cancel saving")
+        self.coordinates_label.setText(f"Saving {len(jobs)} files")
+        self.start_profiler("save")
+        self.save_thread.start()
+        return len(jobs)
+
+    def on_exif_saved(self, file_path, error):
+        f, saved_changes = self.save_records[file_path]
+        if error:
+            self.save_errors.append((f.file_name, error))
+            if self.save_background:
+                # retried after its next edit, not on every flush
+                self.write_behind_failed.add(file_path)
+            return
+        self.saved_files_counter = self.saved_files_counter + 1
+        # saved values become file values, so no rescan needed after save
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            stat = None
+        f.merge_saved(saved_changes, stat)
+        self.saved_records.append(f)
+
+    def on_save_progress(self, done, total):
+        self.coordinate_set_progressBar.setValue(round(100 * done / total) if total else 0)
+        self.statusBar().showMessage(f"Saving EXIF: {done} of {total} files")
+
+    def on_save_finished(self, cancelled):
+        self.save_thread.quit()
+        self.save_thread.wait()
+        self.save_worker = None
+        self.save_thread = None
+        self.save_records = dict()
+        self.save_button.setText("Save coordinates to EXIF")
+        self.save_button.setEnabled(True)
+        self.coordinates_label.setText(f"Saved ")
+
+        message = f"{self.saved_files_counter} images coordinates saved to EXIF"
+        if self.save_background:
+            message += " in background"
+        if cancelled:
+            message += ", saving cancelled"
+        if self.save_errors:
+            message += f", {len(self.save_errors)} failed"
+        self.statusBar().showMessage(message)
         self.updateProgressBar()
-        self.display_files(self.folder_path, supress_statusbar=True)
+        self.refresh_table_rows(self.saved_records)
+        if self.journal is not None:
+            try:
+                self.journal.forget(
+                    [f.file_path for f in self.saved_records], self.save_journal_id
+                )
+            except sqlite3.Error as e:
+                print("edit journal error " + str(e))
+        self.saved_records = []
+        self.finish_profiler("save")
+
+        if self.closing:
+            return
+        if self.save_background:
+            # next batch, errors are in the status bar only
+            if not cancelled:
+                self.schedule_write_behind()
+            return
+        if self.save_errors:
+            msg_box = QMessageBox(self)
+            msg_box.setIcon(QMessageBox.Icon.Warning)
+            msg_box.setText(f"Failed to save EXIF data for {len(self.save_errors)} files.")
+            msg_box.setInformativeText("Coordinates of these files are kept as not saved.")
+            msg_box.setDetailedText(
+                "\n".join(f"{file_name}: {error}" for file_name, error in self.save_errors)
+            )
+            msg_box.exec()
 
     def updateProgressBar(self):
-        has_coords1 = len([f for f in self.mainfiles if f.get("lat")])
-        has_coords2 = len(
-            [
-                f
-                for f in self.mainfiles
-                if f.get("modified") and f["modified"].get("lat")
-            ]
-        )
-        has_coords = has_coords1 + has_coords2
+        has_coords = photostore.count_with_coords(self.mainfiles)
         total = len(self.mainfiles)
         if total == 0 or has_coords == 0:
             self.coordinate_set_progressBar.setValue(0)
@@ -809,277 +1871,1022 @@ class RaskladGeotag(QMainWindow):
             self.coordinate_set_progressBar.setValue(round(100 / (total / has_coords)))
 
     def open_folder_dialog(self):
-        self.folder_path = QFileDialog.getExistingDirectory(self, "Open Folder")
-        if self.folder_path:
+        folder_path = QFileDialog.getExistingDirectory(self, "Open Folder")
+        if folder_path:
+            self.folder_path = folder_path
             self.mainfiles_init(self.folder_path)
-            self.display_files(self.folder_path)
 
+    def mainfiles_init(self, folder_path, rebuild_cache=False):
+        # initialize mainfiles, read exif from disk in background
+        self.cancel_scan()
+        if self.refresh_worker is not None:
+            # its result belongs to the table being replaced
+            self.refresh_worker.cancel()
+        self.cancel_thumbnail_generation()
+        if self.scan_thread is not None:
+            self.scan_thread.quit()
+            self.scan_thread.wait()
 
+        self.mainfiles = []
+        self.folder_path = folder_path
+        self.reset_overview()
+        # rows come in scan order until scan is finished
+        self.table.setSortingEnabled(False)
+        self.table_model.set_files(self.mainfiles)
+
+        if self.folder_watcher.directories():
+            self.folder_watcher.removePaths(self.folder_watcher.directories())
+        self.folder_watcher.addPath(folder_path)
+        self.table_model.root_folder = folder_path
+        include, exclude = self.scan_patterns()
+
+        self.scan_thread = QThread(self)
+        self.scan_worker = FolderScanWorker(
+            folder_path,
+            workers=self.scan_workers_count(),
+            use_processes=self.scan_processes_action.isChecked(),
+            cache_path=self.metadata_cache_path(),
+            cache_max_bytes=self.metadata_cache_bytes(),
+            rebuild_cache=rebuild_cache,
+            recursive=self.scan_recursive_action.isChecked(),
+            include=include,
+            exclude=exclude,
+        )
+        self.scan_worker.moveToThread(self.scan_thread)
+        self.scan_thread.started.connect(self.scan_worker.run)
+        self.scan_worker.batchReady.connect(self.on_scan_batch)
+        self.scan_worker.progress.connect(self.on_scan_progress)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.finished.connect(self.scan_thread.quit)
+
+        self.scan_progressBar.setValue(0)
+        self.scan_progressBar.show()
+        self.scan_cancel_button.show()
+        self.statusBar().showMessage(f"Reading EXIF from {folder_path}")
+        self.start_profiler("scan")
+        self.scan_thread.start()
+
+    def cancel_scan(self):
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+
+    def on_scan_batch(self, batch):
+        if self.sender() is not self.scan_worker:
+            return  # late batch from cancelled scan
+        self.table_model.append_files(batch)
+
+    def on_scan_progress(self, done, total):
+        self.scan_progressBar.setMaximum(total)
+        self.scan_progressBar.setValue(done)
+
+    def on_scan_finished(self, cancelled):
+        if self.sender() is not self.scan_worker:
+            return
+        self.scan_progressBar.hide()
+        self.scan_cancel_button.hide()
 
+        photostore.update_seconds_since_previous(self.mainfiles)
+        self.watch_subfolders(self.scan_worker.directories)
+        restored = self.replay_journal(cancelled)
 
+        self.display_files(self.folder_path, supress_statusbar=True)
+        self.reset_overview()
+        self.start_thumbnail_generation()
+        if cancelled:
+            self.statusBar().showMessage(
+                f"Folder scan cancelled, {len(self.mainfiles)} images loaded"
+            )
+        elif restored:
+            self.statusBar().showMessage(
+                f"{len(restored)} images have not saved coordinates from previous session"
+            )
+        else:
+            self.statusBar().showMessage(f"Select image in table to edit coordinates")
+        self.finish_profiler("scan")
 
-    def mainfiles_init(self, folder_path):
-        # initialize mainfiles, read exif from disk
-        
-        
-        def get_delta_seconds(s1: str, s2: str) -> float:
-            try:
-                fmt = "%Y:%m:%d %H:%M:%S"
-                dt1 = datetime.strptime(s1, fmt)
-                dt2 = datetime.strptime(s2, fmt)
-                return abs((dt2 - dt1).total_seconds())
-            except Exception:
-                return 0.0
-    
-        self.mainfiles = []
-        files = os.listdir(folder_path)
-        photo_counter = 0
-        for i, file_name in enumerate(files):
-            if not file_name.lower().endswith(".jpg"):
-                continue
-            f = dict()
-            f["modified"] = dict()
-            f["file_path"] = os.path.join(folder_path, file_name)
-            f["file_name"] = file_name
-            f["file_info"] = os.stat(f["file_path"])
-            f["modification_date"] = self.format_date(f["file_info"].st_mtime)
+    def journal_path(self):
+        data_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.AppDataLocation
+        )
+        return os.path.join(data_dir, "edit_journal.sqlite")
+
+    def journal_edits(self, records, kind):
+        """Append new values of records to edit journal and restart write-behind timer."""
+        if not records:
+            return
+        if self.journal is not None:
             try:
-                with open(f["file_path"], "rb") as image_file:
-                    img = exif.Image(image_file)
-                    f["model"] = img.get("model")
-                    f["datetime_original"] = img.get("datetime_original")
-                    if photo_counter==0:
-                        f['seconds_since_previous'] = 0
-                    else:
-                        f['seconds_since_previous'] = get_delta_seconds(previous_datetime,img.get("datetime_original"))
-                    previous_datetime = img.get("datetime_original")
-                    # load coord
-
-                    if (
-                        img.has_exif
-                        and img.get("gps_latitude")
-                        and img.get("gps_longitude")
-                    ):
-                        lat = (
-                            img.gps_latitude[0]
-                            + img.gps_latitude[1] / 60
-                            + img.gps_latitude[2] / 3600
-                        )
-                        lon = (
-                            img.gps_longitude[0]
-                            + img.gps_longitude[1] / 60
-                            + img.gps_longitude[2] / 3600
-                        )
-                        if img.gps_latitude_ref == "S":
-                            lat = -lat
-                        if img.gps_longitude_ref == "W":
-                            lon = -lon
-
-                        f["lat"] = lat
-                        f["lon"] = lon
-                        del lat
-                        del lon
-                        # dest
-                        if (
-                            img.has_exif
-                            and img.get("gps_dest_latitude")
-                            and img.get("gps_dest_longitude")
-                        ):
-                            lat = (
-                                img.gps_dest_latitude[0]
-                                + img.gps_dest_latitude[1] / 60
-                                + img.gps_dest_latitude[2] / 3600
-                            )
-                            lon = (
-                                img.gps_dest_longitude[0]
-                                + img.gps_dest_longitude[1] / 60
-                                + img.gps_dest_longitude[2] / 3600
-                            )
-                            if img.gps_dest_latitude_ref == "S":
-                                lat = -lat
-                            if img.gps_dest_longitude_ref == "W":
-                                lon = -lon
+                self.journal.record(records, kind)
+            except sqlite3.Error as e:
+                print("edit journal error " + str(e))
+        self.write_behind_failed.difference_update(f.file_path for f in records)
+        self.schedule_write_behind()
+
+    def replay_journal(self, cancelled):
+        """Restore not saved edits of opened folder, return records changed."""
+        if self.journal is None:
+            return []
+        try:
+            restored = self.journal.replay(self.folder_path, self.mainfiles)
+            if not cancelled:
+                self.journal.forget_missing(
+                    self.folder_path, {f.file_path for f in self.mainfiles}
+                )
+        except sqlite3.Error as e:
+            print("edit journal error " + str(e))
+            return []
+        self.schedule_write_behind()
+        return restored
 
-                            f["dest_lat"] = lat
-                            f["dest_lon"] = lon
+    def write_behind_seconds(self):
+        """Idle seconds before changes are saved in background, 0 is off."""
+        return QSettings("Trolleway", "RaskladGeotag").value("writeBehindSeconds", 0, type=int)
 
-            except:
-                print("exif read error " + f["file_path"])
+    def edit_write_behind(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        for key, label, default, maximum in (
+            ("writeBehindSeconds", "Save changes after idle seconds, 0 is off:", 0, 3600),
+            ("writeBehindBatch", "Files saved per batch:", 200, 100000),
+        ):
+            value, ok = QInputDialog.getInt(
+                self,
+                "Save changes in background",
+                label,
+                settings.value(key, default, type=int),
+                0,
+                maximum,
+            )
+            if not ok:
+                return
+            settings.setValue(key, value)
+        self.write_behind_timer.stop()
+        self.schedule_write_behind()
+
+    def schedule_write_behind(self):
+        """(Re)start idle timer: every edit pushes the background save further."""
+        seconds = self.write_behind_seconds()
+        if seconds > 0:
+            self.write_behind_timer.start(seconds * 1000)
+
+    def write_behind(self):
+        """
+        Save a batch of changed files in background. Each file is written once
+        with its latest values, however many times it was edited.
+        """
+        if self.save_worker is not None or (
+            self.scan_thread is not None and self.scan_thread.isRunning()
+        ):
+            self.schedule_write_behind()
+            return
+        batch = QSettings("Trolleway", "RaskladGeotag").value("writeBehindBatch", 200, type=int)
+        files = [
+            f
+            for f in self.mainfiles
+            if f.is_modified and f.is_writable and f.file_path not in self.write_behind_failed
+        ]
+        if files:
+            self.start_save(files[: max(1, batch)], background=True)
+
+    def selected_files(self):
+        """Records of selected table rows, in table order."""
+        # selection ranges, not selectedRows(): that one asks flags() of every cell
+        rows = set()
+        for selection_range in self.table.selectionModel().selection():
+            rows.update(range(selection_range.top(), selection_range.bottom() + 1))
+        return [self.table_proxy.file_at(row) for row in sorted(rows)]
+
+    def refresh_table_rows(self, files):
+        """Update table rows of given records in place, keep selection and scroll."""
+        if files:
+            self.table_model.refresh_files(files)
+
+    def row_height(self, f):
+        if f.seconds_since_previous is None or f.seconds_since_previous > 60:
+            return 35
+        return 8
+
+    @tracing.instrument("table")
+    def apply_row_heights(self, files=None):
+        """
+        New table rows get default small height, make rows after time gaps tall.
+        Header keeps section sizes attached to rows on sort and filter,
+        so only rows of given (or all gap) records are touched.
+        """
+        header = self.table.verticalHeader()
+        model = self.table_model
+        if files is None:
+            rows = [
+                row for row, f in enumerate(model.files) if self.row_height(f) != 8
+            ]
+        else:
+            rows = [model.row_of(f) for f in files]
+        for source_row in rows:
+            row = self.table_proxy.mapFromSource(model.index(source_row, 0)).row()
+            if row >= 0:
+                header.resizeSection(row, self.row_height(model.files[source_row]))
+
+    def on_folder_changed(self, path):
+        # file managers and cameras send bursts of events, handle them together
+        self.folder_refresh_timer.start()
+
+    def refresh_folder_changes(self):
+        scan_running = self.scan_thread is not None and self.scan_thread.isRunning()
+        if scan_running or self.save_worker is not None or self.refresh_worker is not None:
+            self.folder_refresh_timer.start()
+            return
+        if not self.folder_path or not os.path.isdir(self.folder_path):
+            return
 
-            self.mainfiles.append(f)
-            photo_counter = photo_counter + 1
+        include, exclude = self.scan_patterns()
+        self.refresh_thread = QThread(self)
+        self.refresh_worker = FolderRefreshWorker(
+            self.folder_path,
+            {f.file_path: (f.size, f.mtime_ns) for f in self.mainfiles},
+            recursive=self.scan_recursive_action.isChecked(),
+            include=include,
+            exclude=exclude,
+        )
+        self.refresh_worker.moveToThread(self.refresh_thread)
+        self.refresh_thread.started.connect(self.refresh_worker.run)
+        self.refresh_worker.finished.connect(self.on_folder_refresh_finished)
+        self.refresh_worker.finished.connect(self.refresh_thread.quit)
+        self.refresh_thread.start()
+
+    def on_folder_refresh_finished(self, result):
+        worker = self.refresh_worker
+        if self.sender() is not worker:
+            return
+        self.refresh_thread.quit()
+        self.refresh_thread.wait()
+        self.refresh_worker = None
+        self.refresh_thread = None
+        if result is None or self.closing:
+            return
+        scan_running = self.scan_thread is not None and self.scan_thread.isRunning()
+        if scan_running or self.save_worker is not None or worker.folder_path != self.folder_path:
+            # table changed under the walk, compare again
+            self.folder_refresh_timer.start()
+            return
 
-    def display_files(self, folder_path, supress_statusbar=False):
+        removed = [
+            f
+            for f in map(self.table_model.file_by_path, result["removed"])
+            if f is not None and worker.known.get(f.file_path) == (f.size, f.mtime_ns)
+        ]
+        if removed:
+            self.table_model.remove_files({f.file_path for f in removed})
+
+        changed = []
+        for scanned in result["changed"]:
+            f = self.table_model.file_by_path(scanned.file_path)
+            # record saved meanwhile is newer than this read
+            if f is None or worker.known.get(f.file_path) != (f.size, f.mtime_ns):
+                continue
+            # unsaved user edits stay in new_* attributes
+            f.size, f.mtime_ns, f.inode = scanned.size, scanned.mtime_ns, scanned.inode
+            f.set_exif(
+                scanned.model,
+                scanned.datetime_original,
+                scanned.lat,
+                scanned.lon,
+                scanned.dest_lat,
+                scanned.dest_lon,
+            )
+            changed.append(f)
+        self.refresh_table_rows(changed)
+
+        new_files = [
+            f for f in result["added"] if self.table_model.file_by_path(f.file_path) is None
+        ]
+        self.watch_subfolders(result["directories"])
+        if not (removed or changed or new_files):
+            return
+
+        heights = {id(f): self.row_height(f) for f in self.mainfiles}
+        self.table_model.append_files(new_files)
+        photostore.update_seconds_since_previous(self.mainfiles)
+        if new_files:
+            self.sort_table()
+        # burst may be split or joined by new files
+        self.apply_row_heights(
+            [f for f in self.mainfiles if heights.get(id(f)) != self.row_height(f)]
+        )
+
+        self.reset_overview()
+        self.updateProgressBar()
+        self.statusBar().showMessage(
+            f"Folder changed: {len(new_files)} added, {len(removed)} removed, {len(changed)} changed"
+        )
+
+    def watch_subfolders(self, directories):
         """
-        append files to file list
+        Watch every walked directory, also ones without photos yet:
+        a file copied into a watched directory is seen, one copied deeper is not.
         """
+        watched = set(self.folder_watcher.directories())
+        folders = set(directories) - watched
+        if folders:
+            self.folder_watcher.addPaths(sorted(folders))
+
+    def toggle_overview(self, checked):
+        if checked:
+            self.overview_button.setText("Hide all photos on map")
+            self.map_widget.update_overview({"enabled": True})
+        else:
+            self.overview_button.setText("Show all photos on map")
+            self.map_widget.update_overview({"enabled": False})
+            self.overview_points = None
 
-        self.folder_path = folder_path  # Save the selected folder path
+    def on_map_ready(self):
+        if self.overview_button.isChecked():
+            self.map_widget.update_overview({"enabled": True})
 
-        self.table.setSortingEnabled(False)  # Disable sorting while updating
-        self.table.setRowCount(0)
+    def on_map_viewport(self, south, west, north, east, zoom):
+        self.overview_viewport = (south, west, north, east, zoom)
+        self.send_overview_viewport()
 
-        files = self.mainfiles
-        # if filter
-        if self.filter_has_coords_enabled:
-            files = [
-                f
-                for f in self.mainfiles
-                if f.get("lat") is None and f.get("lon") is None
-            ]
+    def send_overview_viewport(self):
+        """Send photos inside map viewport, page asks again after each pan or zoom."""
+        if not self.overview_button.isChecked() or self.overview_viewport is None:
+            return
+        if self.overview_points is None:
+            self.overview_points = mapoverview.overview_points(self.mainfiles)
+        message = mapoverview.viewport_overview(
+            self.overview_points, *self.overview_viewport
+        )
+        self.overview_binned = "bins" in message
+        self.map_widget.update_overview(message)
 
-        self.table.setRowCount(len(files))
-
-        for i, f in enumerate(files):
-
-            item_file_name = QTableWidgetItem(f["file_name"])
-            item_datetime = QTableWidgetItem(f.get("datetime_original"))
-            item_lat = QTableWidgetItem(str(f.get("lat", "")))
-            item_lon = QTableWidgetItem(str(f.get("lon", "")))
-            item_destlat = QTableWidgetItem(str(f.get("dest_lat", "")))
-            item_destlon = QTableWidgetItem(str(f.get("dest_lon", "")))
-            if f.get("is_modified") is not None and f.get("modified") is not None:
-                if f["modified"].get("lat"):
-                    item_lat = QTableWidgetItem(f"✔️ {f["modified"]['lat']}")
-                    item_lat.setBackground(QColor("#a6d96a"))
-                if f["modified"].get("lon"):
-                    item_lon = QTableWidgetItem(f"✔️ {f["modified"]['lon']}")
-                    item_lon.setBackground(QColor("#a6d96a"))
-                if f["modified"].get("dest_lat"):
-                    item_destlat = QTableWidgetItem(
-                        f"✔️ {f["modified"]['dest_lat']}"
-                    )
-                    item_destlat.setBackground(QColor("#a6d96a"))
-                if f["modified"].get("dest_lon"):
-                    item_destlon = QTableWidgetItem(
-                        f"✔️ {f["modified"]['dest_lon']}"
-                    )
-                    item_destlon.setBackground(QColor("#a6d96a"))
+    def reset_overview(self):
+        """Records were added, removed or reloaded: rebuild overview points."""
+        self.overview_points = None
+        self.send_overview_viewport()
 
-            if f.get("seconds_since_previous",120) > 60:
-                self.table.setRowHeight(i, 35)
-            else:
-                self.table.setRowHeight(i, 8)
-            # Disable editing for each item
-            item_file_name.setFlags(
-                item_file_name.flags() & ~Qt.ItemFlag.ItemIsEditable
-            )
-            item_datetime.setFlags(item_datetime.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_lat.setFlags(item_lat.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_lon.setFlags(item_lon.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_lat.setFlags(item_destlat.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            item_lon.setFlags(item_destlon.flags() & ~Qt.ItemFlag.ItemIsEditable)
-
-            self.table.setItem(i, 0, item_file_name)
-            self.table.setItem(i, 1, item_datetime)
-            self.table.setItem(i, 2, item_lat)
-            self.table.setItem(i, 3, item_lon)
-            self.table.setItem(i, 4, item_destlat)
-            self.table.setItem(i, 5, item_destlon)
-
-        self.table.sortByColumn(1, Qt.SortOrder.AscendingOrder)
-        self.table.setSortingEnabled(True)  # Enable sorting after updating
-        self.table.viewport().update()  # Explicitly trigger a redraw of the table
+    def update_overview_records(self, files):
+        """Send only changed photos to overview layer."""
+        if not self.overview_button.isChecked() or self.overview_points is None:
+            return
+        update = []
+        remove = []
+        for f in files:
+            point = mapoverview.record_point(f)
+            if point is not None:
+                self.overview_points[point[0]] = point
+                update.append(point)
+            elif self.overview_points.pop(id(f), None) is not None:
+                remove.append(id(f))
+        if self.overview_binned:
+            # bins are averaged on python side, recount them
+            self.send_overview_viewport()
+        else:
+            self.map_widget.update_overview({"update": update, "remove": remove})
+
+    def sort_table(self):
+        header = self.table.horizontalHeader()
+        self.table_proxy.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+    @tracing.instrument("table")
+    def display_files(self, folder_path, supress_statusbar=False):
+        """
+        show mainfiles in table, apply filter
+        """
+
+        self.folder_path = folder_path  # Save the selected folder path
+
+        if self.table_model.files is not self.mainfiles:
+            self.table_model.set_files(self.mainfiles)
+        self.table_proxy.set_hide_with_coords(self.filter_has_coords_enabled)
+        if not self.table.isSortingEnabled():
+            self.table.sortByColumn(1, Qt.SortOrder.AscendingOrder)
+            self.table.setSortingEnabled(True)
+        self.apply_row_heights()
         if not supress_statusbar:
             self.statusBar().showMessage(f"Select image in table to edit coordinates")
         self.updateProgressBar()
 
     def display_image(self):
-        selected_items = self.table.selectedItems()
-        if selected_items:
-            file_name = selected_items[0].text()
-            full_path = os.path.join(self.folder_path, file_name)
-            self.mainfile_selected = full_path
-            self.file_path_label.setText(f"Selected File Path: {full_path}")
-            pixmap = QPixmap(full_path)
-            self.label.setPixmap(
-                pixmap.scaled(
-                    self.label.width(),
-                    self.label.height(),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                )
+        """
+        Selection changed. File name and status bar are updated at once,
+        preview decode and map markers are coalesced: while keys are held
+        only the row user stops on is rendered.
+        """
+        selected = self.selected_files()
+        if not selected:
+            return
+        f = selected[0]
+        self.mainfile_selected = f.file_path
+        self.file_path_label.setText(f"Selected File Path: {f.file_path}")
+        if self.mode_interface == self.mode_enter_coordinates:
+            self.statusBar().showMessage(
+                f"Move the marker to set coordinates for {f.file_name}"
+            )
+        elif self.mode_interface == self.mode_enter_destinations:
+            self.statusBar().showMessage(
+                f"Move the marker to set dest coordinates for {f.file_name}"
             )
+
+        self.selection_pending = f
+        self.selection_serial += 1
+        if self.selection_render_timer.isActive():
+            # burst: drop preview work of skipped rows, render when keys stop
+            self.preview_request += 1
+            self.preview_worker.latest_request = self.preview_request
+        else:
+            # first change after a pause is rendered right away
+            self.render_selection()
+        self.selection_render_timer.start()
+
+    def on_selection_settled(self):
+        if self.selection_rendered_serial != self.selection_serial:
+            self.render_selection()
+
+    def render_selection(self):
+        f = self.selection_pending
+        self.selection_rendered_serial = self.selection_serial
+        if f is None:
+            return
+        self.request_preview(f)
+        self.map_widget.update_scene(self.marker_scene(f))
+
+    def preview_key(self, f, size):
+        # size and mtime in key: edited or saved file gets new preview
+        return (f.file_path, f.size, f.mtime_ns, size.width(), size.height())
+
+    def request_preview(self, f):
+        size = self.label.size()
+        self.preview_request += 1
+        self.preview_worker.latest_request = self.preview_request
+        key = self.preview_key(f, size)
+        image = self.preview_cache.get(key)
+        if image is not None:
+            self.label.setPixmap(QPixmap.fromImage(image))
             self.label.setScaledContents(True)
+            current = None
+        else:
+            current = (key, f.file_path, size)
+        prefetch = [
+            (self.preview_key(neighbor, size), neighbor.file_path, size)
+            for neighbor in self.preview_neighbors(f)
+        ]
+        self.previewRequested.emit(self.preview_request, current, prefetch)
+        self.update_preview_cache_label()
+
+    def preview_neighbors(self, f):
+        """Records of next and previous rows in table order, to read ahead."""
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        ahead = settings.value("previewReadAhead", 3, type=int)
+        behind = settings.value("previewReadBehind", 1, type=int)
+        source_row = self.table_model.row_of(f)
+        if source_row < 0:
+            return []
+        row = self.table_proxy.mapFromSource(self.table_model.index(source_row, 0)).row()
+        rows = list(range(row + 1, row + 1 + ahead)) + list(range(row - 1, row - 1 - behind, -1))
+        count = self.table_proxy.rowCount()
+        return [self.table_proxy.file_at(r) for r in rows if 0 <= r < count]
+
+    def update_preview_cache_label(self):
+        cache = self.preview_cache
+        self.preview_cache_label.setText(
+            f"Preview cache: {cache.hits} hits, {cache.misses} misses,"
+            f" {cache.total_bytes // (1024 * 1024)} MB"
+        )
 
-            self.map_widget.page().runJavaScript("removeMarkers();")
+    def preview_cache_bytes(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        return settings.value("previewCacheMB", 256, type=int) * 1024 * 1024
 
-            if self.mode_interface == self.mode_enter_coordinates:
-                # display only photo coord
-                attr_lat = "lat"
-                attr_lon = "lon"
-                for i, f in enumerate(self.mainfiles):
-                    if f["file_path"] == full_path:
-                        if f["modified"].get(attr_lat) and f["modified"].get(attr_lon):
-                            self.add_marker(
-                                f["modified"][attr_lat],
-                                f["modified"][attr_lon],
-                                markerclass="image",
-                            )
-                        elif f.get(attr_lat) and f.get(attr_lon):
-                            self.add_marker(
-                                f[attr_lat], f[attr_lon], markerclass="image"
-                            )
-                        else:
-                            self.add_marker(lat=None, lon=None, markerclass="image")
-                        self.statusBar().showMessage(
-                            f"Move the marker to set coordinates for {file_name}"
-                        )
-                        break
+    def thumbnail_cache_dir(self):
+        cache_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.CacheLocation
+        )
+        return os.path.join(cache_dir, "photo_thumbnails")
 
-            elif self.mode_interface == self.mode_enter_destinations:
-                # display both photo coord and dest point
-                attr_lat = "dest_lat"
-                attr_lon = "dest_lon"
-
-                for i, f in enumerate(self.mainfiles):
-                    if f["file_path"] == full_path:
-                        if f["modified"].get(attr_lat) and f["modified"].get(attr_lon):
-                            self.add_marker(
-                                f["modified"][attr_lat],
-                                f["modified"][attr_lon],
-                                markerclass="dest",
-                            )
-                        elif f.get(attr_lat) and f.get(attr_lon):
-                            self.add_marker(
-                                f[attr_lat], f[attr_lon], markerclass="dest"
-                            )
-                        else:
-                            self.add_marker(lat=None, lon=None, markerclass="dest")
-                        self.statusBar().showMessage(
-                            f"Move the marker to set dest coordinates for {file_name}"
-                        )
-
-                        # non moveable marker for photo coord
-                        attr_lat = "lat"
-                        attr_lon = "lon"
-                        for i, f in enumerate(self.mainfiles):
-                            if f["file_path"] == full_path:
-                                if f["modified"].get(attr_lat) and f["modified"].get(
-                                    attr_lon
-                                ):
-                                    self.add_marker(
-                                        f["modified"][attr_lat],
-                                        f["modified"][attr_lon],
-                                        markerclass="image",
-                                        nonmoveable=True,
-                                    )
-                                elif f.get(attr_lat) and f.get(attr_lon):
-                                    self.add_marker(
-                                        f[attr_lat],
-                                        f[attr_lon],
-                                        markerclass="image",
-                                        nonmoveable=True,
-                                    )
-                        break
-
-    def format_date(self, timestamp):
-        from datetime import datetime
-
-        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    def thumbnail_cache_bytes(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        return settings.value("thumbnailCacheMB", 1024, type=int) * 1024 * 1024
+
+    def edit_thumbnail_cache(self):
+        value, ok = QInputDialog.getInt(
+            self,
+            "Thumbnail cache",
+            "Thumbnail cache size on disk, MB:",
+            self.thumbnail_cache_bytes() // (1024 * 1024),
+            0,
+            1024 * 1024,
+        )
+        if ok:
+            QSettings("Trolleway", "RaskladGeotag").setValue("thumbnailCacheMB", value)
+            if self.thumb_cache is not None:
+                self.thumb_cache.max_bytes = value * 1024 * 1024
+
+    def toggle_thumbnail_pregenerate(self, checked):
+        QSettings("Trolleway", "RaskladGeotag").setValue("thumbnailPregenerate", checked)
+
+    def start_thumbnail_generation(self):
+        if self.thumb_cache is None or not self.thumbnail_pregenerate_action.isChecked():
+            return
+        self.cancel_thumbnail_generation()
+        jobs = [(f.file_path, f.size, f.mtime_ns) for f in self.mainfiles]
+        self.thumbnail_thread = QThread(self)
+        # fewer workers than scan: decoding is CPU bound, keep GUI responsive
+        self.thumbnail_worker = ThumbnailWorker(
+            self.thumb_cache, jobs, max(1, (os.cpu_count() or 2) // 2)
+        )
+        self.thumbnail_worker.moveToThread(self.thumbnail_thread)
+        self.thumbnail_thread.started.connect(self.thumbnail_worker.run)
+        self.thumbnail_worker.progress.connect(self.on_thumbnail_progress)
+        self.thumbnail_worker.finished.connect(self.on_thumbnail_finished)
+        self.thumbnail_worker.finished.connect(self.thumbnail_thread.quit)
+        self.thumbnail_thread.start()
+
+    def cancel_thumbnail_generation(self):
+        if self.thumbnail_worker is not None:
+            self.thumbnail_worker.cancel()
+        if self.thumbnail_thread is not None:
+            self.thumbnail_thread.quit()
+            self.thumbnail_thread.wait()
+        self.thumbnail_worker = None
+        self.thumbnail_thread = None
+        self.thumbnail_label.hide()
+
+    def on_thumbnail_progress(self, done, total):
+        if self.sender() is not self.thumbnail_worker:
+            return
+        self.thumbnail_label.setText(f"Thumbnails: {done} / {total}")
+        self.thumbnail_label.setVisible(done < total)
+
+    def on_thumbnail_finished(self, cancelled):
+        if self.sender() is not self.thumbnail_worker:
+            return
+        self.thumbnail_thread.quit()
+        self.thumbnail_thread.wait()
+        self.thumbnail_worker = None
+        self.thumbnail_thread = None
+        self.thumbnail_label.hide()
+
+    def tile_cache_path(self):
+        cache_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.CacheLocation
+        )
+        return os.path.join(cache_dir, "map_tiles.mbtiles")
+
+    def tile_cache_bytes(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        return settings.value("tileCacheMB", 512, type=int) * 1024 * 1024
+
+    def edit_tile_cache(self):
+        value, ok = QInputDialog.getInt(
+            self,
+            "Map tile cache",
+            "Downloaded map tiles kept on disk, MB:",
+            self.tile_cache_bytes() // (1024 * 1024),
+            0,
+            1024 * 1024,
+        )
+        if ok:
+            QSettings("Trolleway", "RaskladGeotag").setValue("tileCacheMB", value)
+            if self.tile_cache is not None:
+                self.tile_cache.max_bytes = value * 1024 * 1024
+                self.tile_cache.evict()
+
+    def mbtiles_files(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        return settings.value("mbtilesFiles", [], type=list)
+
+    def open_mbtiles(self, paths):
+        sources = []
+        for path in paths:
+            try:
+                sources.append(tilecache.MBTilesSource(path))
+            except sqlite3.Error as e:
+                print(f"MBTiles {path} error {e}")
+        return sources
+
+    def import_mbtiles(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import MBTiles map", "", "MBTiles (*.mbtiles);;All files (*)"
+        )
+        if not path:
+            return
+        try:
+            source = tilecache.MBTilesSource(path)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Import MBTiles", f"Not a MBTiles file:\n{e}")
+            return
+        paths = [p for p in self.mbtiles_files() if p != path]
+        # last imported map is looked up first
+        paths.insert(0, path)
+        QSettings("Trolleway", "RaskladGeotag").setValue("mbtilesFiles", paths)
+        # tile handler shares this list
+        self.tile_sources[:] = [source] + [s for s in self.tile_sources if s.path != path]
+        self.map_widget.reload_tiles()
+        name = source.metadata().get("name", os.path.basename(path))
+        self.statusBar().showMessage(f"Map {name} imported")
+
+    def forget_mbtiles(self):
+        QSettings("Trolleway", "RaskladGeotag").setValue("mbtilesFiles", [])
+        for source in self.tile_sources:
+            source.close()
+        self.tile_sources.clear()
+        self.map_widget.reload_tiles()
+
+    def toggle_tile_offline(self, checked):
+        QSettings("Trolleway", "RaskladGeotag").setValue("tileOffline", checked)
+        if self.tile_handler is not None:
+            self.tile_handler.offline = checked
+
+    def toggle_tracing(self, checked):
+        if checked:
+            tracing.enable()
+            self.statusBar().showMessage("Recording trace of scan, preview, map, table and save")
+        else:
+            tracing.disable()
+            self.statusBar().showMessage(f"Trace stopped, {tracing.event_count()} spans recorded")
+
+    def save_trace(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save trace", "rasklad_trace.json", "Chrome trace (*.json)"
+        )
+        if not path:
+            return
+        try:
+            tracing.export_chrome(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Save trace", str(e))
+            return
+        self.statusBar().showMessage(
+            f"Trace of {tracing.event_count()} spans saved, open it in ui.perfetto.dev"
+            " or chrome://tracing"
+        )
+
+    def show_trace_summary(self):
+        msg_box = QMessageBox(self)
+        msg_box.setIcon(QMessageBox.Icon.Information)
+        msg_box.setWindowTitle("Trace summary")
+        msg_box.setText(f"{tracing.event_count()} spans recorded")
+        msg_box.setDetailedText(tracing.format_summary())
+        msg_box.exec()
+
+    def clear_trace(self):
+        tracing.clear()
+        self.statusBar().showMessage("Trace cleared")
+
+    def arm_profiler(self, target):
+        """Profile next run of target action: "scan" or "save"."""
+        self.profile_armed = target
+        name = "folder scan" if target == "scan" else "EXIF save"
+        self.statusBar().showMessage(f"Next {name} will be profiled")
+
+    def start_profiler(self, target):
+        if self.profile_armed != target or self.profiler is not None:
+            return
+        self.profile_armed = None
+        self.profiler_target = target
+        self.profiler = tracing.Sampler()
+        self.profiler.start()
+
+    def finish_profiler(self, target):
+        """Stop profiler of target action, write collapsed stacks, show top functions."""
+        if self.profiler is None or self.profiler_target != target:
+            return
+        profiler = self.profiler
+        self.profiler = None
+        profiler.stop()
+        folder = os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation),
+            "profiles",
+        )
+        path = os.path.join(folder, f"{target}-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            profiler.write_collapsed(path)
+        except OSError as e:
+            path = None
+            print("profile save error " + str(e))
+        if self.closing:
+            return
+        msg_box = QMessageBox(self)
+        msg_box.setIcon(QMessageBox.Icon.Information)
+        msg_box.setWindowTitle("Profile")
+        text = f"{profiler.samples} samples taken."
+        if path is not None:
+            text += f" Stacks for speedscope or flamegraph.pl are saved to {path}"
+        msg_box.setText(text)
+        msg_box.setDetailedText(profiler.format_top())
+        msg_box.exec()
+
+    def edit_preview_cache(self):
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        for key, label, default, maximum in (
+            ("previewCacheMB", "Preview cache size, MB:", 256, 16384),
+            ("previewReadAhead", "Photos decoded ahead:", 3, 50),
+            ("previewReadBehind", "Photos decoded behind:", 1, 50),
+        ):
+            value, ok = QInputDialog.getInt(
+                self,
+                "Preview cache",
+                label,
+                settings.value(key, default, type=int),
+                0,
+                maximum,
+            )
+            if not ok:
+                return
+            settings.setValue(key, value)
+        self.preview_cache.set_max_bytes(self.preview_cache_bytes())
+        self.update_preview_cache_label()
+
+    def clear_preview(self):
+        # late preview of previous selection must not show up again
+        self.preview_request += 1
+        self.preview_worker.latest_request = self.preview_request
+        self.label.setPixmap(QPixmap())  # unload image
+
+    def on_preview_ready(self, request_id, image):
+        # thumbnail first, then sharp preview of the same request
+        if request_id != self.preview_request:
+            return
+        self.label.setPixmap(QPixmap.fromImage(image))
+        self.label.setScaledContents(True)
+
+    def match_track(self):
+        """Stage positions from GPS track logs as not saved changes."""
+        # numpy import takes as long as all of Qt widgets, load it on first use
+        import tracklog
+
+        if not self.mainfiles:
+            self.statusBar().showMessage("Select a directory with images first")
+            return
+        if self.track_worker is not None:
+            return
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "GPS track",
+            settings.value("trackFolder", "", type=str),
+            "GPS tracks (*.gpx *.nmea *.nma *.log *.txt *.csv);;All files (*)",
+        )
+        if not paths:
+            return
+        settings.setValue("trackFolder", os.path.dirname(paths[0]))
+        text, ok = QInputDialog.getText(
+            self,
+            "Camera clock offset",
+            "Camera clock ahead of GPS time (UTC), [-]HH:MM:SS.\n"
+            "Include camera time zone, for example +03:00:00 for Moscow time.",
+            text=settings.value("trackCameraOffset", "+00:00:00", type=str),
+        )
+        if not ok:
+            return
+        try:
+            offset = tracklog.parse_offset(text)
+        except ValueError as e:
+            QMessageBox.warning(self, "Camera clock offset", str(e))
+            return
+        settings.setValue("trackCameraOffset", tracklog.format_offset(offset))
+        max_gap, ok = QInputDialog.getInt(
+            self,
+            "GPS track",
+            "Max seconds between track points to interpolate,\n"
+            "or from photo to nearest point:",
+            settings.value("trackMaxGap", tracklog.DEFAULT_MAX_GAP, type=int),
+            1,
+            7 * 24 * 3600,
+        )
+        if not ok:
+            return
+        settings.setValue("trackMaxGap", max_gap)
+        scopes = ["Photos without coordinates", "All photos"]
+        scope, ok = QInputDialog.getItem(
+            self,
+            "GPS track",
+            "Geotag:",
+            scopes,
+            settings.value("trackScope", 0, type=int),
+            False,
+        )
+        if not ok:
+            return
+        settings.setValue("trackScope", scopes.index(scope))
+
+        if scope == scopes[0]:
+            self.track_records = [
+                f for f in self.mainfiles if f.is_writable and f.position()[0] is None
+            ]
+        else:
+            self.track_records = [f for f in self.mainfiles if f.is_writable]
+        times = tracklog.photo_times(self.track_records, offset)
+        self.track_thread = QThread(self)
+        self.track_worker = TrackMatchWorker(paths, times, max_gap)
+        self.track_worker.moveToThread(self.track_thread)
+        self.track_thread.started.connect(self.track_worker.run)
+        self.track_worker.progress.connect(self.on_track_progress)
+        self.track_worker.finished.connect(self.on_track_finished)
+        self.track_worker.finished.connect(self.track_thread.quit)
+        self.track_thread.start()
+
+    def on_track_progress(self, done, total):
+        if self.sender() is not self.track_worker:
+            return
+        self.statusBar().showMessage(f"Reading GPS tracks: {done} of {total} files")
+
+    def on_track_finished(self, result, error):
+        if self.sender() is not self.track_worker:
+            return
+        self.track_thread.quit()
+        self.track_thread.wait()
+        self.track_worker = None
+        self.track_thread = None
+        records, self.track_records = self.track_records, []
+        if result is None:
+            QMessageBox.warning(self, "GPS track", f"Failed to read GPS track:\n{error}")
+            self.statusBar().showMessage("GPS track not loaded")
+            return
+        lats, lons, matched, points = result
+        changed = self.stage_positions(
+            (records[i], lats[i], lons[i]) for i in matched.nonzero()[0]
+        )
+        self.statusBar().showMessage(
+            f"{len(changed)} of {len(records)} photos matched to GPS track of {points} points."
+            " Review and save coordinates to EXIF"
+        )
+
+    def match_tagged_photos(self):
+        """Stage positions of photos without coordinates from tagged photos shot close in time."""
+        import tracklog
+
+        counts = dict()
+        for f in self.mainfiles:
+            tagged = f.position()[0] is not None
+            # read only photos serve as reference, but get no coordinates
+            if not tagged and not f.is_writable:
+                continue
+            count = counts.setdefault(f.model or "", [0, 0])
+            count[0 if tagged else 1] += 1
+        if not any(tagged for tagged, _ in counts.values()) or not any(
+            untagged for _, untagged in counts.values()
+        ):
+            self.statusBar().showMessage(
+                "Need photos with and without coordinates to match by time"
+            )
+            return
+        settings = QSettings("Trolleway", "RaskladGeotag")
+        saved_offsets = settings.value("cameraOffsets", dict()) or dict()
+        dialog = CameraMatchDialog(
+            counts,
+            {model: int(value) for model, value in saved_offsets.items()},
+            settings.value("cameraMatchTolerance", 60, type=int),
+            self,
+        )
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        saved_offsets.update(dialog.model_offsets)
+        settings.setValue("cameraOffsets", saved_offsets)
+        settings.setValue("cameraMatchTolerance", dialog.tolerance)
+
+        untagged = sum(untagged for _, untagged in counts.values())
+        changed = self.stage_positions(
+            tracklog.match_tagged_photos(self.mainfiles, dialog.model_offsets, dialog.tolerance)
+        )
+        self.statusBar().showMessage(
+            f"{len(changed)} of {untagged} photos without coordinates matched to tagged photos."
+            " Review and save coordinates to EXIF"
+        )
+
+    def stage_positions(self, matches):
+        """Set (record, lat, lon) positions as not saved changes, returns changed records."""
+        changed = []
+        for f, lat, lon in matches:
+            if not f.is_writable:
+                continue
+            f.set_position(lat, lon)
+            changed.append(f)
+        self.journal_edits(changed, MODIFIED_POSITION)
+        self.table_model.refresh_files(changed)
+        self.update_overview_records(changed)
+        self.updateProgressBar()
+        if self.selection_pending in changed:
+            self.render_selection()
+        return changed
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if "window_shown" not in self.startup_times:
+            QTimer.singleShot(0, self.on_window_shown)
+
+    def on_window_shown(self):
+        # paint now, so Chromium start below does not delay the first frame
+        self.repaint()
+        self.mark_startup("window_shown")
+        QTimer.singleShot(0, self.create_map)
+
+    def create_map(self):
+        """Open tile cache and build web map, once, after the window is shown."""
+        if self.map_widget.view is not None:
+            return
+        import mapview
+
+        try:
+            self.tile_cache = tilecache.TileCache(
+                self.tile_cache_path(), self.tile_cache_bytes()
+            )
+        except (OSError, sqlite3.Error) as e:
+            print("tile cache error " + str(e))
+        self.tile_handler = mapview.TileSchemeHandler(
+            self.tile_cache, self.tile_sources, self.tile_offline_action.isChecked(), self
+        )
+        self.map_widget.load(self.tile_handler)
+        self.mark_startup("map_created")
+
+    def mark_startup(self, step):
+        """
+        Record first time of startup step. At the last step timings are printed,
+        and written as JSON to file named by RASKLAD_STARTUP_BENCHMARK environment
+        variable, which also closes the app, for tracking startup time in scripts.
+        """
+        if step in self.startup_times:
+            return
+        self.startup_times[step] = time.perf_counter() - STARTUP_CLOCK
+        if step != self.STARTUP_STEPS[-1]:
+            return
+        print(
+            "startup: "
+            + ", ".join(
+                f"{name} {self.startup_times[name] * 1000:.0f} ms"
+                for name in self.STARTUP_STEPS
+                if name in self.startup_times
+            )
+        )
+        report_path = os.environ.get("RASKLAD_STARTUP_BENCHMARK")
+        if report_path:
+            with open(report_path, "w") as fp:
+                json.dump(
+                    {name: round(t * 1000, 1) for name, t in self.startup_times.items()},
+                    fp,
+                    indent=1,
+                )
+            QTimer.singleShot(0, self.close)
+
+    def closeEvent(self, event):
+        self.closing = True
+        self.cancel_thumbnail_generation()
+        self.write_behind_timer.stop()
+        # running QThread must not be destroyed with the window
+        self.folder_refresh_timer.stop()
+        for worker, thread in (
+            (self.scan_worker, self.scan_thread),
+            (self.save_worker, self.save_thread),
+            (self.refresh_worker, self.refresh_thread),
+        ):
+            if worker is not None:
+                worker.cancel()
+            if thread is not None:
+                thread.quit()
+                thread.wait()
+        if self.track_thread is not None:
+            self.track_thread.quit()
+            self.track_thread.wait()
+        # partial scan, track match and folder refresh are dropped, but files
+        # saved before cancel are taken off the journal by their queued results
+        # before it is closed; slots get them through PyQt proxy objects
+        self.scan_worker = None
+        self.track_worker = None
+        self.refresh_worker = None
+        QApplication.sendPostedEvents(None, QEvent.Type.MetaCall)
+        self.write_behind_timer.stop()
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.preview_worker.latest_request = -1
+        self.preview_thread.quit()
+        self.preview_thread.wait()
+        if self.tile_cache is not None:
+            self.tile_cache.close()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        super().closeEvent(event)
+
+    def marker_position(self, position):
+        """[lat, lon] for map, None for missing or zero coordinates."""
+        lat, lon = position
+        if lat and lon:
+            return [lat, lon]
+        return None
 
 
 def main():
+    # process pool folder scan in frozen windows build
+    multiprocessing.freeze_support()
+    # lets QtWebEngine load after QApplication is created, when the map is built
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    # url schemes are registered before QApplication exists; this loads the
+    # QtWebEngine libraries, Chromium still starts only when the map is built
+    import mapview
+
+    mapview.register_tile_scheme()
     app = QApplication(sys.argv)
+    app.setOrganizationName("Trolleway")
+    app.setApplicationName("RaskladGeotag")
     viewer = RaskladGeotag()
     viewer.show()
     sys.exit(app.exec())
@@ -0,0 +1,56 @@
+import math
+
+# above this many photos in viewport, send grid bins instead of points
+MAX_VIEWPORT_POINTS = 20000
+# bin size in screen pixels, same as client-side cluster cell
+BIN_PIXELS = 40
+
+
+def record_point(f):
+    """
+    [id, lat, lon, dest_lat, dest_lon] of record for overview layer, latest
+    values including not saved changes, or None if photo has no position.
+    """
+    lat, lon = f.position()
+    if lat is None or lon is None:
+        return None
+    dest_lat, dest_lon = f.dest()
+    return [id(f), lat, lon, dest_lat, dest_lon]
+
+
+def overview_points(records):
+    """Dict id: point of records with position."""
+    return {p[0]: p for p in map(record_point, records) if p is not None}
+
+
+def viewport_overview(
+    points, south, west, north, east, zoom, max_points=MAX_VIEWPORT_POINTS
+):
+    """
+    Message for overview layer with photos inside viewport.
+    Returns {"points": [...]} or, for too many photos, {"bins": [[lat, lon, count]]}
+    with photos averaged in BIN_PIXELS screen cells.
+    """
+    # a little margin, so short pans do not show empty edges
+    lat_margin = (north - south) * 0.25
+    lon_margin = (east - west) * 0.25
+    south, north = south - lat_margin, north + lat_margin
+    west, east = west - lon_margin, east + lon_margin
+    inside = [p for p in points.values() if south <= p[1] <= north and west <= p[2] <= east]
+    if len(inside) <= max_points:
+        return {"points": inside}
+
+    # bin size in degrees: longitude exact, latitude by mercator scale at view center
+    lon_step = BIN_PIXELS * 360 / (256 * 2**zoom)
+    lat_step = lon_step * math.cos(math.radians((south + north) / 2))
+    bins = dict()
+    for p in inside:
+        key = (int(p[1] // lat_step), int(p[2] // lon_step))
+        b = bins.get(key)
+        if b is None:
+            bins[key] = [p[1], p[2], 1]
+        else:
+            b[0] += p[1]
+            b[1] += p[2]
+            b[2] += 1
+    return {"bins": [[lat / count, lon / count, count] for lat, lon, count in bins.values()]}
@@ -0,0 +1,404 @@
+import os
+import sqlite3
+import sys
+
+from PyQt6 import sip
+from PyQt6.QtCore import QBuffer, QIODevice, QUrl
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtWebEngineCore import (
+    QWebEnginePage,
+    QWebEngineUrlRequestJob,
+    QWebEngineUrlScheme,
+    QWebEngineUrlSchemeHandler,
+)
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+
+import tilecache
+
+# QtWebEngine part of the map. main() imports it only to register the tiles:
+# scheme, the map itself is built after the window is shown: starting
+# Chromium is the slowest part of app startup.
+
+class CustomWebEnginePage(QWebEnginePage):
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        print(f"JavaScript console message: {message} (line: {line_number})")
+
+
+TILE_SCHEME = b"tiles"
+OSM_TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+
+def register_tile_scheme():
+    """Declare tiles: url scheme, must run before QApplication is created."""
+    scheme = QWebEngineUrlScheme(TILE_SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Path)
+    scheme.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+def web_dir():
+    """Folder with bundled Leaflet, unpacked from archive in frozen build."""
+    base_dir = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, "web")
+
+
+class TileSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Serves tiles:osm/{z}/{x}/{y}.png for the map page: from imported MBTiles,
+    then from tile cache, then downloaded from OpenStreetMap and cached.
+    In offline mode missing tiles fail at once instead of waiting for network.
+    """
+
+    def __init__(self, cache, sources, offline=False, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        # list owned by caller, imported maps apply to next requested tiles
+        self.sources = sources
+        self.offline = offline
+        self.network = QNetworkAccessManager(self)
+        self.hits = 0
+        self.downloads = 0
+
+    def requestStarted(self, job):
+        try:
+            _, z, x, y = job.requestUrl().path().rsplit(".", 1)[0].split("/")
+            z, x, y = int(z), int(x), int(y)
+        except ValueError:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlInvalid)
+            return
+        data = self.lookup(z, x, y)
+        if data is not None:
+            self.hits += 1
+            self.reply(job, data)
+            return
+        if self.offline:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        request = QNetworkRequest(QUrl(OSM_TILE_URL.format(z=z, x=x, y=y)))
+        # OpenStreetMap tile policy asks for an identifying user agent
+        request.setRawHeader(
+            b"User-Agent", b"RaskladGeotag (https://github.com/trolleway/rasklad_geotag)"
+        )
+        request.setTransferTimeout(10000)
+        reply = self.network.get(request)
+        reply.finished.connect(lambda: self.on_download_finished(reply, job, z, x, y))
+
+    def lookup(self, z, x, y):
+        try:
+            for source in self.sources:
+                data = source.get(z, x, y)
+                if data is not None:
+                    return data
+            if self.cache is not None:
+                return self.cache.get(z, x, y)
+        except sqlite3.Error as e:
+            print("tile cache error " + str(e))
+        return None
+
+    def on_download_finished(self, reply, job, z, x, y):
+        reply.deleteLater()
+        data = b""
+        if reply.error() == QNetworkReply.NetworkError.NoError:
+            data = bytes(reply.readAll())
+        if data and self.cache is not None:
+            self.downloads += 1
+            try:
+                self.cache.put(z, x, y, data)
+            except sqlite3.Error as e:
+                print("tile cache error " + str(e))
+        # page drops requests of tiles scrolled away meanwhile
+        if sip.isdeleted(job):
+            return
+        if data:
+            self.reply(job, data)
+        else:
+            job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+
+    def reply(self, job, data):
+        # buffer lives as long as the job reads it
+        buffer = QBuffer(job)
+        buffer.setData(data)
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(tilecache.tile_mime_type(data), buffer)
+
+
+class MapView(QWebEngineView):
+    """Leaflet page, talks to main.MapWidget through js_handler over QWebChannel."""
+
+    def __init__(self, js_handler, tile_handler=None, parent=None):
+        super().__init__(parent)
+        self.setPage(CustomWebEnginePage(self))
+        self.channel = QWebChannel(self)
+        self.channel.registerObject("jsHandler", js_handler)
+        self.page().setWebChannel(self.channel)
+
+        tile_url = OSM_TILE_URL
+        if tile_handler is not None:
+            self.page().profile().installUrlSchemeHandler(TILE_SCHEME, tile_handler)
+            tile_url = TILE_SCHEME.decode() + ":osm/{z}/{x}/{y}.png"
+        # base url lets the page load bundled leaflet files
+        self.setHtml(self.get_initial_map(tile_url), QUrl.fromLocalFile(web_dir() + "/"))
+
+    def reload_tiles(self):
+        self.page().runJavaScript("tileLayer.redraw();")
+
+    def get_initial_map(self, tile_url=OSM_TILE_URL):
+        leaflet_html = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Leaflet Map</title>
+            <meta charset="utf-8" />
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <link rel="stylesheet" href="leaflet/leaflet.css" />
+            <script src="leaflet/leaflet.js"></script>
+            <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+            <style> #map { width: 100%; height: 100%; } </style>
+        </head>
+        <body>
+            <div id="map" style="height: 500px;"></div>
+            <div id="coordinates">Coordinates: </div>
+            <script>
+                var map = L.map('map',{
+            wheelPxPerZoomLevel: 10 // Add this option
+        }).setView([55.666, 37.666], 11);
+                var tileLayer = L.tileLayer('TILE_URL', {
+                    attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+                }).addTo(map);
+
+                // first complete tile layer is reported once, channel may connect later
+                var tilesLoaded = false;
+                function reportTilesLoaded() {
+                    if (tilesLoaded && window.jsHandler) {
+                        jsHandler.tileLayerLoaded();
+                    }
+                }
+                tileLayer.once('load', function() {
+                    tilesLoaded = true;
+                    reportTilesLoaded();
+                });
+
+                
+                // markers and icons are created once and reused for every photo
+                var icons = {
+                    dest: L.icon({
+                        iconUrl: 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTAwIiBoZWlnaHQ9IjEwMCIgdmlld0JveD0iMCAwIDEwMCAxMDAiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxyZWN0IHg9IjMiIHk9IjMiIHdpZHRoPSI5NCIgaGVpZ2h0PSI5NCIgc3Ryb2tlPSJibGFjayIgc3Ryb2tlLXdpZHRoPSI2IiBzdHJva2UtbWl0ZXJsaW1pdD0iMi42MTMxMyIvPgo8cGF0aCBkPSJNNTAgMFYxMDAiIHN0cm9rZT0iYmxhY2siIHN0cm9rZS13aWR0aD0iMyIvPgo8cGF0aCBkPSJNMCA1MEMyLjgxNDA3IDUwIDY3LjgzOTIgNTAgMTAwIDUwIiBzdHJva2U9ImJsYWNrIiBzdHJva2Utd2lkdGg9IjMiLz4KPC9zdmc+Cg==', // Base64 encoded SVG
+                        iconSize: [20, 20],
+                        iconAnchor: [10, 10]
+                    }),
+                    image: L.icon({
+                        iconUrl: 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMzAiIGhlaWdodD0iMjAiIHZpZXdCb3g9IjAgMCAzMCAyMCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjMwIiBoZWlnaHQ9IjIwIiBmaWxsPSIjQjU2RDJEIi8+Cjwvc3ZnPgo=', // Base64 encoded SVG
+                        iconSize: [20, 20],
+                        iconAnchor: [10, 10]
+                    })
+                };
+                var markers = {};
+                // marker moved by map click, null if none is editable
+                var activeMarker = null;
+
+                new QWebChannel(qt.webChannelTransport, function(channel) {
+                    window.jsHandler = channel.objects.jsHandler;
+                    jsHandler.sceneUpdated.connect(function(message) {
+                        applyScene(JSON.parse(message));
+                    });
+                    jsHandler.overviewUpdated.connect(function(message) {
+                        applyOverview(JSON.parse(message));
+                    });
+                    jsHandler.mapReady();
+                    reportTilesLoaded();
+                    console.log("Channel initialized");
+                });
+
+                function sendCoordinates(coords) {
+                    document.getElementById('coordinates').innerText = "Coordinates: " + coords.lat.toFixed(7) + ", " + coords.lng.toFixed(7);
+                    if (window.jsHandler) {
+                        window.jsHandler.coordinatesUpdatedSlot(coords.lat.toFixed(7), coords.lng.toFixed(7));
+                    } else {
+                        console.log("jsHandler is not defined");
+                    }
+                }
+
+                function getMarker(markerclass) {
+                    if (!markers[markerclass]) {
+                        var marker = L.marker(map.getCenter(), {
+                            draggable: true,
+                            autoPan: true,
+                            icon: icons[markerclass]
+                        });
+                        marker.on('dragend', function(e) {
+                            sendCoordinates(e.target.getLatLng());
+                        });
+                        markers[markerclass] = marker;
+                    }
+                    return markers[markerclass];
+                }
+
+                // scene: {view: {center, zoom}, image: marker state, dest: marker state, active}
+                // marker state: null to hide, or {position: [lat, lon] or null for map center, draggable}
+                function applyScene(scene) {
+                    if (scene.view) {
+                        map.setView(scene.view.center, scene.view.zoom);
+                    }
+                    ['image', 'dest'].forEach(function(markerclass) {
+                        var state = scene[markerclass];
+                        var marker = getMarker(markerclass);
+                        if (!state) {
+                            if (map.hasLayer(marker)) {
+                                map.removeLayer(marker);
+                            }
+                            return;
+                        }
+                        marker.setLatLng(state.position || map.getCenter());
+                        if (!map.hasLayer(marker)) {
+                            marker.addTo(map);
+                        }
+                        // dragging handler exists only while marker is on map
+                        if (state.draggable) {
+                            marker.dragging.enable();
+                        } else {
+                            marker.dragging.disable();
+                        }
+                    });
+                    activeMarker = scene.active ? markers[scene.active] : null;
+                }
+
+                // overview of all photo positions, drawn on own canvas:
+                // the canvas moves with map pane while panning and is redrawn on moveend
+                var overviewData = {points: new Map(), bins: []};
+                var OverviewLayer = L.Layer.extend({
+                    onAdd: function(map) {
+                        this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+                        map.getPanes().overlayPane.appendChild(this._canvas);
+                        map.on('moveend', this.redraw, this);
+                        this.redraw();
+                    },
+                    onRemove: function(map) {
+                        L.DomUtil.remove(this._canvas);
+                        map.off('moveend', this.redraw, this);
+                    },
+                    redraw: function() {
+                        if (!this._map) {
+                            return;
+                        }
+                        var size = map.getSize();
+                        var canvas = this._canvas;
+                        L.DomUtil.setPosition(canvas, map.containerPointToLayerPoint([0, 0]));
+                        canvas.width = size.x;
+                        canvas.height = size.y;
+                        var ctx = canvas.getContext('2d');
+                        var clusters = clusterOverview(size);
+                        ctx.strokeStyle = '#2b83ba';
+                        ctx.lineWidth = 1;
+                        ctx.beginPath();
+                        clusters.forEach(function(c) {
+                            if (c.count === 1 && c.dest) {
+                                var d = map.latLngToContainerPoint(c.dest);
+                                ctx.moveTo(c.x, c.y);
+                                ctx.lineTo(d.x, d.y);
+                            }
+                        });
+                        ctx.stroke();
+                        ctx.textAlign = 'center';
+                        ctx.textBaseline = 'middle';
+                        ctx.font = '10px sans-serif';
+                        clusters.forEach(function(c) {
+                            var radius = c.count === 1 ? 4 : Math.min(20, 7 + 2 * Math.log(c.count));
+                            ctx.fillStyle = c.count === 1 ? '#d7191c' : 'rgba(253, 174, 97, 0.85)';
+                            ctx.beginPath();
+                            ctx.arc(c.x, c.y, radius, 0, 2 * Math.PI);
+                            ctx.fill();
+                            if (c.count > 1) {
+                                ctx.fillStyle = 'black';
+                                ctx.fillText(String(c.count), c.x, c.y);
+                            }
+                        });
+                    }
+                });
+                var overviewLayer = new OverviewLayer();
+
+                // grid clustering in screen pixels of photos and server bins inside view
+                function clusterOverview(size) {
+                    var cell = 40;
+                    var cells = new Map();
+                    function add(lat, lon, count, dest) {
+                        var p = map.latLngToContainerPoint([lat, lon]);
+                        if (p.x < -cell || p.y < -cell || p.x > size.x + cell || p.y > size.y + cell) {
+                            return;
+                        }
+                        var key = Math.floor(p.x / cell) + ':' + Math.floor(p.y / cell);
+                        var c = cells.get(key);
+                        if (!c) {
+                            cells.set(key, {x: p.x * count, y: p.y * count, count: count, dest: dest});
+                        } else {
+                            c.x += p.x * count;
+                            c.y += p.y * count;
+                            c.count += count;
+                        }
+                    }
+                    overviewData.points.forEach(function(p) {
+                        add(p[1], p[2], 1, p[3] !== null ? [p[3], p[4]] : null);
+                    });
+                    overviewData.bins.forEach(function(b) {
+                        add(b[0], b[1], b[2], null);
+                    });
+                    var clusters = [];
+                    cells.forEach(function(c) {
+                        c.x /= c.count;
+                        c.y /= c.count;
+                        clusters.push(c);
+                    });
+                    return clusters;
+                }
+
+                function requestOverview() {
+                    if (window.jsHandler && map.hasLayer(overviewLayer)) {
+                        var b = map.getBounds();
+                        window.jsHandler.viewportChanged(b.getSouth(), b.getWest(), b.getNorth(), b.getEast(), map.getZoom());
+                    }
+                }
+                map.on('moveend', requestOverview);
+
+                // message: {enabled, points or bins: replace data of viewport,
+                // update: changed points, remove: ids of photos without position}
+                function applyOverview(message) {
+                    if (message.enabled === false) {
+                        map.removeLayer(overviewLayer);
+                        overviewData = {points: new Map(), bins: []};
+                        return;
+                    }
+                    if (message.points || message.bins) {
+                        overviewData.points = new Map();
+                        (message.points || []).forEach(function(p) {
+                            overviewData.points.set(p[0], p);
+                        });
+                        overviewData.bins = message.bins || [];
+                    }
+                    (message.update || []).forEach(function(p) {
+                        overviewData.points.set(p[0], p);
+                    });
+                    (message.remove || []).forEach(function(id) {
+                        overviewData.points.delete(id);
+                    });
+                    if (message.enabled === true && !map.hasLayer(overviewLayer)) {
+                        overviewLayer.addTo(map);
+                        requestOverview();
+                    } else {
+                        overviewLayer.redraw();
+                    }
+                }
+
+                // one click handler for the whole session: move editable marker
+                map.on('click', function(e) {
+                    if (activeMarker && map.hasLayer(activeMarker)) {
+                        activeMarker.setLatLng(e.latlng);
+                        sendCoordinates(e.latlng);
+                    }
+                });
+            </script>
+        </body>
+        </html>
+        """
+        return leaflet_html.replace("TILE_URL", tile_url)
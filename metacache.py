@@ -0,0 +1,189 @@
+import math
+import os
+import time
+
+import photostore
+from sqlitedb import open_db, subtree_range
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+# folder column is directory of the file itself; caches of older layout are dropped
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    file_path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    model TEXT,
+    datetime_original TEXT,
+    lat REAL,
+    lon REAL,
+    dest_lat REAL,
+    dest_lon REAL
+);
+CREATE INDEX IF NOT EXISTS photos_folder ON photos (folder);
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    last_used REAL NOT NULL
+);
+"""
+
+COLUMNS = (
+    "file_path, size, mtime_ns, inode, model, datetime_original, lat, lon, dest_lat, dest_lon"
+)
+
+
+class MetadataCache:
+    """
+    On-disk cache of exif fields read by photostore.scan_photo.
+    Entry is valid while file size, mtime and inode are the same.
+    Rows belong to the directory of the file, so opening a folder and later
+    its parent or subfolder reads the same rows. Directories are evicted
+    least recently scanned first when the file grows over max_bytes.
+    """
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.db = open_db(db_path)
+        (version,) = self.db.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            with self.db:
+                self.db.execute("DROP TABLE IF EXISTS photos")
+                self.db.execute("DROP TABLE IF EXISTS folders")
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def load_folder(self, folder, recursive=True):
+        """Return dict file_path: row for cached files of folder, and of subfolders if recursive."""
+        if recursive:
+            rows = self.db.execute(
+                f"SELECT {COLUMNS} FROM photos WHERE file_path >= ? AND file_path < ?",
+                subtree_range(folder),
+            )
+        else:
+            rows = self.db.execute(f"SELECT {COLUMNS} FROM photos WHERE folder = ?", (folder,))
+        return {row[0]: row for row in rows}
+
+    @staticmethod
+    def is_valid(row, stat):
+        # inode is 0 on some network filesystems, compare it only when known
+        return (
+            row[1] == stat.st_size
+            and row[2] == stat.st_mtime_ns
+            and (row[3] == 0 or stat.st_ino == 0 or row[3] == stat.st_ino)
+        )
+
+    @staticmethod
+    def record_from_row(row, stat):
+        """Build PhotoRecord as photostore.scan_photo does."""
+        file_path, _, _, _, model, datetime_original, lat, lon, dest_lat, dest_lon = row
+        f = photostore.PhotoRecord(file_path, stat)
+        f.set_exif(model, datetime_original, lat, lon, dest_lat, dest_lon)
+        return f
+
+    def store(self, records):
+        """Insert or update scan_photo results."""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO photos VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                [
+                    (
+                        f.file_path,
+                        f.folder,
+                        f.size,
+                        f.mtime_ns,
+                        f.inode,
+                        f.model,
+                        f.datetime_original,
+                        f.lat,
+                        f.lon,
+                        f.dest_lat,
+                        f.dest_lon,
+                    )
+                    for f in records
+                ],
+            )
+
+    def forget_missing(self, folder, existing_paths, recursive=True):
+        """
+        Delete rows of deleted files in folder, and in subfolders if recursive.
+        Files not in existing_paths are checked on disk: scan may skip them by pattern.
+        """
+        cached = self.load_folder(folder, recursive)
+        missing = [
+            (p,) for p in cached if p not in existing_paths and not os.path.exists(p)
+        ]
+        if missing:
+            with self.db:
+                self.db.executemany("DELETE FROM photos WHERE file_path = ?", missing)
+
+    def touch(self, folders):
+        """Mark directories as just scanned."""
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO folders VALUES (?, ?)", [(d, now) for d in folders]
+            )
+
+    def clear(self, folder=None):
+        """Delete rows of folder and its subfolders, or everything."""
+        with self.db:
+            if folder is None:
+                self.db.execute("DELETE FROM photos")
+                self.db.execute("DELETE FROM folders")
+            else:
+                low, high = subtree_range(folder)
+                self.db.execute(
+                    "DELETE FROM photos WHERE file_path >= ? AND file_path < ?", (low, high)
+                )
+                self.db.execute(
+                    "DELETE FROM folders WHERE folder = ? OR (folder >= ? AND folder < ?)",
+                    (folder, low, high),
+                )
+
+    def used_bytes(self):
+        """Size of pages in use; pages freed by deletes are reused, not counted."""
+        (page_count,) = self.db.execute("PRAGMA page_count").fetchone()
+        (free_pages,) = self.db.execute("PRAGMA freelist_count").fetchone()
+        (page_size,) = self.db.execute("PRAGMA page_size").fetchone()
+        return (page_count - free_pages) * page_size
+
+    def evict(self, keep_folder=None):
+        """
+        Drop least recently scanned directories until cache fits max_bytes.
+        Directories inside keep_folder stay. Return number of rows dropped.
+        """
+        keep_prefix = os.path.join(keep_folder, "") if keep_folder else None
+        candidates = [
+            (folder, count)
+            for folder, count, _ in self.db.execute(
+                "SELECT photos.folder, count(*), coalesce(folders.last_used, 0)"
+                " FROM photos LEFT JOIN folders ON photos.folder = folders.folder"
+                " GROUP BY photos.folder ORDER BY 3"
+            ).fetchall()
+            if not keep_prefix or (folder != keep_folder and not folder.startswith(keep_prefix))
+        ]
+        candidates.reverse()
+        dropped = 0
+        used = self.used_bytes()
+        while used > self.max_bytes and candidates:
+            (total,) = self.db.execute("SELECT count(*) FROM photos").fetchone()
+            # size per row is an estimate, pages of indexes are freed unevenly
+            excess = math.ceil((used - self.max_bytes) / (used / total))
+            removed = []
+            batch = 0
+            while candidates and batch < excess:
+                folder, count = candidates.pop()
+                removed.append((folder,))
+                batch += count
+            with self.db:
+                self.db.executemany("DELETE FROM photos WHERE folder = ?", removed)
+                self.db.executemany("DELETE FROM folders WHERE folder = ?", removed)
+            dropped += batch
+            used = self.used_bytes()
+        return dropped
@@ -0,0 +1,291 @@
+import fnmatch
+import os
+import sys
+from datetime import datetime
+
+import geoexif
+import tracing
+
+# lower case, compared with lower case file name
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".heic", ".heif", ".tif", ".tiff")
+# geoexif writes JPEG only, other photos are shown read-only
+WRITABLE_EXTENSIONS = (".jpg", ".jpeg")
+
+# bits of PhotoRecord.modified
+MODIFIED_POSITION = 1
+MODIFIED_DEST = 2
+
+
+class PhotoRecord:
+    """
+    One photo of opened folder. Values read from file live in lat/lon/dest_lat/dest_lon,
+    not saved user changes in new_* attributes, flagged in modified bitmask.
+    __slots__ keeps it under half the memory of a dict record, for 100k photo folders.
+    """
+
+    __slots__ = (
+        "folder",
+        "file_name",
+        "size",
+        "mtime_ns",
+        "inode",
+        "model",
+        "datetime_original",
+        "lat",
+        "lon",
+        "dest_lat",
+        "dest_lon",
+        "new_lat",
+        "new_lon",
+        "new_dest_lat",
+        "new_dest_lon",
+        "modified",
+        "seconds_since_previous",
+    )
+
+    def __init__(self, file_path, stat=None):
+        folder, file_name = os.path.split(file_path)
+        # thousands of records share same folder and camera model strings
+        self.folder = sys.intern(folder)
+        self.file_name = file_name
+        self.size = stat.st_size if stat is not None else 0
+        self.mtime_ns = stat.st_mtime_ns if stat is not None else 0
+        self.inode = stat.st_ino if stat is not None else 0
+        self.model = None
+        self.datetime_original = None
+        self.lat = None
+        self.lon = None
+        self.dest_lat = None
+        self.dest_lon = None
+        self.new_lat = None
+        self.new_lon = None
+        self.new_dest_lat = None
+        self.new_dest_lon = None
+        self.modified = 0
+        self.seconds_since_previous = None
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"PhotoRecord({self.file_path!r})"
+
+    @property
+    def file_path(self):
+        return os.path.join(self.folder, self.file_name)
+
+    @property
+    def modification_date(self):
+        return datetime.fromtimestamp(self.mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+
+    def set_exif(self, model, datetime_original, lat, lon, dest_lat, dest_lon):
+        self.model = sys.intern(model) if model else model
+        self.datetime_original = datetime_original
+        self.lat = lat
+        self.lon = lon
+        self.dest_lat = dest_lat
+        self.dest_lon = dest_lon
+
+    def set_stat(self, stat):
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.inode = stat.st_ino
+
+    def stat_changed(self, stat):
+        return self.size != stat.st_size or self.mtime_ns != stat.st_mtime_ns
+
+    # coordinates
+
+    @property
+    def is_writable(self):
+        """Coordinates can be saved to this file."""
+        return self.file_name.lower().endswith(WRITABLE_EXTENSIONS)
+
+    @property
+    def is_modified(self):
+        return self.modified != 0
+
+    def has_coords(self):
+        """Coordinates are stored in file."""
+        return self.lat is not None or self.lon is not None
+
+    def set_position(self, lat, lon):
+        self.new_lat = float(lat)
+        self.new_lon = float(lon)
+        self.modified |= MODIFIED_POSITION
+
+    def set_dest(self, lat, lon):
+        self.new_dest_lat = float(lat)
+        self.new_dest_lon = float(lon)
+        self.modified |= MODIFIED_DEST
+
+    def position(self):
+        """Latest image coordinates: not saved changes first, then file values."""
+        if self.modified & MODIFIED_POSITION:
+            return self.new_lat, self.new_lon
+        return self.lat, self.lon
+
+    def dest(self):
+        """Latest destination coordinates."""
+        if self.modified & MODIFIED_DEST:
+            return self.new_dest_lat, self.new_dest_lon
+        return self.dest_lat, self.dest_lon
+
+    def changes(self):
+        """Snapshot of not saved changes, to compare after background save."""
+        return (
+            self.modified,
+            self.new_lat,
+            self.new_lon,
+            self.new_dest_lat,
+            self.new_dest_lon,
+        )
+
+    def save_job(self):
+        """Return kwargs for geoexif.write_gps_exif, or None if nothing to write."""
+        if not self.is_writable:
+            return None
+        lat = lon = dest_lat = dest_lon = None
+        if self.modified & MODIFIED_POSITION:
+            lat, lon = self.new_lat, self.new_lon
+        if self.modified & MODIFIED_DEST:
+            dest_lat, dest_lon = self.new_dest_lat, self.new_dest_lon
+        if lat is None and dest_lat is None:
+            return None
+
+        # bearing is calculated from latest version of coordinates:
+        # when user open exist photo with coordinates and add dest coordinates,
+        # bearing must use coordinates from file
+        direction = None
+        heading_lat, heading_lon = self.position()
+        heading_dest_lat, heading_dest_lon = self.dest()
+        if None not in (heading_lat, heading_lon, heading_dest_lat, heading_dest_lon):
+            direction = geoexif.calculate_heading(
+                heading_lat, heading_lon, heading_dest_lat, heading_dest_lon
+            )
+        return dict(
+            lat=lat, lon=lon, dest_lat=dest_lat, dest_lon=dest_lon, direction=direction
+        )
+
+    def merge_saved(self, saved_changes, stat=None):
+        """Saved values become file values; keep changes made while saving."""
+        modified, new_lat, new_lon, new_dest_lat, new_dest_lon = saved_changes
+        if modified & MODIFIED_POSITION:
+            self.lat, self.lon = new_lat, new_lon
+        if modified & MODIFIED_DEST:
+            self.dest_lat, self.dest_lon = new_dest_lat, new_dest_lon
+        if self.changes() == saved_changes:
+            self.modified = 0
+            self.new_lat = self.new_lon = self.new_dest_lat = self.new_dest_lon = None
+        if stat is not None:
+            self.set_stat(stat)
+
+
+def split_patterns(text):
+    """Glob patterns from settings string separated by ; or newlines."""
+    return [p.strip() for p in text.replace("\n", ";").split(";") if p.strip()]
+
+
+def _matches(rel_path, name, patterns):
+    return any(
+        fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns
+    )
+
+
+def iter_photo_files(folder, include=(), exclude=(), recursive=True, directories=None):
+    """
+    Yield (path, stat) of photo files under folder while directories are read.
+    stat comes from os.scandir entry, no extra os.stat call on most platforms.
+    Patterns are fnmatch globs, tried on file name and on path relative
+    to folder with / separators. Excluded directories are not entered.
+    Symlinked directories are not followed.
+    Every directory entered, with photos or not, is appended to directories list.
+    """
+    pending = [(folder, "")]
+    while pending:
+        directory, rel_dir = pending.pop()
+        subdirs = []
+        try:
+            it = os.scandir(directory)
+        except OSError as e:
+            print("scan error " + str(e), file=sys.stderr)
+            continue
+        if directories is not None:
+            directories.append(directory)
+        with it:
+            for entry in it:
+                try:
+                    rel_path = rel_dir + entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not _matches(rel_path, entry.name, exclude):
+                            subdirs.append((entry.path, rel_path + "/"))
+                        continue
+                    if not entry.name.lower().endswith(PHOTO_EXTENSIONS):
+                        continue
+                    if include and not _matches(rel_path, entry.name, include):
+                        continue
+                    if _matches(rel_path, entry.name, exclude):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError as e:
+                    print("scan error " + str(e), file=sys.stderr)
+                    continue
+                yield entry.path, stat
+        # depth first, subfolders in name order
+        pending.extend(sorted(subdirs, reverse=True))
+
+
+def scan_photo(file_path):
+    """
+    stat file and read fields used by RaskladGeotag from exif.
+    Module level function, so it can be submitted to a process pool.
+    OSError is raised, not returned as a file without exif: read may fail
+    on a network share for a file which is fine, and such record must not
+    get into metadata cache.
+    """
+    f = PhotoRecord(file_path, os.stat(file_path))
+    try:
+        with tracing.span("exif", "scan"):
+            try:
+                record = geoexif.read_gps_exif(file_path)
+            except ValueError:
+                record = geoexif.read_gps_exif_fallback(file_path)
+    except OSError:
+        raise
+    except Exception:
+        print("exif read error " + file_path, file=sys.stderr)
+        return f
+    f.set_exif(*record)
+    return f
+
+
+def count_with_coords(records):
+    """Records having image coordinates in file or in not saved changes."""
+    return sum(1 for f in records if f.position()[0] is not None)
+
+
+def update_seconds_since_previous(records):
+    """Time gap to previous shot, in shooting order."""
+    previous = None
+    for f in sorted(records, key=lambda f: (f.datetime_original or "", f.file_name)):
+        if previous is None:
+            f.seconds_since_previous = 0
+        else:
+            f.seconds_since_previous = delta_seconds(previous, f.datetime_original)
+        previous = f.datetime_original
+
+
+def delta_seconds(s1, s2):
+    try:
+        fmt = "%Y:%m:%d %H:%M:%S"
+        dt1 = datetime.strptime(s1, fmt)
+        dt2 = datetime.strptime(s2, fmt)
+        return abs((dt2 - dt1).total_seconds())
+    except Exception:
+        return 0.0
@@ -0,0 +1,21 @@
+import os
+import sqlite3
+
+
+def open_db(db_path, synchronous="NORMAL"):
+    """
+    Open sqlite file in WAL mode, creating its folder if needed.
+    sqlite connection is bound to the thread which opened it, so a worker
+    thread opens its own connection instead of sharing one.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(f"PRAGMA synchronous={synchronous}")
+    return db
+
+
+def subtree_range(folder):
+    """(low, high) bounds of file paths inside folder, for an index range scan."""
+    prefix = os.path.join(folder, "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
@@ -0,0 +1,145 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import editjournal  # noqa: E402
+import photostore  # noqa: E402
+from photostore import MODIFIED_DEST, MODIFIED_POSITION  # noqa: E402
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / "photos" / "day2").mkdir(parents=True)
+    for name in ("a.jpg", "b.jpg", "day2/c.jpg"):
+        (tmp_path / "photos" / name).write_bytes(b"")
+    return str(tmp_path / "photos")
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = editjournal.EditJournal(str(tmp_path / "journal.sqlite"))
+    yield journal
+    journal.close()
+
+
+def record(folder, name, lat=None, lon=None, dest=None):
+    f = photostore.PhotoRecord(os.path.join(folder, name))
+    if lat is not None:
+        f.set_position(lat, lon)
+    if dest is not None:
+        f.set_dest(*dest)
+    return f
+
+
+def fresh(folder, *names):
+    """Records as a new scan gives them, without edits."""
+    return [photostore.PhotoRecord(os.path.join(folder, name)) for name in names]
+
+
+def test_record_and_replay(folder, journal):
+    a = record(folder, "a.jpg", 10, 20, dest=(10.1, 20.1))
+    c = record(folder, os.path.join("day2", "c.jpg"), 30, 40)
+    journal.record([a, c], MODIFIED_POSITION)
+    journal.record([a], MODIFIED_DEST)
+
+    records = fresh(folder, "a.jpg", "b.jpg", os.path.join("day2", "c.jpg"))
+    changed = journal.replay(folder, records)
+
+    assert changed == [records[0], records[2]]
+    assert records[0].position() == (10, 20)
+    assert records[0].dest() == (10.1, 20.1)
+    assert records[0].modified == MODIFIED_POSITION | MODIFIED_DEST
+    assert not records[1].is_modified
+    assert records[2].position() == (30, 40)
+    assert records[2].modified == MODIFIED_POSITION
+
+
+def test_latest_edit_per_kind_wins(folder, journal):
+    a = record(folder, "a.jpg")
+    for lat in (1, 2, 3):
+        a.set_position(lat, lat)
+        journal.record([a], MODIFIED_POSITION)
+    a.set_dest(5, 5)
+    journal.record([a], MODIFIED_DEST)
+    # later destination edit does not hide the latest position edit
+    a.set_position(4, 4)
+    journal.record([a], MODIFIED_POSITION)
+    a.set_dest(6, 6)
+    journal.record([a], MODIFIED_DEST)
+
+    assert journal.pending(folder) == {
+        a.file_path: {MODIFIED_POSITION: (4, 4), MODIFIED_DEST: (6, 6)}
+    }
+
+
+def test_pending_of_folder_only(folder, journal, tmp_path):
+    other = str(tmp_path / "photos2")
+    journal.record([record(folder, "a.jpg", 1, 1)], MODIFIED_POSITION)
+    journal.record([record(other, "a.jpg", 2, 2)], MODIFIED_POSITION)
+
+    assert list(journal.pending(folder)) == [os.path.join(folder, "a.jpg")]
+    assert list(journal.pending(other)) == [os.path.join(other, "a.jpg")]
+
+
+def test_forget_keeps_edits_made_while_saving(folder, journal):
+    a = record(folder, "a.jpg", 1, 1)
+    b = record(folder, "b.jpg", 2, 2)
+    journal.record([a, b], MODIFIED_POSITION)
+    save_started = journal.last_id()
+    # user edits a.jpg again while the save of both files runs
+    a.set_position(9, 9)
+    journal.record([a], MODIFIED_POSITION)
+
+    journal.forget([a.file_path, b.file_path], save_started)
+
+    assert journal.pending(folder) == {a.file_path: {MODIFIED_POSITION: (9, 9)}}
+
+
+def test_forget_missing_keeps_files_not_scanned(folder, journal):
+    names = ("a.jpg", "b.jpg", os.path.join("day2", "c.jpg"))
+    journal.record([record(folder, name, 1, 1) for name in names], MODIFIED_POSITION)
+    os.remove(os.path.join(folder, "b.jpg"))
+
+    # scan without subfolders returned a.jpg only
+    journal.forget_missing(folder, {os.path.join(folder, "a.jpg")})
+
+    assert sorted(journal.pending(folder)) == [
+        os.path.join(folder, "a.jpg"),
+        os.path.join(folder, "day2", "c.jpg"),
+    ]
+
+
+def test_compact_on_open(folder, tmp_path):
+    db_path = str(tmp_path / "journal.sqlite")
+    journal = editjournal.EditJournal(db_path)
+    a = record(folder, "a.jpg", dest=(7, 7))
+    journal.record([a], MODIFIED_DEST)
+    for lat in range(5):
+        a.set_position(lat, lat)
+        journal.record([a], MODIFIED_POSITION)
+    journal.close()
+
+    journal = editjournal.EditJournal(db_path)
+    (rows,) = journal.db.execute("SELECT count(*) FROM edits").fetchone()
+    assert rows == 2
+    assert journal.pending(folder) == {
+        a.file_path: {MODIFIED_POSITION: (4, 4), MODIFIED_DEST: (7, 7)}
+    }
+    journal.close()
+
+
+def test_replay_skips_read_only_files(folder, journal):
+    journal.record(
+        [record(folder, "a.heic", 1, 1), record(folder, "a.jpg", 2, 2)], MODIFIED_POSITION
+    )
+
+    records = fresh(folder, "a.heic", "a.jpg")
+    changed = journal.replay(folder, records)
+
+    # coordinates are written to JPEG only
+    assert changed == [records[1]]
+    assert not records[0].is_modified
+    assert records[0].save_job() is None
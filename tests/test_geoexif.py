@@ -0,0 +1,158 @@
+import io
+import os
+import struct
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("PyQt6.QtGui")
+exif = pytest.importorskip("exif")
+
+import corpus  # noqa: E402
+import geoexif  # noqa: E402
+
+# tolerance of 1/10000 arc second rationals written by gps_entries
+DEGREES = 1e-7
+
+
+@pytest.fixture(scope="module")
+def jpeg():
+    return corpus.encode_jpeg(64, 48)
+
+
+def split_head(jpeg):
+    """SOI and JFIF APP0, where APP1 goes, and the rest of file."""
+    head_end = 2
+    if jpeg[2:4] == b"\xff\xe0":
+        head_end = 4 + struct.unpack(">H", jpeg[4:6])[0]
+    return jpeg[:head_end], jpeg[head_end:]
+
+
+def read_bytes(path):
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def without_app1(data):
+    """File bytes with APP1 exif segment cut out."""
+    segment = geoexif.find_exif_segment(io.BytesIO(data))
+    if segment is None:
+        return data
+    tiff_offset, tiff = segment
+    return data[: tiff_offset - 10] + data[tiff_offset + len(tiff) :]
+
+
+def write_photo(tmp_path, jpeg, segment):
+    head, body = split_head(jpeg)
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(head + segment + body)
+    return str(path)
+
+
+def segment_without_gps(endian="<"):
+    """APP1 with IFD0 and exif IFD but no GPS IFD pointer, as some editors write."""
+    exif_ifd = {
+        geoexif.TAG_DATETIME_ORIGINAL: (2, 20, b"2024:05:01 06:00:00\x00"),
+    }
+    ifd0 = {
+        geoexif.TAG_MODEL: (2, 13, b"Canon EOS 5D\x00"),
+        geoexif.TAG_EXIF_IFD: (4, 1, struct.pack(endian + "I", 0)),
+    }
+    exif_offset = 8 + len(geoexif.build_ifd(endian, ifd0, 8))
+    ifd0[geoexif.TAG_EXIF_IFD] = (4, 1, struct.pack(endian + "I", exif_offset))
+    tiff = (
+        (b"II" if endian == "<" else b"MM")
+        + struct.pack(endian + "HI", 42, 8)
+        + geoexif.build_ifd(endian, ifd0, 8)
+        + geoexif.build_ifd(endian, exif_ifd, exif_offset)
+    )
+    return b"\xff\xe1" + struct.pack(">H", 8 + len(tiff)) + b"Exif\x00\x00" + tiff
+
+
+def check_written(path, before, lat, lon, dest_lat=None, dest_lon=None, direction=None):
+    after = read_bytes(path)
+    assert without_app1(after) == without_app1(before)
+
+    fast = geoexif.read_gps_exif(path)
+    slow = geoexif.read_gps_exif_fallback(path)
+    for record in (fast, slow):
+        assert record.lat == pytest.approx(lat, abs=DEGREES)
+        assert record.lon == pytest.approx(lon, abs=DEGREES)
+        if dest_lat is not None:
+            assert record.dest_lat == pytest.approx(dest_lat, abs=DEGREES)
+            assert record.dest_lon == pytest.approx(dest_lon, abs=DEGREES)
+    if direction is not None:
+        image = exif.Image(after)
+        assert image.gps_img_direction == pytest.approx(direction, abs=0.01)
+        assert image.gps_img_direction_ref == "T"
+    return fast
+
+
+def test_patch_in_place(tmp_path, jpeg):
+    segment = corpus.exif_segment("Pentax K-5", "2024:05:01 06:00:00", 55.5, 37.5)
+    path = write_photo(tmp_path, jpeg, segment)
+    before = read_bytes(path)
+
+    assert geoexif.write_gps_exif(path, lat=-33.8568, lon=151.2153) == "patched"
+    assert os.path.getsize(path) == len(before)
+    record = check_written(path, before, -33.8568, 151.2153)
+    assert record.model == "Pentax K-5"
+    assert record.datetime_original == "2024:05:01 06:00:00"
+
+
+def test_gps_ifd_appended(tmp_path, jpeg):
+    segment = corpus.exif_segment("Canon EOS 5D", "2024:05:01 06:00:00", 55.5, 37.5)
+    path = write_photo(tmp_path, jpeg, segment)
+    before = read_bytes(path)
+
+    result = geoexif.write_gps_exif(
+        path, lat=55.75, lon=37.62, dest_lat=55.7501, dest_lon=37.6202, direction=51.25
+    )
+    assert result == "rewritten"
+    record = check_written(path, before, 55.75, 37.62, 55.7501, 37.6202, 51.25)
+    assert record.model == "Canon EOS 5D"
+
+
+def test_ifd0_relocated(tmp_path, jpeg):
+    path = write_photo(tmp_path, jpeg, segment_without_gps())
+    before = read_bytes(path)
+
+    assert geoexif.write_gps_exif(path, lat=48.8584, lon=2.2945) == "rewritten"
+    record = check_written(path, before, 48.8584, 2.2945)
+    assert record.model == "Canon EOS 5D"
+    assert record.datetime_original == "2024:05:01 06:00:00"
+
+
+def test_file_without_exif(tmp_path, jpeg):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(jpeg)
+    path = str(path)
+
+    assert geoexif.write_gps_exif(path, lat=-22.9519, lon=-43.2105) == "rewritten"
+    check_written(path, jpeg, -22.9519, -43.2105)
+
+
+@pytest.mark.parametrize(
+    "gps_ifd, direction, expected",
+    [(True, None, "patched"), (True, 270.5, "rewritten"), (False, None, "rewritten")],
+    ids=["patch", "append", "relocate"],
+)
+def test_big_endian(tmp_path, jpeg, gps_ifd, direction, expected):
+    if gps_ifd:
+        segment = corpus.exif_segment(
+            "Pentax K-5", "2024:05:01 06:00:00", 55.5, 37.5, endian=">"
+        )
+    else:
+        segment = segment_without_gps(endian=">")
+    path = write_photo(tmp_path, jpeg, segment)
+    before = read_bytes(path)
+
+    result = geoexif.write_gps_exif(path, lat=40.6892, lon=-74.0445, direction=direction)
+    assert result == expected
+    with open(path, "rb") as fp:
+        assert geoexif.find_exif_segment(fp)[1][:2] == b"MM"
+    check_written(path, before, 40.6892, -74.0445, direction=direction)
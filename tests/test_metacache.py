@@ -0,0 +1,139 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metacache  # noqa: E402
+import photostore  # noqa: E402
+
+ROOT = os.path.join(os.sep, "photos")
+
+
+def stat(size=1000, mtime_ns=1714543200000000000, inode=42):
+    return SimpleNamespace(st_size=size, st_mtime_ns=mtime_ns, st_ino=inode)
+
+
+def record(path, lat=55.5, lon=37.5):
+    f = photostore.PhotoRecord(path, stat())
+    f.set_exif("Pentax K-5", "2024:05:01 06:00:00", lat, lon, None, None)
+    return f
+
+
+def records(folder, count):
+    return [record(os.path.join(folder, f"IMG_{i:04d}.jpg")) for i in range(count)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = metacache.MetadataCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_row_valid_while_stat_unchanged(cache):
+    path = os.path.join(ROOT, "a.jpg")
+    cache.store([record(path)])
+    row = cache.load_folder(ROOT)[path]
+
+    assert metacache.MetadataCache.is_valid(row, stat())
+    assert not metacache.MetadataCache.is_valid(row, stat(size=1001))
+    assert not metacache.MetadataCache.is_valid(row, stat(mtime_ns=1714543200000000001))
+    # file replaced by another one with same size and time
+    assert not metacache.MetadataCache.is_valid(row, stat(inode=43))
+    # network filesystems report no inode
+    assert metacache.MetadataCache.is_valid(row, stat(inode=0))
+
+    f = metacache.MetadataCache.record_from_row(row, stat())
+    assert f.file_path == path
+    assert (f.model, f.lat, f.lon) == ("Pentax K-5", 55.5, 37.5)
+
+
+def test_parent_and_subfolder_share_rows(cache):
+    day = os.path.join(ROOT, "day1")
+    cache.store(records(day, 3))
+    cache.store(records(ROOT, 2))
+
+    assert len(cache.load_folder(day)) == 3
+    assert len(cache.load_folder(ROOT)) == 5
+    assert len(cache.load_folder(ROOT, recursive=False)) == 2
+    # opening the parent does not take rows away from the subfolder
+    cache.store(records(day, 3))
+    assert len(cache.load_folder(day)) == 3
+    # sibling with same name prefix is another folder
+    cache.store(records(ROOT + "2", 4))
+    assert len(cache.load_folder(ROOT)) == 5
+
+
+def test_forget_missing(cache, tmp_path):
+    folder = str(tmp_path / "photos")
+    os.makedirs(os.path.join(folder, "sub"))
+    paths = [os.path.join(folder, name) for name in ("a.jpg", "b.jpg", "sub/c.jpg")]
+    for path in paths:
+        open(path, "wb").close()
+    cache.store([record(path) for path in paths])
+    os.remove(paths[1])
+
+    # scan without subfolders saw a.jpg only
+    cache.forget_missing(folder, {paths[0]}, recursive=False)
+
+    assert sorted(cache.load_folder(folder)) == [paths[0], paths[2]]
+
+
+def test_rebuild_clears_folder_and_subfolders(cache):
+    cache.store(records(os.path.join(ROOT, "day1"), 3))
+    cache.store(records(ROOT, 2))
+    other = os.path.join(os.sep, "other")
+    cache.store(records(other, 2))
+    cache.touch([ROOT, os.path.join(ROOT, "day1"), other])
+
+    cache.clear(ROOT)
+
+    assert cache.load_folder(ROOT) == {}
+    assert len(cache.load_folder(other)) == 2
+    folders = [row[0] for row in cache.db.execute("SELECT folder FROM folders")]
+    assert folders == [other]
+
+
+def test_evict_least_recently_scanned(tmp_path, monkeypatch):
+    cache = metacache.MetadataCache(str(tmp_path / "cache.sqlite"))
+    times = iter(range(1, 100))
+    monkeypatch.setattr(metacache.time, "time", lambda: next(times))
+    folders = [os.path.join(ROOT, f"day{i}") for i in range(4)]
+    for folder in folders:
+        cache.store(records(folder, 500))
+        cache.touch([folder])
+    # oldest folder was opened again
+    cache.touch([folders[0]])
+
+    cache.max_bytes = cache.used_bytes() * 6 // 10
+    dropped = cache.evict(keep_folder=folders[1])
+
+    assert cache.used_bytes() <= cache.max_bytes
+    remaining = [len(cache.load_folder(folder)) for folder in folders]
+    assert dropped == remaining.count(0) * 500
+    # day1 is kept, others go least recently scanned first: day2, day3, day0
+    assert remaining[1] == 500
+    assert remaining[2] == 0
+    assert remaining in ([500, 500, 0, 500], [500, 500, 0, 0], [0, 500, 0, 0])
+    cache.close()
+
+
+def test_evict_nothing_under_limit(cache):
+    cache.store(records(ROOT, 10))
+    assert cache.evict() == 0
+    assert len(cache.load_folder(ROOT)) == 10
+
+
+def test_old_layout_is_dropped(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    cache = metacache.MetadataCache(db_path)
+    cache.store(records(ROOT, 2))
+    cache.db.execute("PRAGMA user_version = 1")
+    cache.close()
+
+    cache = metacache.MetadataCache(db_path)
+    assert cache.load_folder(ROOT) == {}
+    cache.close()
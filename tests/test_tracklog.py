@@ -0,0 +1,199 @@
+import calendar
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+import tracklog  # noqa: E402
+
+# 2024-05-01 00:00:00 UTC
+DAY = calendar.timegm((2024, 5, 1, 0, 0, 0))
+
+
+def nmea(body):
+    """Sentence with checksum."""
+    value = 0
+    for char in body.encode("ascii"):
+        value ^= char
+    return f"${body}*{value:02X}\n"
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_read_gpx(tmp_path):
+    path = write(
+        tmp_path,
+        "a.gpx",
+        """<?xml version="1.0"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>
+<trkpt lat="55.5" lon="37.25"><ele>150</ele><time>2024-05-01T10:00:00Z</time></trkpt>
+<trkpt lon='37.5' lat='55.75'><time>2024-05-01T13:00:05+03:00</time></trkpt>
+<trkpt lat="56" lon="38"></trkpt>
+</trkseg></trk><trk><trkseg>
+<trkpt lat="-33.5" lon="-70.5"><time>2024-05-01T10:00:10.5Z</time></trkpt>
+</trkseg></trk></gpx>
+""",
+    )
+
+    track = tracklog.read_gpx(path)
+
+    # point without time is skipped, zone and fraction are applied
+    assert list(track.times) == [DAY + 36000, DAY + 36005, DAY + 36010.5]
+    assert list(track.lats) == [55.5, 55.75, -33.5]
+    assert list(track.lons) == [37.25, 37.5, -70.5]
+
+
+def test_read_gpx_points_across_chunks(tmp_path, monkeypatch):
+    point = '<trkpt lat="{0}" lon="{0}"><time>2024-05-01T10:00:{0:02d}Z</time></trkpt>\n'
+    points = "".join(point.format(i) for i in range(40))
+    path = write(tmp_path, "a.gpx", f"<gpx><trk><trkseg>\n{points}</trkseg></trk></gpx>\n")
+    monkeypatch.setattr(tracklog, "GPX_CHUNK_SIZE", 100)
+
+    track = tracklog.read_gpx(path)
+
+    assert list(track.lats) == list(range(40))
+
+
+def test_read_nmea(tmp_path):
+    path = write(
+        tmp_path,
+        "a.nmea",
+        # GGA before any RMC has no date
+        nmea("GPGGA,095959,5530.000,N,03715.000,E,1,08,0.9,150.0,M,,M,,")
+        + nmea("GPRMC,100000,A,5530.000,N,03715.000,E,0.0,0.0,010524,,")
+        + nmea("GNGGA,100001.5,5531.200,N,03716.800,E,1,08,0.9,150.0,M,,M,,")
+        # no fix
+        + nmea("GPGGA,100002,5531.200,N,03716.800,E,0,00,,,M,,M,,")
+        + nmea("GPRMC,100003,V,5530.000,N,03715.000,E,0.0,0.0,010524,,")
+        # bad checksum
+        + "$GPRMC,100004,A,5530.000,N,03715.000,E,0.0,0.0,010524,,*00\n"
+        + nmea("GPRMC,100005,A,3330.000,S,07030.000,W,0.0,0.0,010524,,"),
+    )
+
+    track = tracklog.read_nmea(path)
+
+    assert list(track.times) == [DAY + 36000, DAY + 36001.5, DAY + 36005]
+    assert np.allclose(track.lats, [55.5, 55.52, -33.5])
+    assert np.allclose(track.lons, [37.25, 37.28, -70.5])
+
+
+def test_read_nmea_gga_after_midnight(tmp_path):
+    path = write(
+        tmp_path,
+        "a.nmea",
+        nmea("GPRMC,235959,A,5530.000,N,03715.000,E,0.0,0.0,010524,,")
+        # GGA of the same second may come before or after RMC
+        + nmea("GPGGA,235958,5530.000,N,03715.000,E,1,08,0.9,150.0,M,,M,,")
+        + nmea("GPGGA,000001,5530.000,N,03715.000,E,1,08,0.9,150.0,M,,M,,")
+        + nmea("GPRMC,000002,A,5530.000,N,03715.000,E,0.0,0.0,020524,,")
+        + nmea("GPGGA,000003,5530.000,N,03715.000,E,1,08,0.9,150.0,M,,M,,"),
+    )
+
+    track = tracklog.read_nmea(path)
+
+    next_day = DAY + 24 * 3600
+    assert list(track.times) == [
+        DAY + 86398,
+        DAY + 86399,
+        next_day + 1,
+        next_day + 2,
+        next_day + 3,
+    ]
+
+
+def test_read_csv_time_column(tmp_path):
+    path = write(
+        tmp_path,
+        "a.csv",
+        "Timestamp;Latitude;Longitude\n"
+        f"{DAY + 10};55.5;37.5\n"
+        f"{(DAY + 20) * 1000};55.6;37.6\n"
+        "2024-05-01T00:00:30Z;55.7;37.7\n"
+        "bad;55.8;37.8\n",
+    )
+
+    track = tracklog.read_csv(path)
+
+    assert list(track.times) == [DAY + 10, DAY + 20, DAY + 30]
+    assert list(track.lats) == [55.5, 55.6, 55.7]
+
+
+def test_read_csv_date_and_time_columns(tmp_path):
+    path = write(
+        tmp_path, "a.csv", "date,time,lat,lng\n2024-05-01,10:00:00,55.5,37.5\n"
+    )
+
+    track = tracklog.read_csv(path)
+
+    assert list(track.times) == [DAY + 36000]
+    assert list(track.lons) == [37.5]
+
+
+def test_read_csv_without_position_columns(tmp_path):
+    path = write(tmp_path, "a.csv", "time,speed\n2024-05-01T00:00:00Z,5\n")
+    with pytest.raises(ValueError):
+        tracklog.read_csv(path)
+
+
+def test_locate_interpolates_within_max_gap():
+    track = tracklog.Track([0, 100, 1000], [10, 20, 30], [40, 50, 60])
+
+    lats, lons, matched = track.locate([0, 25, 100], max_gap=300)
+
+    assert list(matched) == [True, True, True]
+    assert list(lats) == [10, 12.5, 20]
+    assert list(lons) == [40, 42.5, 50]
+
+
+def test_locate_nearest_fix_over_gap():
+    track = tracklog.Track([0, 100, 1000], [10, 20, 30], [40, 50, 60])
+
+    lats, lons, matched = track.locate(
+        [350, 800, 550, 2000, -400, math.nan], max_gap=300
+    )
+
+    # nearest fix is taken within max_gap, no interpolation over long gap
+    assert list(matched) == [True, True, False, False, False, False]
+    assert (lats[0], lons[0]) == (20, 50)
+    assert (lats[1], lons[1]) == (30, 60)
+
+
+def test_locate_before_first_and_after_last_fix():
+    track = tracklog.Track([100, 200], [10, 20], [40, 50])
+
+    lats, _, matched = track.locate([50, 250], max_gap=60)
+
+    assert list(matched) == [True, True]
+    assert list(lats) == [10, 20]
+
+
+def test_locate_across_antimeridian():
+    track = tracklog.Track([0, 100], [0, 0], [179, -179])
+
+    _, lons, matched = track.locate([50, 75], max_gap=300)
+
+    assert list(matched) == [True, True]
+    assert math.isclose(abs(lons[0]), 180)
+    assert math.isclose(lons[1], -179.5)
+
+
+def test_locate_empty_track():
+    lats, lons, matched = tracklog.Track([], [], []).locate([0, 1])
+    assert not matched.any()
+    assert np.isnan(lats).all() and np.isnan(lons).all()
+
+
+def test_track_drops_nan_and_merges_equal_times():
+    track = tracklog.Track([20, 10, 10, math.nan], [2, 1, 5, 9], [2, 1, 5, 9])
+
+    assert list(track.times) == [10, 20]
+    assert list(track.lats) == [1, 2]
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import tempfile
+
+# long edge of stored thumbnails, about 30 KB each as JPEG
+THUMBNAIL_SIZE = 512
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+class ThumbnailCache:
+    """
+    Thumbnails on disk shared across sessions, one JPEG file per photo version.
+    File name is hash of photo path, size and mtime, so a changed photo
+    gets a new entry and the old one ages out.
+    Last use is kept in file mtime, eviction removes least recently used files.
+    Safe to use from several threads: files are written to temp file and renamed.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, file_path, size, mtime_ns):
+        key = f"{file_path}\0{size}\0{mtime_ns}\0{THUMBNAIL_SIZE}"
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+    def get(self, file_path, size, mtime_ns):
+        """Path of cached thumbnail or None. Marks entry as recently used."""
+        path = self.path_for(file_path, size, mtime_ns)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def contains(self, file_path, size, mtime_ns):
+        return os.path.exists(self.path_for(file_path, size, mtime_ns))
+
+    def store(self, file_path, size, mtime_ns, data):
+        """Write encoded thumbnail bytes."""
+        path = self.path_for(file_path, size, mtime_ns)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    def entries(self):
+        """List of (mtime, size, path) of cached thumbnails."""
+        result = []
+        for subdir in os.scandir(self.cache_dir):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                result.append((stat.st_mtime, stat.st_size, entry.path))
+        return result
+
+    def evict(self):
+        """Delete least recently used thumbnails until cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import time
+
+from sqlitedb import open_db
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# MBTiles layout, so cache file can be opened by other MBTiles tools
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    tile_data BLOB NOT NULL,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+CREATE TABLE IF NOT EXISTS tile_usage (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+CREATE INDEX IF NOT EXISTS tile_usage_last_used ON tile_usage (last_used);
+"""
+
+
+def tms_row(z, y):
+    """MBTiles store rows bottom-up (TMS), map urls count them top-down."""
+    return (1 << z) - 1 - y
+
+
+def tile_mime_type(data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return b"image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return b"image/webp"
+    return b"image/jpeg"
+
+
+class MBTilesSource:
+    """Read-only raster MBTiles file, for example pre-seeded for field work."""
+
+    def __init__(self, path):
+        self.path = path
+        uri = "file:" + os.path.abspath(path).replace("?", "%3f") + "?mode=ro"
+        self.db = sqlite3.connect(uri, uri=True)
+        # fail early on files which are not MBTiles
+        self.db.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles LIMIT 1")
+
+    def metadata(self):
+        try:
+            return dict(self.db.execute("SELECT name, value FROM metadata"))
+        except sqlite3.Error:
+            return dict()
+
+    def get(self, z, x, y):
+        row = self.db.execute(
+            "SELECT tile_data FROM tiles"
+            " WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, tms_row(z, y)),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self):
+        self.db.close()
+
+
+class TileCache:
+    """
+    Downloaded map tiles in sqlite file, evicted least recently used first
+    when total size goes over max_bytes.
+    Last use of read tiles is written in batches to keep reads cheap.
+    """
+
+    touch_batch = 100
+    evict_every = 200
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.db = open_db(db_path)
+        self.db.executescript(SCHEMA)
+        with self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO metadata VALUES ('name', 'RaskladGeotag tile cache')"
+            )
+            self.db.execute("INSERT OR IGNORE INTO metadata VALUES ('format', 'png')")
+        self._touched = dict()
+        self._stored = 0
+
+    def get(self, z, x, y):
+        key = (z, x, tms_row(z, y))
+        row = self.db.execute(
+            "SELECT tile_data FROM tiles"
+            " WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.touch_batch:
+            self.flush()
+        return row[0]
+
+    def put(self, z, x, y, data):
+        key = (z, x, tms_row(z, y))
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO tiles VALUES (?,?,?,?)", key + (data,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO tile_usage VALUES (?,?,?,?,?)",
+                key + (len(data), time.time()),
+            )
+        self._stored += 1
+        if self._stored % self.evict_every == 0:
+            self.evict()
+
+    def flush(self):
+        if not self._touched:
+            return
+        with self.db:
+            self.db.executemany(
+                "UPDATE tile_usage SET last_used = ?"
+                " WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                [(used,) + key for key, used in self._touched.items()],
+            )
+        self._touched = dict()
+
+    def total_bytes(self):
+        (total,) = self.db.execute("SELECT coalesce(sum(size), 0) FROM tile_usage").fetchone()
+        return total
+
+    def evict(self):
+        """Drop least recently used tiles until cache fits max_bytes."""
+        self.flush()
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        removed = []
+        for z, x, row, size in self.db.execute(
+            "SELECT zoom_level, tile_column, tile_row, size FROM tile_usage ORDER BY last_used"
+        ):
+            if total <= self.max_bytes:
+                break
+            removed.append((z, x, row))
+            total -= size
+        where = " WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+        with self.db:
+            self.db.executemany("DELETE FROM tiles" + where, removed)
+            self.db.executemany("DELETE FROM tile_usage" + where, removed)
+        return len(removed)
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM tiles")
+            self.db.execute("DELETE FROM tile_usage")
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,259 @@
+import atexit
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# file to write Chrome trace to at exit; tracing is on from start when set
+TRACE_ENV = "RASKLAD_TRACE"
+# spans kept in memory, oldest are dropped after that
+MAX_EVENTS = 1000000
+
+enabled = False
+_events = collections.deque(maxlen=MAX_EVENTS)
+_thread_names = dict()
+_origin_ns = time.perf_counter_ns()
+
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        tid = threading.get_ident()
+        if tid not in _thread_names:
+            _thread_names[tid] = threading.current_thread().name
+        # deque append is atomic, spans may end in any thread
+        _events.append((self.name, self.category, self.start, end - self.start, tid, self.args))
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, category="app", **args):
+    """
+    Context manager timing a block as a trace span.
+    When tracing is off this is one flag check and a shared no-op object.
+    """
+    if not enabled:
+        return _NO_SPAN
+    return _Span(name, category, args)
+
+
+def traced(func, name, category="app"):
+    """func wrapped in a span when tracing is on, func itself otherwise."""
+    if not enabled:
+        return func
+
+    def wrapper(*args, **kwargs):
+        with _Span(name, category, None):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument(category, name=None):
+    """
+    Decorator: calls are spans while tracing is on. Wrapper takes any
+    arguments, so do not use it on slots connected to signals with more
+    arguments than the slot has.
+    """
+
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, category, None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def clear():
+    _events.clear()
+
+
+def event_count():
+    return len(_events)
+
+
+def chrome_trace():
+    """Recorded spans as Chrome trace-event dict, for chrome://tracing or Perfetto."""
+    pid = os.getpid()
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+        for tid, name in list(_thread_names.items())
+    ]
+    for name, category, start, duration, tid, args in list(_events):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - _origin_ns) / 1000,
+            "dur": duration / 1000,
+            "pid": pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome(path):
+    with open(path, "w") as fp:
+        json.dump(chrome_trace(), fp)
+
+
+def summary():
+    """List of (category, name, count, total ms, mean ms, max ms), biggest total first."""
+    totals = dict()
+    for name, category, _, duration, _, _ in list(_events):
+        row = totals.get((category, name))
+        if row is None:
+            totals[(category, name)] = [1, duration, duration]
+        else:
+            row[0] += 1
+            row[1] += duration
+            row[2] = max(row[2], duration)
+    rows = [
+        (category, name, count, total / 1e6, total / count / 1e6, longest / 1e6)
+        for (category, name), (count, total, longest) in totals.items()
+    ]
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows
+
+
+def format_summary(rows=None):
+    rows = summary() if rows is None else rows
+    lines = [f"{'phase':<28} {'count':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for category, name, count, total, mean, longest in rows:
+        lines.append(
+            f"{category + '/' + name:<28} {count:>8} {total:>10.1f} {mean:>9.3f} {longest:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+class Sampler:
+    """
+    Sampling profiler of all Python threads: stacks are read every interval
+    seconds from a background thread. Unlike cProfile it sees worker threads
+    and slows them down little; results are collapsed stacks, as used by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    file_name = os.path.basename(code.co_filename)
+                    stack.append(f"{code.co_name} ({file_name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w") as fp:
+            for stack, count in self.stacks.most_common():
+                fp.write(f"{stack} {count}\n")
+
+    def top(self, limit=25):
+        """List of (function, own samples, total samples), by own samples."""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [(frame, count, total[frame]) for frame, count in own.most_common(limit)]
+
+    def format_top(self, limit=25):
+        lines = [
+            f"{self.samples} samples every {self.interval * 1000:.0f} ms",
+            "own  total  function",
+        ]
+        for frame, count, total in self.top(limit):
+            lines.append(f"{count:>4} {total:>6}  {frame}")
+        return "\n".join(lines)
+
+
+def _export_at_exit(path):
+    try:
+        export_chrome(path)
+    except OSError as e:
+        print(f"trace export error {e}", file=sys.stderr)
+        return
+    print(format_summary(), file=sys.stderr)
+    print(f"trace of {event_count()} spans written to {path}", file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    # process pool workers inherit the variable, only the first process traces
+    if os.environ.setdefault(TRACE_ENV + "_PID", str(os.getpid())) == str(os.getpid()):
+        enable()
+        atexit.register(_export_at_exit, os.environ[TRACE_ENV])
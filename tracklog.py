@@ -0,0 +1,417 @@
+import array
+import calendar
+import csv
+import math
+import os
+import re
+
+import numpy as np
+
+TRACK_EXTENSIONS = (".gpx", ".nmea", ".nma", ".log", ".txt", ".csv")
+# interpolate between fixes up to this many seconds apart
+DEFAULT_MAX_GAP = 300
+
+_ZONE_RE = re.compile(r"^(?:\.(\d+))?\s*(Z|[+-]\d\d:?\d\d)?$")
+_OFFSET_RE = re.compile(r"^([+-])?(\d+)(?::(\d+))?(?::(\d+))?$")
+
+
+def iso_time_seconds(text):
+    """
+    Seconds since epoch UTC of ISO 8601 time like 2024-05-01T10:20:30.5Z,
+    time zone suffix is applied, time without zone is taken as UTC.
+    None for unparsable text.
+    """
+    text = text.strip()
+    try:
+        seconds = calendar.timegm(
+            (
+                int(text[0:4]),
+                int(text[5:7]),
+                int(text[8:10]),
+                int(text[11:13]),
+                int(text[14:16]),
+                int(text[17:19]),
+            )
+        )
+    except ValueError:
+        return None
+    match = _ZONE_RE.match(text[19:])
+    if match is None:
+        return None
+    fraction, zone = match.groups()
+    if fraction:
+        seconds += float("0." + fraction)
+    if zone and zone != "Z":
+        zone = zone.replace(":", "")
+        zone_seconds = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        seconds -= zone_seconds if zone[0] == "+" else -zone_seconds
+    return seconds
+
+
+def exif_time_seconds(text):
+    """Seconds since epoch of exif DateTimeOriginal taken as UTC, NaN if unparsable."""
+    if not text:
+        return math.nan
+    try:
+        return float(
+            calendar.timegm(
+                (
+                    int(text[0:4]),
+                    int(text[5:7]),
+                    int(text[8:10]),
+                    int(text[11:13]),
+                    int(text[14:16]),
+                    int(text[17:19]),
+                )
+            )
+        )
+    except ValueError:
+        return math.nan
+
+
+def parse_offset(text):
+    """Clock offset like +03:00:00, -0:00:25 or 3600 to seconds, ValueError if bad."""
+    match = _OFFSET_RE.match(text.strip())
+    if match is None:
+        raise ValueError(f"bad time offset {text!r}")
+    sign, first, minutes, seconds = match.groups()
+    if minutes is None:
+        value = int(first)
+    else:
+        value = int(first) * 3600 + int(minutes) * 60 + int(seconds or 0)
+    return -value if sign == "-" else value
+
+
+def format_offset(seconds):
+    sign = "-" if seconds < 0 else "+"
+    seconds = abs(int(seconds))
+    return f"{sign}{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class Track:
+    """
+    GPS fixes as numpy arrays sorted by time, seconds since epoch UTC.
+    Fixes with equal time are merged, the first one is kept.
+    """
+
+    __slots__ = ("times", "lats", "lons")
+
+    def __init__(self, times, lats, lons):
+        times = np.asarray(times, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        valid = ~(np.isnan(times) | np.isnan(lats) | np.isnan(lons))
+        times, lats, lons = times[valid], lats[valid], lons[valid]
+        self.times, first = np.unique(times, return_index=True)
+        self.lats = lats[first]
+        self.lons = lons[first]
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def concat(cls, tracks):
+        tracks = list(tracks)
+        if not tracks:
+            return cls([], [], [])
+        return cls(
+            np.concatenate([t.times for t in tracks]),
+            np.concatenate([t.lats for t in tracks]),
+            np.concatenate([t.lons for t in tracks]),
+        )
+
+    def locate(self, times, max_gap=DEFAULT_MAX_GAP):
+        """
+        Positions at given UTC times, as arrays (lats, lons, matched).
+        Between fixes not more than max_gap seconds apart position is
+        interpolated, otherwise the nearest fix is taken if it is within
+        max_gap seconds. Other times, NaN times and empty track are not matched.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        count = len(self.times)
+        if count == 0:
+            nan = np.full(times.shape, np.nan)
+            return nan, nan.copy(), np.zeros(times.shape, dtype=bool)
+
+        after = np.searchsorted(self.times, times, side="right")
+        lo = np.clip(after - 1, 0, count - 1)
+        hi = np.clip(after, 0, count - 1)
+        t0 = self.times[lo]
+        t1 = self.times[hi]
+        span = t1 - t0
+        interpolate = (span > 0) & (span <= max_gap)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(span > 0, (times - t0) / span, 0.0)
+
+        lat0, lat1 = self.lats[lo], self.lats[hi]
+        lon0, lon1 = self.lons[lo], self.lons[hi]
+        # shortest way across the antimeridian
+        dlon = (lon1 - lon0 + 180.0) % 360.0 - 180.0
+        lats = lat0 + (lat1 - lat0) * weight
+        lons = (lon0 + dlon * weight + 180.0) % 360.0 - 180.0
+
+        d0 = np.abs(times - t0)
+        d1 = np.abs(t1 - times)
+        use_hi = d1 < d0
+        lats = np.where(interpolate, lats, np.where(use_hi, lat1, lat0))
+        lons = np.where(interpolate, lons, np.where(use_hi, lon1, lon0))
+        matched = interpolate | (np.minimum(d0, d1) <= max_gap)
+        matched &= ~np.isnan(times)
+        return lats, lons, matched
+
+
+def _arrays_track(times, lats, lons):
+    return Track(
+        np.frombuffer(times, dtype=np.float64),
+        np.frombuffer(lats, dtype=np.float64),
+        np.frombuffer(lons, dtype=np.float64),
+    )
+
+
+_GPX_POINT_RE = re.compile(rb"<(?:[\w.-]+:)?trkpt\b([^>]*)>(.*?)</(?:[\w.-]+:)?trkpt\s*>", re.S)
+_GPX_LAT_RE = re.compile(rb"\blat\s*=\s*[\"']([^\"']*)")
+_GPX_LON_RE = re.compile(rb"\blon\s*=\s*[\"']([^\"']*)")
+_GPX_TIME_RE = re.compile(rb"<(?:[\w.-]+:)?time\s*>\s*([^<\s]*)")
+GPX_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def iso_times(texts):
+    """iso_time_seconds of list of bytes as array, whole-second UTC times in bulk."""
+    if {t[19:] for t in texts} <= {b"", b"Z"}:
+        try:
+            return (
+                np.array([t[:19] for t in texts], dtype="S19")
+                .astype("datetime64[s]")
+                .astype(np.float64)
+            )
+        except ValueError:
+            pass
+    seconds = (iso_time_seconds(t.decode("ascii", "replace")) for t in texts)
+    return np.fromiter(
+        (math.nan if s is None else s for s in seconds), dtype=np.float64, count=len(texts)
+    )
+
+
+def read_gpx(path):
+    """
+    Track points of all tracks in GPX file, points without time are skipped.
+    File is parsed in chunks, each chunk goes to compact arrays at once.
+    """
+    parts = []
+    carry = b""
+    with open(path, "rb") as fp:
+        while True:
+            chunk = fp.read(GPX_CHUNK_SIZE)
+            data = carry + chunk
+            # parse up to last closed point, rest waits for next chunk
+            cut = data.rfind(b"trkpt>") + len(b"trkpt>") if chunk else len(data)
+            if cut < len(b"trkpt>"):
+                cut = 0
+            carry = data[cut:]
+            lats, lons, times = [], [], []
+            for attrs, body in _GPX_POINT_RE.findall(data, 0, cut):
+                lat = _GPX_LAT_RE.search(attrs)
+                lon = _GPX_LON_RE.search(attrs)
+                time = _GPX_TIME_RE.search(body)
+                if lat is None or lon is None or time is None:
+                    continue
+                lats.append(lat.group(1))
+                lons.append(lon.group(1))
+                times.append(time.group(1))
+            if times:
+                try:
+                    parts.append(
+                        Track(
+                            iso_times(times),
+                            np.array(lats, dtype="S").astype(np.float64),
+                            np.array(lons, dtype="S").astype(np.float64),
+                        )
+                    )
+                except ValueError as e:
+                    raise ValueError(f"{os.path.basename(path)}: {e}")
+            if not chunk:
+                break
+    return Track.concat(parts)
+
+
+def _nmea_degrees(value, hemisphere):
+    # ddmm.mmmm / dddmm.mmmm
+    dot = value.index(".") if "." in value else len(value)
+    degrees = int(value[: dot - 2]) + float(value[dot - 2 :]) / 60
+    return -degrees if hemisphere in ("S", "W") else degrees
+
+
+def _nmea_checksum_ok(line):
+    if "*" not in line:
+        return True
+    body, checksum = line[1:].split("*", 1)
+    value = 0
+    for char in body.encode("ascii", "replace"):
+        value ^= char
+    try:
+        return value == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def read_nmea(path):
+    """
+    Fixes of RMC and GGA sentences of any talker. GGA has no date,
+    date of the previous RMC is used, next day once GGA clock passed midnight.
+    """
+    times, lats, lons = array.array("d"), array.array("d"), array.array("d")
+    day = None  # epoch seconds of UTC midnight from last RMC
+    rmc_seconds = 0.0  # clock of last RMC
+    with open(path, "r", encoding="ascii", errors="replace") as fp:
+        for line in fp:
+            line = line.strip()
+            if not line.startswith("$") or len(line) < 7:
+                continue
+            sentence = line[3:6]
+            if sentence not in ("RMC", "GGA") or not _nmea_checksum_ok(line):
+                continue
+            fields = line.split("*", 1)[0].split(",")
+            try:
+                if sentence == "RMC":
+                    if len(fields) < 10 or fields[2] != "A":
+                        continue
+                    date = fields[9]
+                    day = calendar.timegm(
+                        (2000 + int(date[4:6]), int(date[2:4]), int(date[0:2]), 0, 0, 0)
+                    )
+                    lat = _nmea_degrees(fields[3], fields[4])
+                    lon = _nmea_degrees(fields[5], fields[6])
+                else:
+                    if day is None or len(fields) < 7 or fields[6] in ("", "0"):
+                        continue
+                    lat = _nmea_degrees(fields[2], fields[3])
+                    lon = _nmea_degrees(fields[4], fields[5])
+                clock = fields[1]
+                seconds = (
+                    int(clock[0:2]) * 3600 + int(clock[2:4]) * 60 + float(clock[4:])
+                )
+            except (ValueError, IndexError):
+                continue
+            if sentence == "RMC":
+                rmc_seconds = seconds
+            elif seconds < rmc_seconds - 12 * 3600:
+                # GGA after midnight before next RMC; small step back is only sentence order
+                seconds += 24 * 3600
+            times.append(day + seconds)
+            lats.append(lat)
+            lons.append(lon)
+    return _arrays_track(times, lats, lons)
+
+
+CSV_TIME_COLUMNS = ("time", "timestamp", "datetime", "date_time", "date time", "utc")
+CSV_LAT_COLUMNS = ("lat", "latitude")
+CSV_LON_COLUMNS = ("lon", "lng", "long", "longitude")
+
+
+def _csv_time_seconds(text):
+    try:
+        value = float(text)
+    except ValueError:
+        return iso_time_seconds(text)
+    # unix time in milliseconds
+    return value / 1000 if value > 1e11 else value
+
+
+def read_csv(path):
+    """
+    Fixes from CSV with header. Time is ISO text or unix seconds/milliseconds
+    in a time column, or in separate date and time columns.
+    """
+    times, lats, lons = array.array("d"), array.array("d"), array.array("d")
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as fp:
+        sample = fp.read(4096)
+        fp.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(fp, dialect)
+        header = [name.strip().lower() for name in next(reader, [])]
+
+        def column(names):
+            for name in names:
+                if name in header:
+                    return header.index(name)
+            return None
+
+        time_col = column(CSV_TIME_COLUMNS)
+        date_col = column(("date",))
+        lat_col = column(CSV_LAT_COLUMNS)
+        lon_col = column(CSV_LON_COLUMNS)
+        if lat_col is None or lon_col is None or (time_col is None and date_col is None):
+            raise ValueError(
+                f"{os.path.basename(path)}: no time, latitude or longitude column"
+            )
+        for row in reader:
+            try:
+                text = row[time_col] if time_col is not None else row[date_col]
+                # clock only in time column, date in its own column
+                if date_col is not None and ":" in text and "-" not in text and len(text) <= 12:
+                    text = row[date_col] + "T" + text
+                seconds = _csv_time_seconds(text)
+                lat = float(row[lat_col])
+                lon = float(row[lon_col])
+            except (ValueError, IndexError):
+                continue
+            if seconds is None:
+                continue
+            times.append(seconds)
+            lats.append(lat)
+            lons.append(lon)
+    return _arrays_track(times, lats, lons)
+
+
+def read_track(path):
+    """Track of GPX, NMEA or CSV file, format chosen by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gpx":
+        return read_gpx(path)
+    if extension == ".csv":
+        return read_csv(path)
+    return read_nmea(path)
+
+
+def photo_times(records, offset_seconds=0, model_offsets=None):
+    """
+    UTC seconds of records' DateTimeOriginal, NaN where missing.
+    offset_seconds is how much camera clock is ahead of UTC,
+    time zone of the camera included. model_offsets {model: seconds}
+    adds per camera corrections on top of it.
+    """
+    times = np.fromiter(
+        (exif_time_seconds(f.datetime_original) for f in records),
+        dtype=np.float64,
+        count=len(records),
+    )
+    if model_offsets:
+        times -= np.fromiter(
+            (model_offsets.get(f.model or "", 0) for f in records),
+            dtype=np.float64,
+            count=len(records),
+        )
+    return times - offset_seconds
+
+
+def match_tagged_photos(records, model_offsets=None, tolerance=DEFAULT_MAX_GAP):
+    """
+    Borrow positions for photos without coordinates from photos with them,
+    for example DSLR shots from phone shots taken along.
+    Tagged photos are a track in shooting time, model_offsets {model: seconds
+    camera clock is ahead of reference} put all cameras on one clock.
+    Returns list of (record, lat, lon) of matched photos.
+    """
+    tagged = []
+    untagged = []
+    for f in records:
+        (tagged if f.position()[0] is not None else untagged).append(f)
+    if not tagged or not untagged:
+        return []
+    positions = np.array([f.position() for f in tagged], dtype=np.float64)
+    track = Track(photo_times(tagged, 0, model_offsets), positions[:, 0], positions[:, 1])
+    lats, lons, matched = track.locate(photo_times(untagged, 0, model_offsets), tolerance)
+    return [(untagged[i], lats[i], lons[i]) for i in matched.nonzero()[0]]